@@ -1,7 +1,12 @@
+import asyncio
 import json
+import logging
+import math
 import os
+import random
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple, TypeVar
 
 from dotenv import load_dotenv
 import httpx
@@ -17,13 +22,80 @@ AI_API_URL = os.getenv("AI_DESCRIPTION_API_URL", "https://api.deepseek.com/chat/
 AI_MODEL_NAME = os.getenv("AI_DESCRIPTION_MODEL", "deepseek-chat")
 AI_API_KEY = os.getenv("AI_DESCRIPTION_API_KEY")
 AI_SSL_VERIFY = os.getenv("AI_SSL_VERIFY", "true").lower() != "false"
+# HTTP/2 needs the optional ``h2`` package (pip install "httpx[http2]").
+AI_HTTP2 = os.getenv("AI_HTTP2", "false").lower() == "true"
+AI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("AI_CONNECT_TIMEOUT_SECONDS", "5.0"))
+AI_READ_TIMEOUT_SECONDS = float(os.getenv("AI_READ_TIMEOUT_SECONDS", "30.0"))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "4"))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "2"))
+AI_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("AI_KEEPALIVE_EXPIRY_SECONDS", "120.0"))
+# Attempts per call (1 disables retries); the delay before attempt n is random
+# between 0 and min(max, base * 2**(n-2)), and always within the call's deadline.
+AI_RETRY_ATTEMPTS = int(os.getenv("AI_RETRY_ATTEMPTS", "3"))
+AI_RETRY_BASE_DELAY_SECONDS = float(os.getenv("AI_RETRY_BASE_DELAY_SECONDS", "0.25"))
+AI_RETRY_MAX_DELAY_SECONDS = float(os.getenv("AI_RETRY_MAX_DELAY_SECONDS", "2.0"))
+# After this many failed attempts in a row, calls fail at once with a 503
+# for AI_BREAKER_OPEN_SECONDS; then a single trial call decides.
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30.0"))
 
+# Upstream answers worth another attempt: timeouts, rate limiting and
+# server-side failures. Anything else would fail the same way again.
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
 
-async def call_deepseek(messages: List[Dict[str, str]], *, max_tokens: int = 512) -> str:
-    """Call the DeepSeek chat completion API and return the assistant message content.
+logger = logging.getLogger(__name__)
 
-    Messages should be an array of {"role": "system"|"user"|"assistant", "content": "..."}.
-    """
+T = TypeVar("T")
+
+# One pooled client for the whole process: connections (and their TLS
+# sessions) are kept alive between calls instead of being set up per request.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    if not AI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("AI_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            verify=AI_SSL_VERIFY,
+            timeout=httpx.Timeout(
+                AI_READ_TIMEOUT_SECONDS,
+                connect=AI_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=AI_MAX_CONNECTIONS,
+                max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=AI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+    return _client
+
+
+def open_client() -> None:
+    """Create the shared client at startup so certificate loading happens before the first call."""
+
+    _get_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _request(messages: List[Dict[str, str]], max_tokens: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
     if not AI_API_KEY:
         raise HTTPException(status_code=500, detail="AI API key is not configured")
 
@@ -38,19 +110,257 @@ async def call_deepseek(messages: List[Dict[str, str]], *, max_tokens: int = 512
         "max_tokens": max_tokens,
         "temperature": 0.4,
     }
+    return headers, payload
+
 
+class _UpstreamFailure(Exception):
+    """A failed attempt that may succeed if repeated; becomes a 502 when out of attempts."""
+
+    def __init__(self, detail: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _status_error(status_code: int, body: str, headers: httpx.Headers) -> Exception:
+    detail = f"AI service error: {body[:500]}"
+    if status_code not in RETRY_STATUSES:
+        return HTTPException(status_code=502, detail=detail)
     try:
-        async with httpx.AsyncClient(timeout=30.0, verify=AI_SSL_VERIFY) as client:
-            resp = await client.post(AI_API_URL, headers=headers, json=payload)
-    except httpx.RequestError as exc:
-        raise HTTPException(status_code=502, detail=f"AI service request failed: {exc}") from exc
+        retry_after: Optional[float] = float(headers.get("retry-after", ""))
+    except ValueError:
+        # Missing, or an HTTP date; the backoff delay is used instead.
+        retry_after = None
+    return _UpstreamFailure(detail, retry_after)
+
+
+class _CircuitBreaker:
+    """Counts consecutive failed attempts and fails calls fast while the upstream is down.
+
+    Closed: calls go through. Open (after ``failures`` failed attempts in a
+    row): calls raise 503 without touching the network. Once ``open_seconds``
+    have passed, one trial call is let through (half-open); its success
+    closes the breaker, its failure opens it for another period.
+    """
+
+    def __init__(self, failures: int, open_seconds: float) -> None:
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.rejected = 0
+        self.retries = 0
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.trial_running or time.monotonic() < self.opened_at + self.open_seconds:
+            return "open"
+        return "half_open"
+
+    def before_attempt(self) -> bool:
+        """Raise 503 while open; return whether this attempt is the half-open trial."""
+
+        if self.opened_at is None:
+            return False
+        wait = self.opened_at + self.open_seconds - time.monotonic()
+        if wait > 0 or self.trial_running:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="AI service is unavailable, try again shortly",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        self.trial_running = True
+        return True
+
+    def succeeded(self) -> None:
+        if self.opened_at is not None:
+            logger.info("AI service recovered; circuit breaker closed")
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def failed(self, trial: bool) -> None:
+        self.consecutive_failures += 1
+        if trial:
+            self.trial_running = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failures:
+            if self.opened_at is None:
+                logger.warning(
+                    "AI service failed %d times in a row; failing fast for %g s",
+                    self.consecutive_failures,
+                    self.open_seconds,
+                )
+            self.opened_at = time.monotonic()
+
+    def abandoned(self, trial: bool) -> None:
+        """The attempt ended without saying anything about upstream health (cancelled, 4xx)."""
+
+        if trial:
+            self.trial_running = False
 
-    if resp.status_code != 200:
-        detail = resp.text[:500]
-        raise HTTPException(status_code=502, detail=f"AI service error: {detail}")
 
+_breaker = _CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_OPEN_SECONDS)
+
+
+def breaker_stats() -> Dict[str, Any]:
+    return {
+        "state": _breaker.state(),
+        "consecutive_failures": _breaker.consecutive_failures,
+        "rejected": _breaker.rejected,
+        "retries": _breaker.retries,
+    }
+
+
+def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+    """Delay before retrying after failed ``attempt`` (1-based): full jitter, or the server's Retry-After."""
+
+    cap = min(AI_RETRY_MAX_DELAY_SECONDS, AI_RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+    delay = random.uniform(0, cap)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+async def _with_retries(attempt_call: Callable[[], Awaitable[T]], deadline: Optional[float]) -> T:
+    """Await ``attempt_call()`` until it succeeds, retrying ``_UpstreamFailure`` with backoff.
+
+    Chat completions have no side effects, so repeating one is safe. All
+    attempts and the delays between them fit in ``deadline`` seconds
+    (None: only the client timeouts apply); running out raises 504.
+    """
+
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        trial = _breaker.before_attempt()
+        remaining = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+        try:
+            result = await asyncio.wait_for(attempt_call(), remaining)
+        except asyncio.TimeoutError as exc:
+            _breaker.failed(trial)
+            raise HTTPException(
+                status_code=504, detail=f"AI service did not answer within {deadline:g} s"
+            ) from exc
+        except _UpstreamFailure as exc:
+            _breaker.failed(trial)
+            delay = _backoff(attempt, exc.retry_after)
+            out_of_time = deadline_at is not None and time.monotonic() + delay >= deadline_at
+            if attempt >= AI_RETRY_ATTEMPTS or out_of_time or _breaker.opened_at is not None:
+                raise HTTPException(status_code=502, detail=exc.detail) from exc
+            logger.info("AI call attempt %d failed (%s); retrying in %.2f s", attempt, exc.detail, delay)
+            _breaker.retries += 1
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            _breaker.abandoned(trial)
+            raise
+        _breaker.succeeded()
+        return result
+
+
+async def call_deepseek(
+    messages: List[Dict[str, str]], *, max_tokens: int = 512, deadline: Optional[float] = None
+) -> str:
+    """Call the DeepSeek chat completion API and return the assistant message content.
+
+    Messages should be an array of {"role": "system"|"user"|"assistant", "content": "..."}.
+    Timeouts, connection errors and 5xx/429 answers are retried within
+    ``deadline`` seconds (see ``_with_retries``).
+    """
+    headers, payload = _request(messages, max_tokens)
+
+    async def attempt() -> httpx.Response:
+        try:
+            resp = await _get_client().post(AI_API_URL, headers=headers, json=payload)
+        except httpx.RequestError as exc:
+            raise _UpstreamFailure(f"AI service request failed: {exc}") from exc
+        if resp.status_code != 200:
+            raise _status_error(resp.status_code, resp.text, resp.headers)
+        return resp
+
+    resp = await _with_retries(attempt, deadline)
     data = resp.json()
     try:
         return data["choices"][0]["message"]["content"]
     except (KeyError, IndexError, TypeError) as exc:
         raise HTTPException(status_code=502, detail="AI service returned unexpected format") from exc
+
+
+async def _sse_data(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yield the data of each Server-Sent Event in ``lines``; comments and other fields are skipped."""
+
+    data: List[str] = []
+    async for line in lines:
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+        elif line.startswith("data:"):
+            value = line[5:]
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+async def _stream_contents(resp: httpx.Response) -> AsyncIterator[str]:
+    async for data in _sse_data(resp.aiter_lines()):
+        if data == "[DONE]":
+            return
+        try:
+            content = (json.loads(data)["choices"][0].get("delta") or {}).get("content")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            raise HTTPException(status_code=502, detail="AI service returned unexpected format") from exc
+        if content:
+            yield content
+
+
+async def stream_deepseek(
+    messages: List[Dict[str, str]], *, max_tokens: int = 512, deadline: Optional[float] = None
+) -> AsyncIterator[str]:
+    """Like ``call_deepseek``, but yield the reply in pieces as the model generates it.
+
+    Uses the API's ``stream: true`` mode (Server-Sent Events, one chunk per
+    event, ``[DONE]`` at the end). Failures before the first piece are
+    retried and must fit in ``deadline`` like ``call_deepseek``; once a piece
+    has been yielded the call cannot be repeated, so later failures raise
+    HTTPException directly and only the read timeout bounds the rest.
+    """
+    headers, payload = _request(messages, max_tokens)
+    payload["stream"] = True
+    client = _get_client()
+
+    async def attempt() -> Tuple[httpx.Response, AsyncIterator[str], Optional[str]]:
+        request = client.build_request("POST", AI_API_URL, headers=headers, json=payload)
+        try:
+            resp = await client.send(request, stream=True)
+        except httpx.RequestError as exc:
+            raise _UpstreamFailure(f"AI service request failed: {exc}") from exc
+        try:
+            if resp.status_code != 200:
+                body = (await resp.aread()).decode("utf-8", "replace")
+                raise _status_error(resp.status_code, body, resp.headers)
+            contents = _stream_contents(resp)
+            return resp, contents, await anext(contents, None)
+        except httpx.RequestError as exc:
+            await resp.aclose()
+            raise _UpstreamFailure(f"AI service request failed: {exc}") from exc
+        except BaseException:
+            await resp.aclose()
+            raise
+
+    resp, contents, first = await _with_retries(attempt, deadline)
+    try:
+        if first is None:
+            return
+        yield first
+        async for content in contents:
+            yield content
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"AI service request failed: {exc}") from exc
+    finally:
+        await contents.aclose()
+        await resp.aclose()
@@ -1,12 +1,58 @@
-from sqlalchemy import create_engine
+import os
+from typing import Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-DATABASE_URL = "sqlite:///./assistant.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./assistant.db")
+
+# SQLite connection pragmas, applied to every new connection. WAL lets pollers
+# keep reading while a writer commits and, with synchronous=NORMAL, avoids an
+# fsync per commit on slow SD cards. Set a value to "" to leave SQLite's default.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")
+# Negative cache_size is in KiB (here 16 MiB); mmap_size is in bytes (64 MiB).
+SQLITE_CACHE_SIZE = os.getenv("SQLITE_CACHE_SIZE", "-16384")
+SQLITE_MMAP_SIZE = os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024))
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """The configured pragmas, skipping any set to an empty string."""
+
+    pragmas = {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": SQLITE_CACHE_SIZE,
+        "mmap_size": SQLITE_MMAP_SIZE,
+    }
+    return {name: value.strip() for name, value in pragmas.items() if value and value.strip()}
+
+
+def configure_sqlite(engine: Engine, pragmas: Dict[str, str]) -> None:
+    """Run ``PRAGMA name=value`` for each entry whenever ``engine`` opens a connection."""
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
 
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
 )
+configure_sqlite(engine, sqlite_pragmas())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -19,3 +65,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _async_url(url: str) -> str:
+    """The same database through an asyncio driver (aiosqlite for SQLite)."""
+
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async counterpart for ``async def`` handlers, so their queries do not run on the
+# event loop thread. Same file and pragmas as ``engine``.
+async_engine = create_async_engine(_async_url(DATABASE_URL))
+configure_sqlite(async_engine.sync_engine, sqlite_pragmas())
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
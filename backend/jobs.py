@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import time as time_module
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .db import SessionLocal, engine
+from .services import archive as archive_service
+from .services import events as schedule_events
+from .services import interactions as interactions_service
+from .services import schedule as schedule_service
+from .services import today_cache
+from .services.event_buffer import INTERACTION_FLUSH_INTERVAL_MS, interaction_buffer
+
+
+logger = logging.getLogger(__name__)
+
+
+STALE_SWEEP_INTERVAL_SECONDS = float(os.getenv("STALE_SWEEP_INTERVAL_SECONDS", "30"))
+STALE_INTERACTION_MINUTES = int(os.getenv("STALE_INTERACTION_MINUTES", "10"))
+
+# Days of schedule change-log kept for delta clients that were offline for a while.
+CHANGE_LOG_RETENTION_DAYS = 7
+
+
+def materialize_horizon() -> int:
+    """Materialize the planning horizon in a fresh session and notify stream clients."""
+
+    today = date.today()
+    db = SessionLocal()
+    try:
+        created = schedule_service.materialize_range(db, today, schedule_service.horizon_end(today))
+        schedule_service.prune_changes(db, today - timedelta(days=CHANGE_LOG_RETENTION_DAYS))
+    finally:
+        db.close()
+    today_cache.bump_version()
+    schedule_events.publish_refresh("day_materialized")
+    return created
+
+
+def archive_history() -> int:
+    """Move schedule days past the archive horizon into the monthly archive files."""
+
+    # Buffered events must be in the tables to move with their instances.
+    interaction_buffer.flush()
+    return archive_service.archive_cold_history(engine)
+
+
+async def run_midnight_materializer() -> None:
+    """Materialize each new day shortly after local midnight, then archive old ones."""
+
+    while True:
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        await asyncio.sleep((next_midnight - now).total_seconds() + 1)
+        try:
+            created = await run_in_threadpool(materialize_horizon)
+            logger.info("Materialized %s schedule instances from %s", created, date.today())
+        except Exception:  # noqa: BLE001
+            logger.exception("Midnight schedule materialization failed")
+        try:
+            await run_in_threadpool(archive_history)
+        except Exception:  # noqa: BLE001
+            logger.exception("Archiving old schedule history failed")
+
+
+@dataclass
+class StaleSweeperStats:
+    interval_seconds: float
+    cutoff_minutes: int
+    runs: int = 0
+    last_run_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_closed: Optional[int] = None
+    total_closed: int = 0
+    last_error: Optional[str] = None
+
+
+stale_sweeper_stats = StaleSweeperStats(
+    interval_seconds=STALE_SWEEP_INTERVAL_SECONDS,
+    cutoff_minutes=STALE_INTERACTION_MINUTES,
+)
+
+
+def sweep_stale_interactions() -> int:
+    """Close unanswered alerts older than the cutoff and record run statistics."""
+
+    started = time_module.perf_counter()
+    # Buffered alerts must be in the table for the UPDATE to see them.
+    interaction_buffer.flush()
+    db = SessionLocal()
+    try:
+        closed = interactions_service.close_stale_interactions(
+            db,
+            cutoff_minutes=STALE_INTERACTION_MINUTES,
+        )
+    finally:
+        db.close()
+
+    stale_sweeper_stats.runs += 1
+    stale_sweeper_stats.last_run_at = datetime.utcnow()
+    stale_sweeper_stats.last_duration_ms = (time_module.perf_counter() - started) * 1000.0
+    stale_sweeper_stats.last_closed = closed
+    stale_sweeper_stats.total_closed += closed
+    stale_sweeper_stats.last_error = None
+    return closed
+
+
+async def run_stale_interaction_sweeper() -> None:
+    while True:
+        try:
+            await run_in_threadpool(sweep_stale_interactions)
+        except Exception as exc:  # noqa: BLE001
+            stale_sweeper_stats.last_error = str(exc)
+            logger.exception("Stale interaction sweep failed")
+        await asyncio.sleep(STALE_SWEEP_INTERVAL_SECONDS)
+
+
+async def run_interaction_flusher() -> None:
+    """Write buffered interaction events every interval, or as soon as a batch is full."""
+
+    loop = asyncio.get_running_loop()
+    batch_full = asyncio.Event()
+    interaction_buffer.attach(lambda: loop.call_soon_threadsafe(batch_full.set))
+    try:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(batch_full.wait(), INTERACTION_FLUSH_INTERVAL_MS / 1000)
+            batch_full.clear()
+            try:
+                await run_in_threadpool(interaction_buffer.flush)
+            except Exception:  # noqa: BLE001
+                # Rows stay buffered (and journaled) for the next attempt.
+                logger.exception("Flushing buffered interaction events failed")
+    finally:
+        interaction_buffer.detach()
+
+
+async def start_background_jobs() -> List[asyncio.Task]:
+    """Run startup work and launch the app's long-lived background jobs."""
+
+    await run_in_threadpool(interaction_buffer.recover)
+    await run_in_threadpool(materialize_horizon)
+    return [
+        asyncio.create_task(run_interaction_flusher(), name="interaction-flusher"),
+        asyncio.create_task(run_midnight_materializer(), name="midnight-materializer"),
+        asyncio.create_task(run_stale_interaction_sweeper(), name="stale-interaction-sweeper"),
+    ]
+
+
+async def stop_background_jobs(jobs: List[asyncio.Task]) -> None:
+    for job in jobs:
+        job.cancel()
+    for job in jobs:
+        with suppress(asyncio.CancelledError):
+            await job
+    await run_in_threadpool(interaction_buffer.close)
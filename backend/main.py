@@ -1,17 +1,34 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
-from .db import Base, engine
-from .routers import schedule, tasks, ai
+from . import ai_client, jobs, schema_upgrades
+from .db import async_engine, engine
+from .routers import schedule, tasks, ai, backup
+from .services import ai_cache
 
 
-# Ensure tables are created on startup (simple dev-time approach)
-Base.metadata.create_all(bind=engine)
+# Bring the database schema up to date (Alembic migrations in backend/migrations).
+schema_upgrades.upgrade_schema(engine)
 
-app = FastAPI(title="Personal Assistant Dashboard")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ai_client.open_client()
+    background_jobs = await jobs.start_background_jobs()
+    try:
+        yield
+    finally:
+        await jobs.stop_background_jobs(background_jobs)
+        await ai_client.close_client()
+        await ai_cache.close()
+        await async_engine.dispose()
+
+
+app = FastAPI(title="Personal Assistant Dashboard", lifespan=lifespan)
 
 static_dir = Path(__file__).resolve().parent / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -947,6 +964,7 @@ async def root() -> str:
                         Design my routine (AI)
                     </button>
                     <div id="ai-template-status" class="status-text"></div>
+                    <div id="ai-template-suggestions" class="history-list" style="margin-top: 0.3rem;"></div>
                 </div>
                 <form id="task-form" autocomplete="off">
                     <label>
@@ -963,11 +981,11 @@ async def root() -> str:
                     </label>
                     <label>
                         Recurrence
-                        <input id="recurrence_pattern" name="recurrence_pattern" type="text" placeholder="daily / weekdays / custom JSON" />
+                        <input id="recurrence_pattern" name="recurrence_pattern" type="text" placeholder="daily / weekdays / mon,wed,fri / every 2 days" />
                     </label>
                     <label class="full-row">
                         Preferred time window
-                        <input id="preferred_time_window" name="preferred_time_window" type="text" placeholder="e.g. 07:00-09:00 or evenings" />
+                        <input id="preferred_time_window" name="preferred_time_window" type="text" placeholder="e.g. 07:00-09:00 or 6 pm - 9 pm" />
                     </label>
                     <label>
                         Alert style
@@ -1113,6 +1131,10 @@ async def root() -> str:
                     </label>
                 </div>
                 <div id="history-list" class="history-list"></div>
+                <div class="history-filters" style="margin-top: 0.4rem;">
+                    <button id="history-more-btn" type="button" class="action-btn" hidden>Load more</button>
+                    <a href="/schedule/interactions/history/export" class="hint" download>Export all (NDJSON)</a>
+                </div>
             </section>
             <section class="card">
                 <h2 class="schedule-section-title">AI Insights on Alerts</h2>
@@ -1163,3 +1185,4 @@ async def root() -> str:
 app.include_router(tasks.router)
 app.include_router(schedule.router)
 app.include_router(ai.router)
+app.include_router(backup.router)
@@ -0,0 +1,46 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from backend import models  # noqa: F401  (registers the tables on Base.metadata)
+from backend.db import Base, engine
+
+config = context.config
+
+# Startup upgrades pass their own connection and keep the app's logging setup.
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    def _run(conn) -> None:
+        # Batch mode lets column/constraint changes work on SQLite (copy-and-move).
+        context.configure(connection=conn, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as conn:
+        _run(conn)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,124 @@
+"""Baseline: the schema as created by create_all before migrations existed.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("default_duration_minutes", sa.Integer(), nullable=False),
+        sa.Column("recurrence_pattern", sa.String(), nullable=True),
+        sa.Column("preferred_time_window", sa.String(), nullable=True),
+        sa.Column("default_alert_style", sa.String(), nullable=False),
+        sa.Column("enabled", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    op.create_table(
+        "schedule_instances",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("planned_start_time", sa.Time(), nullable=False),
+        sa.Column("planned_end_time", sa.Time(), nullable=False),
+        sa.Column("actual_start_time", sa.DateTime(), nullable=True),
+        sa.Column("actual_end_time", sa.DateTime(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+    )
+    op.create_index("ix_schedule_instances_id", "schedule_instances", ["id"])
+
+    op.create_table(
+        "snooze_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "schedule_instance_id", sa.Integer(), sa.ForeignKey("schedule_instances.id"), nullable=False
+        ),
+        sa.Column("minutes", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_snooze_events_id", "snooze_events", ["id"])
+
+    op.create_table(
+        "acknowledge_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "schedule_instance_id", sa.Integer(), sa.ForeignKey("schedule_instances.id"), nullable=False
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_acknowledge_events_id", "acknowledge_events", ["id"])
+
+    op.create_table(
+        "alarm_config",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sound", sa.String(), nullable=False),
+        sa.Column("volume_percent", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_alarm_config_id", "alarm_config", ["id"])
+
+    op.create_table(
+        "alert_wordings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("tone", sa.String(), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+    )
+    op.create_index("ix_alert_wordings_id", "alert_wordings", ["id"])
+    op.create_index("ix_alert_wordings_category", "alert_wordings", ["category"])
+
+    op.create_table(
+        "interactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "schedule_instance_id", sa.Integer(), sa.ForeignKey("schedule_instances.id"), nullable=False
+        ),
+        sa.Column("alert_type", sa.String(), nullable=False),
+        sa.Column("alert_started_at", sa.DateTime(), nullable=False),
+        sa.Column("response_type", sa.String(), nullable=True),
+        sa.Column("response_stage", sa.String(), nullable=True),
+        sa.Column("responded_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_interactions_id", "interactions", ["id"])
+    op.create_index("ix_interactions_schedule_instance_id", "interactions", ["schedule_instance_id"])
+
+    op.create_table(
+        "interaction_notes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "schedule_instance_id", sa.Integer(), sa.ForeignKey("schedule_instances.id"), nullable=False
+        ),
+        sa.Column("interaction_id", sa.Integer(), sa.ForeignKey("interactions.id"), nullable=True),
+        sa.Column("note_type", sa.String(), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_interaction_notes_id", "interaction_notes", ["id"])
+    op.create_index(
+        "ix_interaction_notes_schedule_instance_id", "interaction_notes", ["schedule_instance_id"]
+    )
+    op.create_index("ix_interaction_notes_interaction_id", "interaction_notes", ["interaction_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("interaction_notes")
+    op.drop_table("interactions")
+    op.drop_table("alert_wordings")
+    op.drop_table("alarm_config")
+    op.drop_table("acknowledge_events")
+    op.drop_table("snooze_events")
+    op.drop_table("schedule_instances")
+    op.drop_table("tasks")
@@ -0,0 +1,153 @@
+"""Schedule change log, compiled recurrence/window columns, open-interaction index.
+
+These objects were first added by ad-hoc startup code, so databases stamped at
+0001 may already have some of them; every step checks before creating.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from datetime import datetime, time
+from typing import Optional, Tuple
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_TASK_COLUMNS = (
+    sa.Column("recurrence_mask", sa.Integer(), nullable=False, server_default="127"),
+    sa.Column("recurrence_interval_days", sa.Integer(), nullable=True),
+    sa.Column("recurrence_anchor", sa.Date(), nullable=True),
+    sa.Column("window_start_minute", sa.Integer(), nullable=True),
+    sa.Column("window_end_minute", sa.Integer(), nullable=True),
+)
+
+
+# Frozen copies of how patterns and windows were read when this migration was
+# written; the live versions in backend.services.schedule may change.
+_ALL_DAYS_MASK = 0b1111111
+_GROUP_MASKS = {"daily": 0b1111111, "weekdays": 0b0011111, "weekends": 0b1100000}
+_WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def _weekday_mask(pattern: Optional[str]) -> int:
+    """Lenient pattern reading: unknown parts are ignored, nothing known means daily."""
+
+    p = (pattern or "").strip().lower()
+    if not p:
+        return _ALL_DAYS_MASK
+    if p in _GROUP_MASKS:
+        return _GROUP_MASKS[p]
+    mask = 0
+    for part in (x.strip() for x in p.split(",")):
+        key = part[:3]
+        if len(key) < 3:
+            continue
+        for idx, name in enumerate(_WEEKDAY_NAMES):
+            if name.startswith(key):
+                mask |= 1 << idx
+                break
+    return mask or _ALL_DAYS_MASK
+
+
+def _parse_time(part: str) -> Optional[time]:
+    tokens = part.strip().lower().split()
+    if not tokens:
+        return None
+    candidate = " ".join(tokens[:2])
+    if "am" in candidate or "pm" in candidate:
+        for fmt in ("%I:%M %p", "%I %p", "%I:%M%p", "%I%p"):
+            try:
+                return datetime.strptime(candidate, fmt).time()
+            except ValueError:
+                continue
+    for fmt in ("%H:%M", "%H"):
+        try:
+            return datetime.strptime(tokens[0], fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _window_minutes(raw: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(start, end) minutes of a window such as "07:00-11:00" or "6 pm - 9 pm", else None."""
+
+    s = (raw or "").strip().replace("\u2013", "-")
+    left, dash, right = s.partition("-")
+    if not dash:
+        return None
+    start_t = _parse_time(left)
+    end_t = _parse_time(right)
+    if start_t is None or end_t is None or start_t >= end_t:
+        return None
+    return start_t.hour * 60 + start_t.minute, end_t.hour * 60 + end_t.minute
+
+
+def _backfill_tasks(bind, added) -> None:
+    """Compile stored patterns and windows the way older versions read them."""
+
+    rows = bind.execute(sa.text("SELECT id, recurrence_pattern, preferred_time_window FROM tasks")).all()
+    for task_id, pattern, window in rows:
+        values = {}
+        if "recurrence_mask" in added:
+            values["recurrence_mask"] = _weekday_mask(pattern)
+        if "window_start_minute" in added:
+            # Unparseable windows were always placed as if unwindowed.
+            values["window_start_minute"], values["window_end_minute"] = _window_minutes(window) or (None, None)
+        if values:
+            assignments = ", ".join(f"{name} = :{name}" for name in values)
+            bind.execute(sa.text(f"UPDATE tasks SET {assignments} WHERE id = :id"), {**values, "id": task_id})
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("schedule_changes"):
+        op.create_table(
+            "schedule_changes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "schedule_instance_id", sa.Integer(), sa.ForeignKey("schedule_instances.id"), nullable=False
+            ),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("change_type", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sqlite_autoincrement=True,
+        )
+
+    present = {column["name"] for column in inspector.get_columns("tasks")}
+    added = set()
+    for column in _TASK_COLUMNS:
+        if column.name not in present:
+            op.add_column("tasks", column.copy())
+            added.add(column.name)
+    if added:
+        _backfill_tasks(bind, added)
+
+    task_indexes = {index["name"] for index in inspector.get_indexes("tasks")}
+    if "ix_tasks_enabled_recurrence_mask" not in task_indexes:
+        op.create_index("ix_tasks_enabled_recurrence_mask", "tasks", ["enabled", "recurrence_mask"])
+
+    interaction_indexes = {index["name"] for index in inspector.get_indexes("interactions")}
+    if "ix_interactions_open_alert_started_at" not in interaction_indexes:
+        op.create_index(
+            "ix_interactions_open_alert_started_at",
+            "interactions",
+            ["alert_started_at"],
+            sqlite_where=sa.text("response_type IS NULL"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_interactions_open_alert_started_at", table_name="interactions")
+    op.drop_index("ix_tasks_enabled_recurrence_mask", table_name="tasks")
+    with op.batch_alter_table("tasks") as batch:
+        for column in reversed(_TASK_COLUMNS):
+            batch.drop_column(column.name)
+    op.drop_table("schedule_changes")
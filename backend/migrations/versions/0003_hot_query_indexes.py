@@ -0,0 +1,37 @@
+"""Composite indexes for the day view and latest-interaction lookups.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # date = ? AND status != 'cancelled' ORDER BY planned_start_time
+    op.create_index(
+        "ix_schedule_instances_date_status_start",
+        "schedule_instances",
+        ["date", "status", "planned_start_time"],
+    )
+    # get_latest_interaction: schedule_instance_id = ? ORDER BY alert_started_at DESC, id DESC
+    op.create_index(
+        "ix_interactions_instance_latest",
+        "interactions",
+        ["schedule_instance_id", sa.text("alert_started_at DESC"), sa.text("id DESC")],
+    )
+    # The composite index's leading column makes the single-column one redundant.
+    op.drop_index("ix_interactions_schedule_instance_id", table_name="interactions")
+
+
+def downgrade() -> None:
+    op.create_index("ix_interactions_schedule_instance_id", "interactions", ["schedule_instance_id"])
+    op.drop_index("ix_interactions_instance_latest", table_name="interactions")
+    op.drop_index("ix_schedule_instances_date_status_start", table_name="schedule_instances")
@@ -0,0 +1,51 @@
+"""AUTOINCREMENT ids for history tables that archiving deletes from.
+
+Without AUTOINCREMENT SQLite hands out max(id) + 1, so once the newest rows of
+a table have been archived their ids would be reused and collide with the
+archived copies. The tables are rebuilt to add the keyword.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+_TABLES = (
+    "schedule_instances",
+    "interactions",
+    "snooze_events",
+    "acknowledge_events",
+    "interaction_notes",
+)
+
+
+def _rebuild(autoincrement: bool) -> None:
+    for table in _TABLES:
+        with op.batch_alter_table(
+            table,
+            recreate="always",
+            table_kwargs={"sqlite_autoincrement": autoincrement},
+        ):
+            pass
+    # The rebuild reflects indexes without their sort order; restore the DESC columns.
+    op.drop_index("ix_interactions_instance_latest", table_name="interactions")
+    op.create_index(
+        "ix_interactions_instance_latest",
+        "interactions",
+        ["schedule_instance_id", sa.text("alert_started_at DESC"), sa.text("id DESC")],
+    )
+
+
+def upgrade() -> None:
+    _rebuild(True)
+
+
+def downgrade() -> None:
+    _rebuild(False)
@@ -0,0 +1,84 @@
+"""Daily interaction rollup for history insights, backfilled from existing history.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+import os
+import re
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the rollup rebuild as of this revision (backend.services.rollup
+# may change): closed interactions per schedule day, category, time of day and
+# response, from the hot tables and every monthly archive file.
+_CLOSED_COUNTS_SQL = """
+SELECT i.date,
+       COALESCE(NULLIF(TRIM(t.category), ''), 'uncategorized'),
+       CASE
+           WHEN CAST(strftime('%H', x.alert_started_at) AS INTEGER) BETWEEN 5 AND 11 THEN 'morning'
+           WHEN CAST(strftime('%H', x.alert_started_at) AS INTEGER) BETWEEN 12 AND 16 THEN 'afternoon'
+           WHEN CAST(strftime('%H', x.alert_started_at) AS INTEGER) BETWEEN 17 AND 21 THEN 'evening'
+           ELSE 'late_night'
+       END,
+       COALESCE(NULLIF(TRIM(x.response_type), ''), 'none'),
+       COUNT(*)
+FROM {schema}.interactions AS x
+JOIN {schema}.schedule_instances AS i ON x.schedule_instance_id = i.id
+JOIN main.tasks AS t ON i.task_id = t.id
+WHERE x.response_type IS NOT NULL
+GROUP BY 1, 2, 3, 4
+"""
+
+_UPSERT_SQL = """
+INSERT INTO interaction_daily_rollup (date, category, time_bucket, response_type, count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (date, category, time_bucket, response_type) DO UPDATE SET count = count + excluded.count
+"""
+
+_ARCHIVE_FILE = re.compile(r"^assistant-(\d{4})-(\d{2})\.db$")
+
+
+def _archive_files():
+    directory = Path(os.getenv("ARCHIVE_DIR", "./archive"))
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir() if _ARCHIVE_FILE.match(path.name))
+
+
+def _backfill(bind) -> None:
+    rows = list(bind.exec_driver_sql(_CLOSED_COUNTS_SQL.format(schema="main")))
+    # One file at a time: SQLite allows only a handful of attached databases.
+    for path in _archive_files():
+        bind.exec_driver_sql("ATTACH DATABASE ? AS rollup_archive", (str(path),))
+        try:
+            rows.extend(bind.exec_driver_sql(_CLOSED_COUNTS_SQL.format(schema="rollup_archive")))
+        finally:
+            bind.exec_driver_sql("DETACH DATABASE rollup_archive")
+    if rows:
+        bind.exec_driver_sql(_UPSERT_SQL, [tuple(row) for row in rows])
+
+
+def upgrade() -> None:
+    op.create_table(
+        "interaction_daily_rollup",
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("time_bucket", sa.String(), nullable=False),
+        sa.Column("response_type", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("date", "category", "time_bucket", "response_type"),
+    )
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table("interaction_daily_rollup")
@@ -0,0 +1,22 @@
+"""Index for keyset pagination of interaction history.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ORDER BY alert_started_at DESC, id DESC with (alert_started_at, id) < (?, ?)
+    op.create_index("ix_interactions_alert_started_at_id", "interactions", ["alert_started_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_interactions_alert_started_at_id", table_name="interactions")
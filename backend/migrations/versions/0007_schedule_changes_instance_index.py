@@ -0,0 +1,22 @@
+"""Index the schedule change log by instance.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Replanning checks each instance for edits; archiving and replanning delete by instance.
+    op.create_index("ix_schedule_changes_schedule_instance_id", "schedule_changes", ["schedule_instance_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_schedule_changes_schedule_instance_id", table_name="schedule_changes")
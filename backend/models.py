@@ -1,6 +1,6 @@
 from datetime import date, datetime, time
 
-from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Integer, String, Time
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, Time
 from sqlalchemy.orm import relationship
 
 from .db import Base
@@ -17,6 +17,15 @@ class Task(Base):
     preferred_time_window = Column(String, nullable=True)
     default_alert_style = Column(String, nullable=False, default="visual_then_alarm")
     enabled = Column(Boolean, nullable=False, default=True)
+    # Compiled form of recurrence_pattern, written whenever the template is saved:
+    # bit N set = applies on weekday N (0 = Monday), plus an optional every-N-days
+    # interval counted from recurrence_anchor.
+    recurrence_mask = Column(Integer, nullable=False, default=127, server_default="127")
+    recurrence_interval_days = Column(Integer, nullable=True)
+    recurrence_anchor = Column(Date, nullable=True)
+    # Parsed preferred_time_window as minutes of the day; both None when unset.
+    window_start_minute = Column(Integer, nullable=True)
+    window_end_minute = Column(Integer, nullable=True)
 
     schedule_instances = relationship(
         "ScheduleInstance",
@@ -24,6 +33,8 @@ class Task(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (Index("ix_tasks_enabled_recurrence_mask", enabled, recurrence_mask),)
+
 
 class ScheduleInstance(Base):
     __tablename__ = "schedule_instances"
@@ -54,9 +65,30 @@ class ScheduleInstance(Base):
         cascade="all, delete-orphan",
     )
 
+    # Matches the "day's non-cancelled instances by start time" reads. AUTOINCREMENT
+    # keeps ids unique across archive files (see ``services.archive``).
+    __table_args__ = (
+        Index("ix_schedule_instances_date_status_start", date, status, planned_start_time),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ScheduleChange(Base):
+    """Append-only log of schedule instance changes; ``id`` doubles as the schedule version."""
+
+    __tablename__ = "schedule_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    schedule_instance_id = Column(Integer, ForeignKey("schedule_instances.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+    change_type = Column(String, nullable=False)  # "upsert" or "remove"
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 
 class SnoozeEvent(Base):
     __tablename__ = "snooze_events"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     schedule_instance_id = Column(Integer, ForeignKey("schedule_instances.id"), nullable=False)
@@ -68,6 +100,7 @@ class SnoozeEvent(Base):
 
 class AcknowledgeEvent(Base):
     __tablename__ = "acknowledge_events"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     schedule_instance_id = Column(Integer, ForeignKey("schedule_instances.id"), nullable=False)
@@ -101,7 +134,6 @@ class Interaction(Base):
         Integer,
         ForeignKey("schedule_instances.id"),
         nullable=False,
-        index=True,
     )
     alert_type = Column(String, nullable=False)
     alert_started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -111,9 +143,29 @@ class Interaction(Base):
 
     schedule_instance = relationship("ScheduleInstance", back_populates="interactions")
 
+    __table_args__ = (
+        # Serves get_latest_interaction; also covers lookups by instance alone.
+        Index(
+            "ix_interactions_instance_latest",
+            schedule_instance_id,
+            alert_started_at.desc(),
+            id.desc(),
+        ),
+        # Keyset pagination of the history, newest first.
+        Index("ix_interactions_alert_started_at_id", alert_started_at, id),
+        # Partial index over still-open alerts for the stale-interaction sweeper.
+        Index(
+            "ix_interactions_open_alert_started_at",
+            alert_started_at,
+            sqlite_where=response_type.is_(None),
+        ),
+        {"sqlite_autoincrement": True},
+    )
+
 
 class InteractionNote(Base):
     __tablename__ = "interaction_notes"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     schedule_instance_id = Column(
@@ -134,3 +186,19 @@ class InteractionNote(Base):
 
     schedule_instance = relationship("ScheduleInstance")
     interaction = relationship("Interaction")
+
+
+class InteractionDailyRollup(Base):
+    """Closed interactions counted per schedule day, category, time of day and response.
+
+    Kept up to date by ``services.rollup`` in the transactions that close
+    interactions, and stays in the main database when history is archived.
+    """
+
+    __tablename__ = "interaction_daily_rollup"
+
+    date = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    time_bucket = Column(String, primary_key=True)
+    response_type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
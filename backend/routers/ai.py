@@ -1,18 +1,27 @@
+import asyncio
 import json
 import logging
 import os
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .. import ai_client
 from .. import models
-from ..db import get_db
+from ..db import get_async_db
 from ..services import ai as ai_service
+from ..services import ai_cache
+from ..services import analytics as analytics_service
+from ..services import archive as archive_service
+from ..services import rollup as rollup_service
 from ..tts import play_text
-from .schedule import get_today_schedule, get_recent_interactions
+from .schedule import load_recent_interactions, load_today_schedule_async
 
 
 logger = logging.getLogger(__name__)
@@ -36,6 +45,35 @@ def _parse_bool_env(value: Optional[str], default: bool) -> bool:
 
 TTS_ENABLED = _parse_bool_env(os.getenv("TTS_ENABLED"), True)
 
+T = TypeVar("T")
+
+
+async def _unless_disconnected(request: Request, work: Awaitable[T]) -> T:
+    """Await ``work``, cancelling it if the client disconnects first.
+
+    Uvicorn keeps running a handler whose client has gone away; cancelling
+    the wait lets a shared AI call (see ``single_flight``) stop once nobody
+    is waiting for it.
+    """
+
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task not in done:
+        # Nobody will read the response; 499 is nginx's "client closed request".
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return task.result()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
 
 class TemplateSuggestion(BaseModel):
     name: str
@@ -104,55 +142,148 @@ class TTSPlayRequest(BaseModel):
 
 
 @router.post("/templates/suggestions", response_model=TemplateSuggestionsResponse)
-async def get_template_suggestions(payload: TemplateSuggestionsRequest) -> TemplateSuggestionsResponse:
+async def get_template_suggestions(
+    payload: TemplateSuggestionsRequest, request: Request
+) -> TemplateSuggestionsResponse:
     """Use DeepSeek to turn a free-text routine description into template suggestions."""
 
     if not payload.free_text.strip():
         raise HTTPException(status_code=400, detail="free_text must not be empty")
 
-    templates_data = await ai_service.generate_template_suggestions(payload.free_text)
+    templates_data = await _unless_disconnected(
+        request, ai_service.generate_template_suggestions(payload.free_text, _is_valid_template)
+    )
 
-    templates: List[TemplateSuggestion] = []
-    for item in templates_data:
-        try:
-            templates.append(TemplateSuggestion(**item))
-        except Exception:
-            # Skip items that don't match the schema
-            continue
+    # Only items that passed _is_valid_template come back, at least one of them.
+    return TemplateSuggestionsResponse(templates=[TemplateSuggestion(**item) for item in templates_data])
+
+
+@router.post("/templates/suggestions/stream")
+async def stream_template_suggestions(payload: TemplateSuggestionsRequest, request: Request) -> StreamingResponse:
+    """Like ``/templates/suggestions``, but send each template as soon as the model has written it.
+
+    The body is NDJSON: one ``{"template": {...}}`` line per template, then
+    ``{"done": <count>}``. Errors before the first template are normal error
+    responses; a failure after it ends the stream with ``{"error": "..."}``.
+    """
+
+    if not payload.free_text.strip():
+        raise HTTPException(status_code=400, detail="free_text must not be empty")
 
-    if not templates:
+    items = ai_service.stream_template_suggestions(payload.free_text, _is_valid_template)
+    first = await _unless_disconnected(request, _next_valid_template(items))
+    if first is None:
         raise HTTPException(status_code=502, detail="AI did not return any valid template suggestions")
 
-    return TemplateSuggestionsResponse(templates=templates)
+    async def body() -> AsyncIterator[bytes]:
+        count = 1
+        yield _ndjson({"template": first.model_dump()})
+        try:
+            while (template := await _next_valid_template(items)) is not None:
+                count += 1
+                yield _ndjson({"template": template.model_dump()})
+        except HTTPException as exc:
+            yield _ndjson({"error": exc.detail})
+            return
+        finally:
+            await items.aclose()
+        yield _ndjson({"done": count})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def _valid_template(item: Any) -> Optional[TemplateSuggestion]:
+    try:
+        return TemplateSuggestion(**item)
+    except Exception:
+        # Skip items that don't match the schema
+        return None
+
+
+def _is_valid_template(item: Any) -> bool:
+    return _valid_template(item) is not None
+
+
+async def _next_valid_template(items: AsyncIterator[Dict[str, Any]]) -> Optional[TemplateSuggestion]:
+    async for item in items:
+        template = _valid_template(item)
+        if template is not None:
+            return template
+    return None
+
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=str) + "\n").encode("utf-8")
 
 
 @router.post("/templates/refine", response_model=TemplateRefineResponse)
-async def refine_template(payload: TemplateRefineRequest) -> TemplateRefineResponse:
+async def refine_template(payload: TemplateRefineRequest, request: Request) -> TemplateRefineResponse:
     """Use DeepSeek to refine a single existing template (PA-031)."""
 
     if payload.template is None:
         raise HTTPException(status_code=400, detail="template is required")
 
+    # Upstream errors (502, 503 while the breaker is open, 504 past the
+    # deadline, 499 on disconnect) pass through with their own status.
+    refined_data = await _unless_disconnected(
+        request,
+        ai_service.refine_template(payload.template.model_dump(), payload.instruction, _is_valid_template),
+    )
     try:
-        refined_data = await ai_service.refine_template(
-            payload.template.model_dump(),
-            payload.instruction,
-        )
         refined = TemplateSuggestion(**refined_data)
-    except Exception as exc:  # noqa: BLE001
+    except (TypeError, ValidationError) as exc:
         raise HTTPException(status_code=502, detail="AI returned invalid template data") from exc
 
     return TemplateRefineResponse(template=refined)
 
 
 @router.get("/now/suggestion", response_model=NowSuggestionResponse)
-async def get_now_suggestion(db: Session = Depends(get_db)) -> NowSuggestionResponse:
+async def get_now_suggestion(request: Request, db: AsyncSession = Depends(get_async_db)) -> NowSuggestionResponse:
     """Provide a short AI hint about what to focus on right now (PA-032)."""
 
-    schedule_items = get_today_schedule(db=db)
-    interactions = get_recent_interactions(limit=30, db=db)
+    suggestion = await _unless_disconnected(request, ai_service.generate_now_suggestion(await _now_context(db)))
+    return NowSuggestionResponse(suggestion=suggestion)
+
 
-    now = datetime.now()
+@router.get("/now/suggestion/stream")
+async def stream_now_suggestion(request: Request, db: AsyncSession = Depends(get_async_db)) -> StreamingResponse:
+    """Like ``/now/suggestion``, but stream the text while the model writes it.
+
+    The body is NDJSON: ``{"delta": "..."}`` lines to append in order, then
+    ``{"suggestion": "..."}`` with the whole text. Errors before the first
+    piece are normal error responses; a failure after it ends the stream with
+    ``{"error": "..."}``.
+    """
+
+    pieces = ai_service.stream_now_suggestion(await _now_context(db))
+    first = await _unless_disconnected(request, anext(pieces, None))
+    if first is None:
+        raise HTTPException(status_code=502, detail="AI response missing 'suggestion' text")
+
+    async def body() -> AsyncIterator[bytes]:
+        text = first
+        yield _ndjson({"delta": first})
+        try:
+            async for piece in pieces:
+                text += piece
+                yield _ndjson({"delta": piece})
+        except HTTPException as exc:
+            yield _ndjson({"error": exc.detail})
+            return
+        finally:
+            await pieces.aclose()
+        yield _ndjson({"suggestion": text.strip()})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+async def _now_context(db: AsyncSession) -> Dict[str, Any]:
+    schedule_items = await load_today_schedule_async(db)
+    interactions = await load_recent_interactions(db, limit=30)
+
+    # Whole minutes, so requests within the same minute (kiosk and phone)
+    # build the same prompt and share one AI call.
+    now = datetime.now().replace(second=0, microsecond=0)
     current_time = now.time()
 
     active_item = None
@@ -200,19 +331,16 @@ async def get_now_suggestion(db: Session = Depends(get_db)) -> NowSuggestionResp
             }
         )
 
-    context = {
+    return {
         "now": now.isoformat(),
         "active_or_paused_task": serialize_schedule_item(banner_item) if banner_item else None,
         "upcoming_tasks": [serialize_schedule_item(it) for it in upcoming_items[:3]],
         "recent_interactions": recent_interactions_payload,
     }
 
-    suggestion = await ai_service.generate_now_suggestion(context)
-    return NowSuggestionResponse(suggestion=suggestion)
-
 
 @router.post("/alerts/wording", response_model=AlertWordingResponse)
-async def get_alert_wording(payload: AlertWordingRequest) -> AlertWordingResponse:
+async def get_alert_wording(payload: AlertWordingRequest, request: Request) -> AlertWordingResponse:
     """Generate short alert text options for a given category and tone (PA-034)."""
 
     category = (payload.category or "").strip()
@@ -234,11 +362,14 @@ async def get_alert_wording(payload: AlertWordingRequest) -> AlertWordingRespons
         count = 5
     count = max(3, min(8, count))
 
-    options = await ai_service.generate_alert_wording(
-        category=category,
-        tone=tone,
-        max_length=max_length,
-        count=count,
+    options = await _unless_disconnected(
+        request,
+        ai_service.generate_alert_wording(
+            category=category,
+            tone=tone,
+            max_length=max_length,
+            count=count,
+        ),
     )
 
     return AlertWordingResponse(options=options)
@@ -247,7 +378,8 @@ async def get_alert_wording(payload: AlertWordingRequest) -> AlertWordingRespons
 @router.post("/history/insights", response_model=HistoryInsightsResponse)
 async def get_history_insights(
     payload: HistoryInsightsRequest,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ) -> HistoryInsightsResponse:
     """Return AI-generated insights on recent interaction history (PA-033).
 
@@ -259,32 +391,19 @@ async def get_history_insights(
     end_date = payload.end_date or today
     start_date = payload.start_date or (end_date - timedelta(days=7))
 
-    # Normalize and clamp range
+    # Normalize and clamp range; the rollup keeps a year cheap.
     if start_date > end_date:
         start_date, end_date = end_date, start_date
-    max_span_days = 60
+    max_span_days = 365
     delta_days = (end_date - start_date).days
     if delta_days > max_span_days:
         start_date = end_date - timedelta(days=max_span_days)
 
-    rows = (
-        db.query(models.Interaction, models.ScheduleInstance, models.Task)
-        .join(
-            models.ScheduleInstance,
-            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
-        )
-        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
-        .filter(models.ScheduleInstance.date >= start_date)
-        .filter(models.ScheduleInstance.date <= end_date)
-        .order_by(
-            models.Interaction.alert_started_at.desc(),
-            models.Interaction.id.desc(),
-        )
-        .limit(1000)
-        .all()
-    )
+    # Counts come from the daily rollup, which also covers archived months.
+    db_result = await db.execute(rollup_service.summary_statement(start_date, end_date))
+    counts = analytics_service.summarize(db_result.all())
 
-    if not rows:
+    if not counts["total_interactions"]:
         return HistoryInsightsResponse(
             insights=[
                 "No interaction history found in the selected date range, so there are no patterns to summarize.",
@@ -292,47 +411,13 @@ async def get_history_insights(
             recommendations=[],
         )
 
-    totals_by_category: dict = {}
-    by_category_and_response: dict = {}
-    by_time_of_day_and_response: dict = {}
-    total_interactions = 0
-
-    def bucket_for_hour(hour: int) -> str:
-        if 5 <= hour < 12:
-            return "morning"
-        if 12 <= hour < 17:
-            return "afternoon"
-        if 17 <= hour < 22:
-            return "evening"
-        return "late_night"
-
-    for interaction, instance, task in rows:
-        total_interactions += 1
-        category = (task.category or "uncategorized").strip() or "uncategorized"
-        response = (interaction.response_type or "none").strip() or "none"
-
-        totals_by_category[category] = totals_by_category.get(category, 0) + 1
-
-        cat_bucket = by_category_and_response.setdefault(category, {})
-        cat_bucket[response] = cat_bucket.get(response, 0) + 1
-
-        ts = interaction.alert_started_at
-        if ts is not None:
-            hour = ts.hour
-            bucket = bucket_for_hour(hour)
-            time_bucket = by_time_of_day_and_response.setdefault(bucket, {})
-            time_bucket[response] = time_bucket.get(response, 0) + 1
-
     summary = {
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
-        "total_interactions": total_interactions,
-        "totals_by_category": totals_by_category,
-        "by_category_and_response": by_category_and_response,
-        "by_time_of_day_and_response": by_time_of_day_and_response,
+        **counts,
     }
 
-    result = await ai_service.summarize_history(summary)
+    result = await _unless_disconnected(request, ai_service.summarize_history(summary))
     insights = result.get("insights") or []
     recommendations = result.get("recommendations") or []
 
@@ -342,7 +427,8 @@ async def get_history_insights(
 @router.post("/notes/summary", response_model=NotesSummaryResponse)
 async def get_notes_summary(
     payload: NotesSummaryRequest,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ) -> NotesSummaryResponse:
     """Return AI-generated summary of skip/snooze notes (PA-035).
 
@@ -362,20 +448,21 @@ async def get_notes_summary(
     if delta_days > max_span_days:
         start_date = end_date - timedelta(days=max_span_days)
 
-    rows = (
-        db.query(models.InteractionNote, models.ScheduleInstance, models.Task)
-        .join(
-            models.ScheduleInstance,
-            models.InteractionNote.schedule_instance_id == models.ScheduleInstance.id,
+    async with archive_service.history_tables_async(db, start_date, end_date) as history:
+        db_result = await db.execute(
+            select(history.notes, history.instances, models.Task)
+            .join(
+                history.instances,
+                history.notes.schedule_instance_id == history.instances.id,
+            )
+            .join(models.Task, history.instances.task_id == models.Task.id)
+            .where(history.instances.date >= start_date)
+            .where(history.instances.date <= end_date)
+            .where(history.notes.note_type.in_(["snooze", "skip"]))
+            .order_by(history.notes.created_at.desc())
+            .limit(500)
         )
-        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
-        .filter(models.ScheduleInstance.date >= start_date)
-        .filter(models.ScheduleInstance.date <= end_date)
-        .filter(models.InteractionNote.note_type.in_(["snooze", "skip"]))
-        .order_by(models.InteractionNote.created_at.desc())
-        .limit(500)
-        .all()
-    )
+        rows = db_result.all()
 
     if not rows:
         return NotesSummaryResponse(
@@ -407,13 +494,27 @@ async def get_notes_summary(
         "notes": notes,
     }
 
-    result = await ai_service.summarize_notes(summary)
+    result = await _unless_disconnected(request, ai_service.summarize_notes(summary))
     patterns = result.get("patterns") or []
     recommendations = result.get("recommendations") or []
 
     return NotesSummaryResponse(patterns=patterns, recommendations=recommendations)
 
 
+@router.get("/cache/stats")
+async def get_cache_stats() -> dict:
+    """Hit/miss/store counters of the AI response cache since startup, per endpoint."""
+
+    return ai_cache.stats()
+
+
+@router.get("/upstream/stats")
+async def get_upstream_stats() -> dict:
+    """Circuit breaker state and retry counters of the AI backend, plus per-endpoint deadlines."""
+
+    return {**ai_client.breaker_stats(), "deadline_seconds": dict(ai_service.DEADLINES)}
+
+
 @router.post("/tts/play", status_code=204)
 async def play_tts(payload: TTSPlayRequest) -> None:
     """Play short coaching text as audio via local TTS on the Pi (PA-040)."""
@@ -429,7 +530,8 @@ async def play_tts(payload: TTSPlayRequest) -> None:
         raise HTTPException(status_code=400, detail="text is required")
 
     try:
-        play_text(text)
+        # Synthesis and cache writes are blocking; keep them off the event loop.
+        await run_in_threadpool(play_text, text)
     except Exception as exc:  # noqa: BLE001
         # Log full details server-side, but return a short generic message to the client.
         logger.exception("TTS playback failed")
@@ -0,0 +1,63 @@
+import tempfile
+from datetime import date
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from .. import jobs
+from ..db import engine
+from ..services import backup as backup_service
+from ..services import etags
+from ..services import events as schedule_events
+from ..services.event_buffer import interaction_buffer
+
+router = APIRouter(prefix="/backup", tags=["backup"])
+
+# Uploads larger than this are spooled to a temporary file instead of memory.
+_UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@router.get("/history")
+def export_history() -> StreamingResponse:
+    """Download all tasks, schedule instances and interaction rows as a compressed backup.
+
+    Streamed chunk by chunk (see ``services.backup`` for the format).
+    """
+
+    interaction_buffer.flush()
+    return StreamingResponse(
+        backup_service.iter_export(engine),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="history-{date.today().isoformat()}.padh"'},
+    )
+
+
+@router.post("/history")
+async def import_history(request: Request) -> Dict[str, int]:
+    """Restore a backup sent as the raw request body; returns rows read per table.
+
+    Only into an empty database; anything else is rejected with 400.
+    """
+
+    with tempfile.SpooledTemporaryFile(max_size=_UPLOAD_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            counts = await run_in_threadpool(_import, upload)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    etags.bump_tasks_version()
+    # Imported templates need their instances on the upcoming days.
+    await run_in_threadpool(jobs.materialize_horizon)
+    schedule_events.publish_refresh("history_imported")
+    return counts
+
+
+def _import(upload) -> Dict[str, int]:
+    # Buffered ids must continue above the imported ones.
+    with interaction_buffer.paused():
+        return backup_service.import_history(engine, upload)
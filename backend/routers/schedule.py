@@ -1,172 +1,31 @@
-from datetime import date, datetime, time, timedelta
-from typing import List, Optional, Tuple
-
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import models, schemas
-from ..db import get_db
+from .. import jobs, models, schemas
+from ..db import SessionLocal, get_db
+from ..services import archive as archive_service
+from ..services import etags
+from ..services import events as schedule_events
 from ..services import interactions as interactions_service
 from ..services import schedule as schedule_service
+from ..services import today_cache
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
+# Seconds between SSE keep-alive comments on an otherwise idle stream.
+STREAM_HEARTBEAT_SECONDS = 15.0
 
-def _task_applies_today(task: models.Task, today: date) -> bool:
-    pattern = (task.recurrence_pattern or "").strip().lower()
-    if not pattern or pattern == "daily":
-        return True
-
-    weekday = today.weekday()  # 0 = Monday
-    if pattern == "weekdays":
-        return weekday < 5
-    if pattern == "weekends":
-        return weekday >= 5
-
-    parts = [p.strip() for p in pattern.split(",") if p.strip()]
-    if parts:
-        abbrev_to_idx = {
-            "mon": 0,
-            "tue": 1,
-            "wed": 2,
-            "thu": 3,
-            "fri": 4,
-            "sat": 5,
-            "sun": 6,
-        }
-        allowed = set()
-        for p in parts:
-            key = p[:3]
-            if key in abbrev_to_idx:
-                allowed.add(abbrev_to_idx[key])
-        if allowed:
-            return weekday in allowed
-
-    # Fallback: treat unrecognized patterns as "daily" for now
-    return True
-
-
-def _parse_preferred_window(raw: Optional[str]) -> Optional[Tuple[time, time]]:
-    """Parse a preferred_time_window string into (start, end).
-
-    Supports common variants such as:
-    - "07:00-11:00"
-    - "07:00 - 11:00"
-    - "1:17 pm - 1:20 pm"
-    - "07:00-11:00 or evenings" (trailing text is ignored)
-    """
-
-    if not raw:
-        return None
-    s = (raw or "").strip()
-    if not s:
-        return None
-
-    # Normalize dashes and split on the first '-'
-    s = s.replace("\u2013", "-")
-    dash_index = s.find("-")
-    if dash_index == -1:
-        return None
-
-    left = s[:dash_index].strip()
-    right = s[dash_index + 1 :].strip()
-    if not left or not right:
-        return None
-
-    def _parse_part(part: str) -> Optional[time]:
-        p = (part or "").strip().lower()
-        if not p:
-            return None
-
-        # Keep only the first couple of tokens to drop trailing notes like "or evenings".
-        tokens = p.split()
-        if not tokens:
-            return None
-        candidate = " ".join(tokens[:2])
-
-        # Try 12-hour clocks with am/pm markers first.
-        if "am" in candidate or "pm" in candidate:
-            for fmt in ("%I:%M %p", "%I %p", "%I:%M%p", "%I%p"):
-                try:
-                    return datetime.strptime(candidate, fmt).time()
-                except ValueError:
-                    continue
-
-        # Fallback to 24-hour style like '7:00' or '07:00' or just '7'.
-        base = tokens[0]
-        for fmt in ("%H:%M", "%H"):
-            try:
-                return datetime.strptime(base, fmt).time()
-            except ValueError:
-                continue
-
-        return None
-
-    start_t = _parse_part(left)
-    end_t = _parse_part(right)
-    if start_t is None or end_t is None:
-        return None
-    if start_t >= end_t:
-        return None
-    return start_t, end_t
-
-
-def _find_slot_in_window(
-    today: date,
-    duration_minutes: int,
-    window: Tuple[time, time],
-    instances: List[models.ScheduleInstance],
-) -> Optional[time]:
-    """Find earliest free slot of given duration fully inside the window.
-
-    The slot must not overlap any existing instances in ``instances`` for ``today``.
-    Returns a planned_start_time or None if no slot fits.
-    """
-
-    if duration_minutes <= 0:
-        return None
-
-    window_start_t, window_end_t = window
-    window_start_dt = datetime.combine(today, window_start_t)
-    window_end_dt = datetime.combine(today, window_end_t)
-    if window_start_dt >= window_end_dt:
-        return None
-
-    duration = timedelta(minutes=duration_minutes)
-
-    intervals: List[Tuple[datetime, datetime]] = []
-    for inst in instances:
-        if inst.date != today:
-            continue
-        start_dt = datetime.combine(today, inst.planned_start_time)
-        end_dt = datetime.combine(today, inst.planned_end_time)
-        intervals.append((start_dt, end_dt))
-
-    intervals.sort(key=lambda pair: pair[0])
-
-    candidate = window_start_dt
-    for start_dt, end_dt in intervals:
-        if end_dt <= window_start_dt:
-            # This interval ends before the window starts; ignore.
-            continue
-        if start_dt >= window_end_dt:
-            # This and all subsequent intervals start after the window.
-            break
-
-        # Is there a gap before this interval?
-        if candidate + duration <= start_dt and candidate + duration <= window_end_dt:
-            return candidate.time()
-
-        # Move candidate past this interval if it overlaps.
-        if candidate < end_dt:
-            candidate = end_dt
-        if candidate >= window_end_dt:
-            break
-
-    # After all intervals, there may still be room at the end of the window.
-    if candidate + duration <= window_end_dt:
-        return candidate.time()
-    return None
+# Widest date range /schedule/range serves in one request.
+MAX_RANGE_DAYS = 62
 
 
 def _get_or_create_alarm_config(db: Session) -> models.AlarmConfig:
@@ -229,176 +88,312 @@ def _update_active_instance(db: Session, today: date) -> None:
     db.commit()
 
 
+def load_today_schedule(db: Session, now: Optional[datetime] = None) -> List[schemas.TodayScheduleItem]:
+    """Build today's schedule with time-derived statuses.
+
+    Instances are materialized ahead of time (see ``schedule_service.materialize_day``),
+    so this never creates or tops up schedule rows itself.
+    """
+
+    now = now or datetime.now()
+    rows = today_cache.get_rows(db, now.date())
+    return [_build_today_item(row, now) for row in rows]
+
+
+async def load_today_schedule_async(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> List[schemas.TodayScheduleItem]:
+    """``load_today_schedule`` for async handlers."""
+
+    now = now or datetime.now()
+    rows = await today_cache.get_rows_async(db, now.date())
+    return [_build_today_item(row, now) for row in rows]
+
+
 @router.get("/today", response_model=List[schemas.TodayScheduleItem])
-def get_today_schedule(db: Session = Depends(get_db)):
-    today = date.today()
+def get_today_schedule(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Return today's schedule, honoring If-None-Match.
 
-    existing = (
-        db.query(models.ScheduleInstance)
-        .filter(models.ScheduleInstance.date == today)
-        .order_by(models.ScheduleInstance.planned_start_time)
-        .all()
+    The ETag is weak: it covers the schedule version and every item's effective
+    status, but not ``remaining_seconds``/``server_now``, which clients tick locally.
+    ``X-Next-Change-At`` carries the next planned start or end boundary (or local
+    midnight), before which the effective statuses cannot change on their own.
+    """
+
+    now = datetime.now()
+    # Read the version before the rows so a concurrent edit can only make the tag stale.
+    version = today_cache.current_version()
+    items = load_today_schedule(db, now)
+
+    etag = etags.make_etag(
+        "today",
+        now.date(),
+        version,
+        *(f"{item.id}:{item.status}" for item in items),
+        weak=True,
+    )
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Next-Change-At": _next_boundary_after(items, now).isoformat(),
+    }
+    if etags.if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return items
+
+
+def _build_today_item(row: today_cache.ScheduleRow, now: datetime) -> schemas.TodayScheduleItem:
+    # Derive effective status from current time for non-cancelled/non-paused tasks.
+    effective_status, remaining_seconds = schedule_service.compute_effective_status_and_remaining(
+        instance=row,
+        now=now,
     )
 
-    if not existing:
-        tasks = (
-            db.query(models.Task)
-            .filter(models.Task.enabled.is_(True))
-            .order_by(models.Task.name)
-            .all()
-        )
-        if not tasks:
-            return []
-
-        start_time = time(hour=9, minute=0)
-        cursor = datetime.combine(today, start_time)
-        instances_for_today: List[models.ScheduleInstance] = []
-
-        for task in tasks:
-            if not _task_applies_today(task, today):
-                continue
-
-            window = _parse_preferred_window(task.preferred_time_window)
-            planned_start: Optional[time] = None
-
-            if window is not None:
-                slot = _find_slot_in_window(
-                    today=today,
-                    duration_minutes=task.default_duration_minutes,
-                    window=window,
-                    instances=instances_for_today,
-                )
-                if slot is not None:
-                    planned_start = slot
-
-            if planned_start is None:
-                # If there was a preferred window but no room, skip scheduling this
-                # template for today instead of placing it outside the window.
-                if window is not None:
-                    continue
+    return schemas.TodayScheduleItem(
+        id=row.id,
+        task_id=row.task_id,
+        task_name=row.task_name,
+        category=row.category,
+        date=row.date,
+        planned_start_time=row.planned_start_time,
+        planned_end_time=row.planned_end_time,
+        status=effective_status,
+        remaining_seconds=remaining_seconds,
+        server_now=now,
+        is_adhoc=row.is_adhoc,
+    )
 
-                planned_start = cursor.time()
-                cursor = cursor + timedelta(minutes=task.default_duration_minutes)
 
-            start_dt = datetime.combine(today, planned_start)
-            end_dt = start_dt + timedelta(minutes=task.default_duration_minutes)
+def _notify_instance_change(instance: models.ScheduleInstance, task: models.Task) -> None:
+    """Invalidate the cached snapshot and push the change to stream subscribers.
 
-            instance = models.ScheduleInstance(
-                task_id=task.id,
-                date=today,
-                planned_start_time=planned_start,
-                planned_end_time=end_dt.time(),
-                status="pending",
-            )
-            db.add(instance)
-            instances_for_today.append(instance)
+    Call after the mutating transaction has committed.
+    """
 
-        db.commit()
-    else:
-        # Top up today's schedule with any newly added enabled tasks that don't yet have
-        # an instance for today. This makes it easier to test new templates without
-        # needing a full regenerate.
-        existing_task_ids = {instance.task_id for instance in existing}
-        tasks = (
-            db.query(models.Task)
-            .filter(models.Task.enabled.is_(True))
-            .order_by(models.Task.name)
-            .all()
-        )
-        if tasks:
-            # Start new tasks after the last planned end time (if any), otherwise 09:00.
-            if existing:
-                last_end_time = max(inst.planned_end_time for inst in existing)
-                cursor = datetime.combine(today, last_end_time)
-            else:
-                cursor = datetime.combine(today, time(hour=9, minute=0))
-
-            instances_for_today: List[models.ScheduleInstance] = list(existing)
-            created_any = False
-            for task in tasks:
-                if not _task_applies_today(task, today):
+    today_cache.bump_version()
+    if instance.date != date.today():
+        return
+    if instance.status == "cancelled":
+        schedule_events.publish_removed([instance.id])
+        return
+    row = today_cache.row_from_models(instance, task)
+    schedule_events.publish_upserted([_build_today_item(row, datetime.now())])
+
+
+def _load_today_snapshot() -> List[schemas.TodayScheduleItem]:
+    db = SessionLocal()
+    try:
+        return load_today_schedule(db)
+    finally:
+        db.close()
+
+
+def _next_boundary_after(items: List[schemas.TodayScheduleItem], now: datetime) -> datetime:
+    """Return the next planned start/end time today, or local midnight if none remain."""
+
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    boundary = midnight
+    current_time = now.time()
+    for item in items:
+        for t in (item.planned_start_time, item.planned_end_time):
+            if t > current_time:
+                candidate = datetime.combine(now.date(), t)
+                if candidate < boundary:
+                    boundary = candidate
+    return boundary
+
+
+def _sse_message(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/today/stream")
+async def stream_today_schedule() -> StreamingResponse:
+    """Server-Sent Events stream of today's schedule.
+
+    Sends a full ``snapshot`` on connect, then ``upsert``/``remove`` events as the
+    schedule is edited. A fresh snapshot is also sent whenever a planned start/end
+    boundary passes so that derived statuses stay correct without client polling.
+    """
+
+    queue = schedule_events.broker.subscribe()
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            items = await run_in_threadpool(_load_today_snapshot)
+            yield _sse_message("snapshot", [item.model_dump(mode="json") for item in items])
+            boundary = _next_boundary_after(items, datetime.now())
+
+            while True:
+                wait_seconds = (boundary - datetime.now()).total_seconds()
+                timeout = max(0.0, min(STREAM_HEARTBEAT_SECONDS, wait_seconds))
+                try:
+                    event: Optional[Dict[str, Any]] = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    event = None
+
+                if event is None and datetime.now() < boundary:
+                    yield ": keep-alive\n\n"
                     continue
-                if task.id in existing_task_ids:
+
+                if event is None or event.get("type") == "refresh":
+                    items = await run_in_threadpool(_load_today_snapshot)
+                    yield _sse_message("snapshot", [item.model_dump(mode="json") for item in items])
+                    boundary = _next_boundary_after(items, datetime.now())
                     continue
 
-                window = _parse_preferred_window(task.preferred_time_window)
-                planned_start: Optional[time] = None
-
-                if window is not None:
-                    slot = _find_slot_in_window(
-                        today=today,
-                        duration_minutes=task.default_duration_minutes,
-                        window=window,
-                        instances=instances_for_today,
-                    )
-                    if slot is not None:
-                        planned_start = slot
-
-                if planned_start is None:
-                    # If there was a preferred window but no room, skip scheduling this
-                    # template for today instead of placing it outside the window.
-                    if window is not None:
-                        continue
-
-                    planned_start = cursor.time()
-                    cursor = cursor + timedelta(minutes=task.default_duration_minutes)
-
-                start_dt = datetime.combine(today, planned_start)
-                end_dt = start_dt + timedelta(minutes=task.default_duration_minutes)
-
-                instance = models.ScheduleInstance(
-                    task_id=task.id,
-                    date=today,
-                    planned_start_time=planned_start,
-                    planned_end_time=end_dt.time(),
-                    status="pending",
-                )
-                db.add(instance)
-                instances_for_today.append(instance)
-                created_any = True
-
-            if created_any:
-                db.commit()
-
-    interactions_service.close_stale_interactions(db)
-
-    rows = (
-        db.query(models.ScheduleInstance, models.Task)
-        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
-        .filter(models.ScheduleInstance.date == today)
-        .filter(models.ScheduleInstance.status != "cancelled")
-        .order_by(models.ScheduleInstance.planned_start_time)
-        .all()
+                yield _sse_message(event["type"], event)
+                if event["type"] == "upsert":
+                    # Edited times may introduce an earlier boundary than the one we track.
+                    edited = [schemas.TodayScheduleItem(**item) for item in event.get("items", [])]
+                    boundary = min(boundary, _next_boundary_after(edited, datetime.now()))
+        finally:
+            schedule_events.broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
+@router.get("/today/changes", response_model=schemas.TodayScheduleChanges)
+def get_today_schedule_changes(
+    since: int = 0,
+    since_time: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """Return only today's instances that changed after schedule version ``since``.
+
+    ``items`` holds the current state of added/updated instances and ``removed``
+    the ids of cancelled ones. Pass back ``version`` as the next ``since``. Passing
+    the previous ``server_now`` as ``since_time`` also returns items whose planned
+    start/end passed in between, so their derived status is refreshed too. When
+    ``reset`` is true (``since`` is 0, unknown to this database or from an earlier
+    day) ``items`` is the full day and the client should drop what it holds.
+    """
+
+    # Read the version first, then the rows straight from the database: rows
+    # read afterwards can only be newer than it. (The today cache is bumped
+    # only after commit, so its rows may still predate ``version``.)
+    version = db.query(func.max(models.ScheduleChange.id)).scalar() or 0
     now = datetime.now()
-    result: List[schemas.TodayScheduleItem] = []
-    for instance, task in rows:
-        # Derive effective status from current time for non-cancelled/non-paused tasks.
-        effective_status, remaining_seconds = schedule_service.compute_effective_status_and_remaining(
-            instance=instance,
-            now=now,
+    today = now.date()
+    items = [_build_today_item(row, now) for row in today_cache.load_rows(db, today)]
+    by_id = {item.id: item for item in items}
+
+    reset = since <= 0 or since > version or _since_before_today(db, since, since_time, now)
+    changed_ids = set()
+    if not reset:
+        changed_ids = {
+            instance_id
+            for (instance_id,) in db.query(models.ScheduleChange.schedule_instance_id)
+            .filter(models.ScheduleChange.id > since)
+            .filter(models.ScheduleChange.date == today)
+            .distinct()
+        }
+        if since_time is not None and since_time.date() == today:
+            after, until = since_time.time(), now.time()
+            for item in items:
+                if any(after < t <= until for t in (item.planned_start_time, item.planned_end_time)):
+                    changed_ids.add(item.id)
+
+    return schemas.TodayScheduleChanges(
+        version=version,
+        date=today,
+        reset=reset,
+        items=items if reset else [by_id[i] for i in sorted(changed_ids) if i in by_id],
+        removed=[] if reset else sorted(i for i in changed_ids if i not in by_id),
+        server_now=now,
+        next_change_at=_next_boundary_after(items, now),
+    )
+
+
+def _since_before_today(db: Session, since: int, since_time: Optional[datetime], now: datetime) -> bool:
+    """Whether the client's state ``since`` may be of an earlier day than ``now``'s.
+
+    ``since_time`` (the previous ``server_now``) says so directly. Without it,
+    the change log tells when version ``since`` was recorded; a version from
+    before midnight (or one pruned from the log) may also be the current
+    version of a client that loaded today, so this errs towards a reset.
+    """
+
+    if since_time is not None:
+        return since_time.date() != now.date()
+    recorded = db.query(models.ScheduleChange.created_at).filter(models.ScheduleChange.id == since).scalar()
+    if recorded is None:
+        return True
+    # created_at is naive UTC.
+    midnight_utc = datetime.combine(now.date(), time.min).astimezone(timezone.utc).replace(tzinfo=None)
+    return recorded < midnight_utc
+
+
+@router.get("/range", response_model=List[schemas.ScheduleRangeItem])
+def get_schedule_range(
+    start: date,
+    end: date,
+    db: Session = Depends(get_db),
+):
+    """Return the materialized plan for ``[start, end]``, e.g. for a week view.
+
+    Days are planned ahead up to ``SCHEDULE_HORIZON_DAYS``; statuses are the stored
+    ones, not derived from the current time. Archived months are read as well.
+    """
+
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start",
+        )
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range must span at most {MAX_RANGE_DAYS} days",
         )
 
-        # Treat tasks created via /adhoc-today (enabled = False) as ad-hoc for display.
-        is_adhoc = not bool(task.enabled)
-
-        result.append(
-            schemas.TodayScheduleItem(
-                id=instance.id,
-                task_id=instance.task_id,
-                task_name=task.name,
-                category=task.category,
-                date=instance.date,
-                planned_start_time=instance.planned_start_time,
-                planned_end_time=instance.planned_end_time,
-                status=effective_status,
-                remaining_seconds=remaining_seconds,
-                server_now=now,
-                is_adhoc=is_adhoc,
+    with archive_service.history_tables(db, start, end) as history:
+        instance = history.instances
+        rows = (
+            db.query(
+                instance.id,
+                instance.task_id,
+                models.Task.name,
+                models.Task.category,
+                instance.date,
+                instance.planned_start_time,
+                instance.planned_end_time,
+                instance.status,
+                models.Task.enabled,
             )
+            .join(models.Task, instance.task_id == models.Task.id)
+            .filter(instance.date >= start)
+            .filter(instance.date <= end)
+            .filter(instance.status != "cancelled")
+            .order_by(instance.date, instance.planned_start_time)
+            .all()
         )
-    return result
+
+    return [
+        schemas.ScheduleRangeItem(
+            id=row.id,
+            task_id=row.task_id,
+            task_name=row.name,
+            category=row.category,
+            date=row.date,
+            planned_start_time=row.planned_start_time,
+            planned_end_time=row.planned_end_time,
+            status=row.status,
+            is_adhoc=not bool(row.enabled),
+        )
+        for row in rows
+    ]
 
 
 @router.post("/adhoc-today", response_model=schemas.TodayScheduleItem)
@@ -450,8 +445,10 @@ def create_adhoc_today_task(
         status="pending",
     )
     db.add(instance)
+    schedule_service.record_change(db, instance)
     db.commit()
     db.refresh(instance)
+    _notify_instance_change(instance, task)
 
     remaining_seconds = None
     if instance.status in ("active", "paused"):
@@ -517,6 +514,8 @@ def create_interaction_note(
         note_type=note_type,
         text=text,
     )
+    db.commit()
+    today_cache.bump_version()
 
     # 204 NO CONTENT
     return None
@@ -547,6 +546,7 @@ def update_schedule_instance(
         )
 
     schedule_service.update_instance_time_and_status(
+        db=db,
         instance=instance,
         task=task,
         planned_start_time=update_in.planned_start_time,
@@ -555,6 +555,7 @@ def update_schedule_instance(
 
     db.commit()
     db.refresh(instance)
+    _notify_instance_change(instance, task)
 
     remaining_seconds = None
     if instance.status in ("active", "paused"):
@@ -583,44 +584,105 @@ def get_recent_interactions(
 ):
     """Return recent interaction history for alerts (PA-014)."""
 
-    # Clamp limit to a reasonable range
-    if limit <= 0:
-        limit = 1
-    if limit > 200:
-        limit = 200
-
-    rows = (
-        db.query(models.Interaction, models.ScheduleInstance, models.Task)
-        .join(
-            models.ScheduleInstance,
-            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
-        )
-        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
-        .order_by(
-            models.Interaction.alert_started_at.desc(),
-            models.Interaction.id.desc(),
-        )
-        .limit(limit)
-        .all()
+    rows = interactions_service.recent_interactions(db, _clamp_history_limit(limit))
+    return [_history_item(interaction, task) for interaction, task in rows]
+
+
+@router.get("/interactions/history", response_model=schemas.InteractionHistoryPage)
+def get_interaction_history(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+):
+    """Page through the whole interaction history, newest first, archives included.
+
+    Pages are keyed on ``(alert_started_at, id)`` of the last row, so they stay
+    cheap however deep the client scrolls.
+    """
+
+    after = _parse_history_cursor(cursor)
+    limit = _clamp_history_limit(limit)
+    items = []
+    last = None
+    for last, interaction, task in interactions_service.iter_history(db, after=after, limit=limit):
+        items.append(_history_item(interaction, task))
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = interactions_service.encode_history_cursor(last)
+    return schemas.InteractionHistoryPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/interactions/history/export")
+def export_interaction_history(cursor: Optional[str] = None) -> StreamingResponse:
+    """Stream the interaction history as NDJSON, one ``InteractionHistoryItem`` per line.
+
+    Rows are read in batches and written as they arrive, so a year of history
+    is exported in constant memory.
+    """
+
+    after = _parse_history_cursor(cursor)
+
+    def lines():
+        # Own session: the response body is produced after the request's dependencies finish.
+        db = SessionLocal()
+        try:
+            for _cursor, interaction, task in interactions_service.iter_history(db, after=after):
+                yield _history_item(interaction, task).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="interaction-history.ndjson"'},
     )
 
-    result: List[schemas.InteractionHistoryItem] = []
-    for interaction, instance, task in rows:
-        result.append(
-            schemas.InteractionHistoryItem(
-                id=interaction.id,
-                schedule_instance_id=interaction.schedule_instance_id,
-                task_name=task.name,
-                category=task.category,
-                alert_type=interaction.alert_type,
-                alert_started_at=interaction.alert_started_at,
-                response_type=interaction.response_type,
-                response_stage=interaction.response_stage,
-                responded_at=interaction.responded_at,
-            )
+
+def _parse_history_cursor(cursor: Optional[str]) -> Optional[interactions_service.HistoryCursor]:
+    if not cursor:
+        return None
+    try:
+        return interactions_service.decode_history_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
         )
 
-    return result
+
+async def load_recent_interactions(
+    db: AsyncSession, limit: int = 50
+) -> List[schemas.InteractionHistoryItem]:
+    """``get_recent_interactions`` for async handlers."""
+
+    rows = await interactions_service.recent_interactions_async(db, _clamp_history_limit(limit))
+    return [_history_item(interaction, task) for interaction, task in rows]
+
+
+def _clamp_history_limit(limit: int) -> int:
+    # Clamp limit to a reasonable range
+    return max(1, min(200, limit))
+
+
+def _history_item(interaction: models.Interaction, task: models.Task) -> schemas.InteractionHistoryItem:
+    return schemas.InteractionHistoryItem(
+        id=interaction.id,
+        schedule_instance_id=interaction.schedule_instance_id,
+        task_name=task.name,
+        category=task.category,
+        alert_type=interaction.alert_type,
+        alert_started_at=interaction.alert_started_at,
+        response_type=interaction.response_type,
+        response_stage=interaction.response_stage,
+        responded_at=interaction.responded_at,
+    )
+
+
+@router.get("/interactions/sweeper", response_model=schemas.StaleSweeperStatus)
+def get_stale_sweeper_status():
+    """Report the last run of the background stale-interaction sweeper."""
+
+    return schemas.StaleSweeperStatus(**jobs.stale_sweeper_stats.__dict__)
 
 
 @router.get("/alarm-config", response_model=schemas.AlarmConfig)
@@ -735,6 +797,8 @@ def start_interaction(
         )
 
     interactions_service.start_interaction(db=db, instance=instance, alert_type=alert_type)
+    db.commit()
+    today_cache.bump_version()
 
 
 @router.post("/instances/{instance_id}/acknowledge", response_model=schemas.TodayScheduleItem)
@@ -764,6 +828,8 @@ def acknowledge_schedule_instance(
         )
 
     interactions_service.record_acknowledge(db=db, instance=instance, stage=stage)
+    db.commit()
+    _notify_instance_change(instance, task)
 
     remaining_seconds = None
     if instance.status in ("active", "paused"):
@@ -818,20 +884,20 @@ def snooze_schedule_instance(
             detail="Task for schedule instance not found",
         )
 
+    # One transaction for the new end time, the snooze event and the response.
     schedule_service.snooze_instance(
+        db=db,
         instance=instance,
         minutes=snooze_in.minutes,
     )
-
-    db.commit()
-    db.refresh(instance)
-
     interactions_service.record_snooze(
         db=db,
         instance=instance,
         minutes=snooze_in.minutes,
         stage=stage,
     )
+    db.commit()
+    _notify_instance_change(instance, task)
 
     remaining_seconds = None
     if instance.status in ("active", "paused"):
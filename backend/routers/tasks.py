@@ -1,26 +1,54 @@
 from typing import List
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..db import get_db
+from ..services import etags
+from ..services import events as schedule_events
+from ..services import schedule as schedule_service
+from ..services import today_cache
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
+def _compile_template_fields(task_in: schemas.TaskBase):
+    """Parse recurrence and preferred window up front so bad input is a 400, not a silent default."""
+
+    try:
+        rule = schedule_service.compile_recurrence(task_in.recurrence_pattern)
+        window = schedule_service.parse_preferred_window(task_in.preferred_time_window)
+        return rule, window
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
 @router.post("/", response_model=schemas.TaskRead, status_code=status.HTTP_201_CREATED)
 def create_task(task_in: schemas.TaskCreate, db: Session = Depends(get_db)):
+    rule, window = _compile_template_fields(task_in)
     task = models.Task(**task_in.model_dump())
+    schedule_service.apply_recurrence(task, rule, date.today())
+    schedule_service.apply_preferred_window(task, window)
     db.add(task)
     db.commit()
     db.refresh(task)
+    etags.bump_tasks_version()
+    schedule_service.apply_template_changes(db, date.today(), task.id)
+    today_cache.bump_version()
+    schedule_events.publish_refresh("task_created")
     return task
 
 
 @router.get("/", response_model=List[schemas.TaskRead])
-def list_tasks(db: Session = Depends(get_db)):
+def list_tasks(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = etags.make_etag("tasks", etags.tasks_version())
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etags.if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
     tasks = (
         db.query(models.Task)
         .filter(models.Task.enabled.is_(True))
@@ -44,11 +72,22 @@ def update_task(task_id: int, task_in: schemas.TaskUpdate, db: Session = Depends
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
+    rule, window = _compile_template_fields(task_in)
+    pattern_changed = task_in.recurrence_pattern != task.recurrence_pattern
     for field, value in task_in.model_dump().items():
         setattr(task, field, value)
+    # Interval rules keep counting from their original anchor unless the pattern changes.
+    anchor = task.recurrence_anchor if task.recurrence_anchor and not pattern_changed else date.today()
+    schedule_service.apply_recurrence(task, rule, anchor)
+    schedule_service.apply_preferred_window(task, window)
+    schedule_service.record_task_change(db, task.id, date.today())
 
     db.commit()
     db.refresh(task)
+    etags.bump_tasks_version()
+    schedule_service.apply_template_changes(db, date.today(), task.id)
+    today_cache.bump_version()
+    schedule_events.publish_refresh("task_updated")
     return task
 
 
@@ -61,15 +100,11 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     # Soft delete: mark as disabled so historical data can remain intact
     task.enabled = False
 
-    today = date.today()
-    instances = (
-        db.query(models.ScheduleInstance)
-        .filter(models.ScheduleInstance.task_id == task_id)
-        .filter(models.ScheduleInstance.date == today)
-        .all()
-    )
-    for instance in instances:
-        instance.status = "cancelled"
+    cancelled_ids = schedule_service.cancel_task_instances(db, task_id, date.today())
 
     db.commit()
+    schedule_service.apply_template_changes(db, date.today(), task_id)
+    etags.bump_tasks_version()
+    today_cache.bump_version()
+    schedule_events.publish_removed(cancelled_ids)
     return None
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Databases created by create_all before migrations existed match this revision.
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "backend" / "migrations"))
+    return config
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Apply pending Alembic migrations in place; called once at startup.
+
+    A database that has tables but no ``alembic_version`` predates migrations. It
+    is stamped at the baseline first, and the later revisions only add what is
+    missing.
+    """
+
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if inspector.has_table("tasks") and not inspector.has_table("alembic_version"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
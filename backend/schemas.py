@@ -1,5 +1,5 @@
 from datetime import date, datetime, time
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -24,6 +24,8 @@ class TaskUpdate(TaskBase):
 
 class TaskRead(TaskBase):
     id: int
+    window_start_minute: Optional[int] = None
+    window_end_minute: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -65,6 +67,28 @@ class TodayScheduleItem(BaseModel):
     is_adhoc: bool = False
 
 
+class ScheduleRangeItem(BaseModel):
+    id: int
+    task_id: int
+    task_name: str
+    category: str
+    date: date
+    planned_start_time: time
+    planned_end_time: time
+    status: str
+    is_adhoc: bool = False
+
+
+class TodayScheduleChanges(BaseModel):
+    version: int
+    date: date
+    reset: bool = False
+    items: List[TodayScheduleItem]
+    removed: List[int]
+    server_now: datetime
+    next_change_at: datetime
+
+
 class SnoozeRequest(BaseModel):
     minutes: int
 
@@ -109,6 +133,23 @@ class InteractionHistoryItem(BaseModel):
     responded_at: Optional[datetime] = None
 
 
+class InteractionHistoryPage(BaseModel):
+    items: List[InteractionHistoryItem]
+    # Pass back as ``cursor`` for the next (older) page; None once history is exhausted.
+    next_cursor: Optional[str] = None
+
+
+class StaleSweeperStatus(BaseModel):
+    interval_seconds: float
+    cutoff_minutes: int
+    runs: int = 0
+    last_run_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_closed: Optional[int] = None
+    total_closed: int = 0
+    last_error: Optional[str] = None
+
+
 class AdhocTodayTaskCreate(BaseModel):
     name: str
     category: str
@@ -1,9 +1,197 @@
 import json
-from typing import Any, Dict, List, Optional
+import os
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, TypeVar
 
 from fastapi import HTTPException
 
-from ..ai_client import call_deepseek
+from .. import ai_client
+from . import ai_cache
+from . import single_flight
+
+
+# Seconds each endpoint may spend on the AI call, retries included (see
+# ``ai_client._with_retries``); AI_DEADLINE_<ENDPOINT>_SECONDS overrides, 0
+# means no deadline beyond the client timeouts. For streams it bounds the
+# wait for the first piece.
+_DEFAULT_DEADLINES = {
+    "templates": 20.0,
+    "refine": 15.0,
+    "now_suggestion": 3.0,
+    "alert_wording": 10.0,
+    "history_insights": 20.0,
+    "notes_summary": 20.0,
+}
+DEADLINES: Dict[str, float] = {
+    endpoint: float(os.getenv(f"AI_DEADLINE_{endpoint.upper()}_SECONDS", str(seconds)))
+    for endpoint, seconds in _DEFAULT_DEADLINES.items()
+}
+
+
+def _deadline(endpoint: str) -> Optional[float]:
+    return DEADLINES.get(endpoint) or None
+
+
+# Identical prompts asked concurrently (kiosk and phone, a double click) share
+# one upstream call; keyed like the cache.
+_in_flight = single_flight.SingleFlight()
+
+
+T = TypeVar("T")
+
+
+class _NoContent(Exception):
+    """A well-formed reply with nothing usable in it; callers fall back to a stock answer."""
+
+
+async def _complete(
+    endpoint: str, messages: List[Dict[str, str]], *, max_tokens: int, parse: Callable[[str], T]
+) -> T:
+    """``parse(call_deepseek(...))`` behind the response cache, with ``endpoint`` picking the TTL.
+
+    A reply is cached only once ``parse`` (the endpoint's own parsing and
+    validation) has accepted it, so a malformed or empty answer is asked
+    again on the next request instead of being served for the whole TTL.
+    """
+
+    key = ai_cache.cache_key(ai_client.AI_MODEL_NAME, messages, max_tokens)
+    cached = await ai_cache.get(endpoint, key)
+    if cached is not None:
+        return parse(cached)
+    return await _in_flight.do(key, lambda: _call_and_store(endpoint, key, messages, max_tokens, parse))
+
+
+async def _call_and_store(
+    endpoint: str, key: str, messages: List[Dict[str, str]], max_tokens: int, parse: Callable[[str], T]
+) -> T:
+    raw = await ai_client.call_deepseek(messages, max_tokens=max_tokens, deadline=_deadline(endpoint))
+    result = parse(raw)
+    await ai_cache.put(endpoint, key, raw)
+    return result
+
+
+async def _stream_complete(
+    endpoint: str, messages: List[Dict[str, str]], *, max_tokens: int, parse: Callable[[str], Any]
+) -> AsyncIterator[str]:
+    """``stream_deepseek`` behind the same cache as ``_complete``; a cached reply is one piece.
+
+    The whole reply is cached at the end of the stream if ``parse`` accepts it.
+    """
+
+    key = ai_cache.cache_key(ai_client.AI_MODEL_NAME, messages, max_tokens)
+    cached = await ai_cache.get(endpoint, key)
+    if cached is not None:
+        yield cached
+        return
+    async for piece in _in_flight.stream(key, lambda: _stream_and_store(endpoint, key, messages, max_tokens, parse)):
+        yield piece
+
+
+async def _stream_and_store(
+    endpoint: str, key: str, messages: List[Dict[str, str]], max_tokens: int, parse: Callable[[str], Any]
+) -> AsyncIterator[str]:
+    pieces: List[str] = []
+    async for piece in ai_client.stream_deepseek(messages, max_tokens=max_tokens, deadline=_deadline(endpoint)):
+        pieces.append(piece)
+        yield piece
+    raw = "".join(pieces)
+    try:
+        parse(raw)
+    except (HTTPException, _NoContent):
+        return
+    await ai_cache.put(endpoint, key, raw)
+
+
+def _parse_json_object(raw: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(_extract_json_object(raw))
+    except ValueError as exc:
+        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=502, detail="AI response is not a JSON object")
+    return data
+
+
+def _text_items(value: Any) -> List[str]:
+    """Non-empty, stripped strings of a JSON list; anything else gives no items."""
+
+    if not isinstance(value, list):
+        return []
+    return [text for text in (str(item).strip() for item in value) if text]
+
+
+class _ArrayItemScanner:
+    """Pick complete objects out of the arrays of a JSON reply while it is still streaming.
+
+    ``feed`` takes the next piece of text and returns the objects it completed
+    inside arrays of the top-level object, e.g. each template of
+    ``{"templates": [{...}, {...}]}`` as soon as its closing brace arrives.
+    Text before the first ``{`` (such as a code fence) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = bool(self._stack)
+            elif char == "{" or (char == "[" and self._stack):
+                if char == "{" and self._stack == ["{", "["]:
+                    self._item = [char]
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if self._item is not None and self._stack == ["{", "["]:
+                    try:
+                        item = json.loads("".join(self._item))
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item = None
+        return items
+
+
+def _partial_string_value(text: str, key: str) -> Optional[str]:
+    """The string value of ``"key": "..."`` in JSON text that may still be cut off mid-value."""
+
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if match is None:
+        return None
+    raw: List[str] = []
+    index = match.end()
+    while index < len(text):
+        char = text[index]
+        if char == '"':
+            break
+        if char == "\\":
+            # Keep escapes whole; a cut-off one waits for the next piece.
+            width = 6 if text[index + 1 : index + 2] == "u" else 2
+            if index + width > len(text):
+                break
+            raw.append(text[index : index + width])
+            index += width
+            continue
+        raw.append(char)
+        index += 1
+    try:
+        return json.loads('"' + "".join(raw) + '"')
+    except ValueError:
+        return None
 
 
 def _extract_json_object(text: str) -> str:
@@ -20,44 +208,92 @@ def _extract_json_object(text: str) -> str:
     return stripped
 
 
-async def generate_template_suggestions(free_text: str) -> List[Dict[str, Any]]:
+def _template_suggestion_messages(free_text: str) -> List[Dict[str, str]]:
     system_prompt = (
         "You are helping design recurring schedule templates for a personal assistant dashboard. "
         "Given a natural language description of how the user wants to structure their days, "
         "propose between 3 and 7 task templates. Each template should have: "
         "name (short, action-oriented), category (e.g. work, health, chores, dog, sleep), "
-        "default_duration_minutes (integer), recurrence_pattern (e.g. daily, weekdays, weekends, or custom), "
-        "preferred_time_window (e.g. '07:00-09:00' or 'evenings'), default_alert_style (one of: "
+        "default_duration_minutes (integer), recurrence_pattern (one of: daily, weekdays, weekends, a comma-separated day list such as "
+        "'mon,wed,fri', or 'every N days'), "
+        "preferred_time_window (a time range such as '07:00-09:00' or '6 pm - 9 pm', or null), default_alert_style (one of: "
         "'visual_then_alarm', 'visual_only', 'alarm_only'), and enabled (boolean). "
         "Respond ONLY with a JSON object of the form {\"templates\":[...]} and no extra text."
     )
     user_prompt = (
         "User description of desired routine:\n" f"{free_text.strip()}\n\n" "Return JSON now."
     )
-    raw = await call_deepseek(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        max_tokens=700,
-    )
-    try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    templates_data = data.get("templates")
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _parse_templates(raw: str, is_valid: Callable[[Any], bool]) -> List[Dict[str, Any]]:
+    templates_data = _parse_json_object(raw).get("templates")
     if not isinstance(templates_data, list):
         raise HTTPException(status_code=502, detail="AI response missing 'templates' list")
-    return templates_data
+    templates = [item for item in templates_data if is_valid(item)]
+    if not templates:
+        raise HTTPException(status_code=502, detail="AI did not return any valid template suggestions")
+    return templates
+
+
+async def generate_template_suggestions(
+    free_text: str, is_valid: Callable[[Any], bool] = lambda item: isinstance(item, dict)
+) -> List[Dict[str, Any]]:
+    """Suggested templates that pass ``is_valid``; a 502 if none does."""
+
+    return await _complete(
+        "templates",
+        _template_suggestion_messages(free_text),
+        max_tokens=700,
+        parse=lambda raw: _parse_templates(raw, is_valid),
+    )
+
+
+async def stream_template_suggestions(
+    free_text: str, is_valid: Callable[[Any], bool] = lambda item: isinstance(item, dict)
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield each suggested template as soon as the model has finished writing it.
 
+    Items are yielded unfiltered; ``is_valid`` decides, like in
+    ``generate_template_suggestions``, whether the reply is worth caching.
+    """
 
-async def refine_template(template: Dict[str, Any], instruction: Optional[str] = None) -> Dict[str, Any]:
+    scanner = _ArrayItemScanner()
+    async for piece in _stream_complete(
+        "templates",
+        _template_suggestion_messages(free_text),
+        max_tokens=700,
+        parse=lambda raw: _parse_templates(raw, is_valid),
+    ):
+        for item in scanner.feed(piece):
+            yield item
+
+
+def _parse_refined_template(raw: str, is_valid: Callable[[Any], bool]) -> Dict[str, Any]:
+    template_data = _parse_json_object(raw).get("template")
+    if not isinstance(template_data, dict):
+        raise HTTPException(status_code=502, detail="AI response missing 'template' object")
+    if not is_valid(template_data):
+        raise HTTPException(status_code=502, detail="AI returned invalid template data")
+    return template_data
+
+
+async def refine_template(
+    template: Dict[str, Any],
+    instruction: Optional[str] = None,
+    is_valid: Callable[[Any], bool] = lambda item: True,
+) -> Dict[str, Any]:
     system_prompt = (
         "You are helping refine a single recurring schedule template for a personal assistant dashboard. "
         "Given the current template fields and an optional user instruction, propose a slightly improved version. "
         "Keep the template broadly similar (same general purpose and category), but you may adjust "
         "default_duration_minutes, recurrence_pattern, preferred_time_window, default_alert_style, and enabled. "
+        "recurrence_pattern must be daily, weekdays, weekends, a comma-separated day list such as "
+        "'mon,wed,fri', or 'every N days'. "
+        "preferred_time_window must be a time range such as '07:00-09:00' or '6 pm - 9 pm', or null. "
         "When the user provides an instruction, you MUST change at least one field versus the original template. "
         "If the user mentions tone (e.g. gentler, firmer, more motivating), interpret this by changing the task name "
         "and/or choosing a different default_alert_style that matches that tone. "
@@ -70,25 +306,18 @@ async def refine_template(template: Dict[str, Any], instruction: Optional[str] =
     if instruction:
         user_parts.append("\nUser instruction for refinement:\n" + instruction.strip())
     user_prompt = "\n".join(user_parts)
-    raw = await call_deepseek(
+    return await _complete(
+        "refine",
         [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
         max_tokens=400,
+        parse=lambda raw: _parse_refined_template(raw, is_valid),
     )
-    try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    template_data = data.get("template")
-    if not isinstance(template_data, dict):
-        raise HTTPException(status_code=502, detail="AI response missing 'template' object")
-    return template_data
 
 
-async def generate_now_suggestion(context: Dict[str, Any]) -> str:
+def _now_suggestion_messages(context: Dict[str, Any]) -> List[Dict[str, str]]:
     system_prompt = (
         "You are a gentle focus assistant helping the user decide what to do right now based on their schedule "
         "and recent behavior. Return a single, concise suggestion (1–2 sentences, maximum about 50 words). "
@@ -100,24 +329,40 @@ async def generate_now_suggestion(context: Dict[str, Any]) -> str:
         + json.dumps(context, default=str)
         + "\n\nBased on this, what should the user focus on right now?"
     )
-    raw = await call_deepseek(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        max_tokens=160,
-    )
-    try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    suggestion = data.get("suggestion")
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _parse_now_suggestion(raw: str) -> str:
+    suggestion = _parse_json_object(raw).get("suggestion")
     if not isinstance(suggestion, str) or not suggestion.strip():
         raise HTTPException(status_code=502, detail="AI response missing 'suggestion' text")
     return suggestion.strip()
 
 
+async def generate_now_suggestion(context: Dict[str, Any]) -> str:
+    return await _complete(
+        "now_suggestion", _now_suggestion_messages(context), max_tokens=160, parse=_parse_now_suggestion
+    )
+
+
+async def stream_now_suggestion(context: Dict[str, Any]) -> AsyncIterator[str]:
+    """Yield the suggestion text piece by piece while the model writes it."""
+
+    text = ""
+    sent = ""
+    async for piece in _stream_complete(
+        "now_suggestion", _now_suggestion_messages(context), max_tokens=160, parse=_parse_now_suggestion
+    ):
+        text += piece
+        value = _partial_string_value(text, "suggestion")
+        if value and value.startswith(sent) and len(value) > len(sent):
+            yield value[len(sent) :]
+            sent = value
+
+
 async def generate_alert_wording(
     category: str,
     tone: str,
@@ -143,31 +388,26 @@ async def generate_alert_wording(
         + str(count)
         + "\n\nReturn JSON now."
     )
-    raw = await call_deepseek(
+
+    def parse(raw: str) -> List[str]:
+        options: List[str] = []
+        for text in _text_items(_parse_json_object(raw).get("options")):
+            if len(text) > max_length:
+                text = text[: max_length - 1].rstrip() + "…"
+            options.append(text)
+        if not options:
+            raise HTTPException(status_code=502, detail="AI did not return any alert text options")
+        return options
+
+    return await _complete(
+        "alert_wording",
         [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
         max_tokens=300,
+        parse=parse,
     )
-    try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    options_raw = data.get("options") or []
-    options: List[str] = []
-    if isinstance(options_raw, list):
-        for item in options_raw:
-            text = str(item).strip()
-            if not text:
-                continue
-            if len(text) > max_length:
-                text = text[: max_length - 1].rstrip() + "…"
-            options.append(text)
-    if not options:
-        raise HTTPException(status_code=502, detail="AI did not return any alert text options")
-    return options
 
 
 async def summarize_history(summary: Dict[str, Any]) -> Dict[str, List[str]]:
@@ -184,37 +424,34 @@ async def summarize_history(summary: Dict[str, Any]) -> Dict[str, List[str]]:
         + json.dumps(summary, default=str)
         + "\n\nPlease infer patterns and suggestions based on this summary."
     )
-    raw = await call_deepseek(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        max_tokens=400,
-    )
     try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    insights_raw = data.get("insights") or []
-    recs_raw = data.get("recommendations") or []
-    insights: List[str] = []
-    recommendations: List[str] = []
-    if isinstance(insights_raw, list):
-        for item in insights_raw:
-            text = str(item).strip()
-            if text:
-                insights.append(text)
-    if isinstance(recs_raw, list):
-        for item in recs_raw:
-            text = str(item).strip()
-            if text:
-                recommendations.append(text)
-    if not insights and not recommendations:
-        insights = [
-            "The AI could not derive clear patterns from the aggregated data, but you can still review your history manually.",
-        ]
-    return {"insights": insights, "recommendations": recommendations}
+        return await _complete(
+            "history_insights",
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            max_tokens=400,
+            parse=lambda raw: _parse_findings(raw, "insights"),
+        )
+    except _NoContent:
+        return {
+            "insights": [
+                "The AI could not derive clear patterns from the aggregated data, but you can still review your history manually.",
+            ],
+            "recommendations": [],
+        }
+
+
+def _parse_findings(raw: str, key: str) -> Dict[str, List[str]]:
+    """``{key: [...], "recommendations": [...]}`` from a reply; ``_NoContent`` if both are empty."""
+
+    data = _parse_json_object(raw)
+    findings = _text_items(data.get(key))
+    recommendations = _text_items(data.get("recommendations"))
+    if not findings and not recommendations:
+        raise _NoContent()
+    return {key: findings, "recommendations": recommendations}
 
 
 async def summarize_notes(summary: Dict[str, Any]) -> Dict[str, List[str]]:
@@ -231,34 +468,20 @@ async def summarize_notes(summary: Dict[str, Any]) -> Dict[str, List[str]]:
         + json.dumps(summary, default=str)
         + "\n\nPlease infer recurring themes and suggest helpful adjustments."
     )
-    raw = await call_deepseek(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        max_tokens=320,
-    )
     try:
-        json_text = _extract_json_object(raw)
-        data = json.loads(json_text)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail="AI response could not be parsed as JSON") from exc
-    patterns_raw = data.get("patterns") or []
-    recs_raw = data.get("recommendations") or []
-    patterns: List[str] = []
-    recommendations: List[str] = []
-    if isinstance(patterns_raw, list):
-        for item in patterns_raw:
-            text = str(item).strip()
-            if text:
-                patterns.append(text)
-    if isinstance(recs_raw, list):
-        for item in recs_raw:
-            text = str(item).strip()
-            if text:
-                recommendations.append(text)
-    if not patterns and not recommendations:
-        patterns = [
-            "The AI could not derive clear patterns from the available notes, but you can still review them manually.",
-        ]
-    return {"patterns": patterns, "recommendations": recommendations}
+        return await _complete(
+            "notes_summary",
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            max_tokens=320,
+            parse=lambda raw: _parse_findings(raw, "patterns"),
+        )
+    except _NoContent:
+        return {
+            "patterns": [
+                "The AI could not derive clear patterns from the available notes, but you can still review them manually.",
+            ],
+            "recommendations": [],
+        }
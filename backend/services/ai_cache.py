@@ -0,0 +1,240 @@
+"""Response cache for AI chat completions.
+
+Replies are keyed by a hash of the model, messages and max_tokens and kept
+for a per-endpoint TTL in two tiers: a small in-process LRU and a SQLite
+file (``AI_CACHE_PATH``) that survives restarts. The file is separate from
+``assistant.db``, so it can be deleted at any time and is not part of
+backups. Failures of the file tier are logged and treated as misses; the
+cache never fails an AI call.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Float, MetaData, String, Table, Text, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from ..db import configure_sqlite, sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() != "false"
+# Empty keeps the cache in memory only.
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "./ai_cache.db")
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "128"))
+AI_CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "2000"))
+
+# Seconds a reply stays valid, per endpoint; AI_CACHE_TTL_<ENDPOINT>_SECONDS
+# overrides, 0 disables caching for that endpoint. The now-suggestion prompt
+# carries the current minute, so identical prompts only come from the same
+# minute and are already shared while in flight.
+_DEFAULT_TTLS = {
+    "templates": 7 * 24 * 3600,
+    "refine": 24 * 3600,
+    "alert_wording": 7 * 24 * 3600,
+    "now_suggestion": 0,
+    "history_insights": 24 * 3600,
+    "notes_summary": 24 * 3600,
+}
+TTLS: Dict[str, int] = {
+    endpoint: int(os.getenv(f"AI_CACHE_TTL_{endpoint.upper()}_SECONDS", str(seconds)))
+    for endpoint, seconds in _DEFAULT_TTLS.items()
+}
+
+_metadata = MetaData()
+ai_responses = Table(
+    "ai_responses",
+    _metadata,
+    Column("key", String, primary_key=True),
+    Column("endpoint", String, nullable=False),
+    Column("response", Text, nullable=False),
+    Column("expires_at", Float, nullable=False),
+    Column("last_used_at", Float, nullable=False, index=True),
+)
+
+_lock = threading.Lock()
+# key -> (expires_at, response), least recently used first.
+_memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_stats: Dict[str, Counter] = {}
+_disk_evictions = 0
+_engine: Optional[AsyncEngine] = None
+_schema_ready = False
+# Created on first use, so it belongs to the running event loop; close() drops it.
+_setup_lock: Optional[asyncio.Lock] = None
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    material = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def ttl_for(endpoint: str) -> int:
+    return TTLS.get(endpoint, 0) if AI_CACHE_ENABLED else 0
+
+
+def _count(endpoint: str, event: str) -> None:
+    with _lock:
+        _stats.setdefault(endpoint, Counter())[event] += 1
+
+
+def _memory_get(key: str, now: float) -> Optional[str]:
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= now:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return response
+
+
+def _memory_put(key: str, response: str, expires_at: float) -> None:
+    with _lock:
+        _memory[key] = (expires_at, response)
+        _memory.move_to_end(key)
+        while len(_memory) > AI_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+async def _disk() -> Optional[AsyncEngine]:
+    global _engine, _schema_ready, _setup_lock
+    if not AI_CACHE_PATH:
+        return None
+    if _schema_ready:
+        return _engine
+    # Concurrent first calls would otherwise all run CREATE TABLE.
+    if _setup_lock is None:
+        _setup_lock = asyncio.Lock()
+    async with _setup_lock:
+        if _engine is None:
+            _engine = create_async_engine(f"sqlite+aiosqlite:///{AI_CACHE_PATH}")
+            configure_sqlite(_engine.sync_engine, sqlite_pragmas())
+        if not _schema_ready:
+            async with _engine.begin() as conn:
+                await conn.run_sync(_metadata.create_all)
+            _schema_ready = True
+    return _engine
+
+
+async def _disk_get(key: str, now: float) -> Optional[Tuple[float, str]]:
+    engine = await _disk()
+    if engine is None:
+        return None
+    async with engine.begin() as conn:
+        row = (
+            await conn.execute(
+                select(ai_responses.c.expires_at, ai_responses.c.response)
+                .where(ai_responses.c.key == key)
+                .where(ai_responses.c.expires_at > now)
+            )
+        ).first()
+        if row is None:
+            return None
+        await conn.execute(
+            update(ai_responses).where(ai_responses.c.key == key).values(last_used_at=now)
+        )
+    return row.expires_at, row.response
+
+
+async def _disk_put(key: str, endpoint: str, response: str, expires_at: float, now: float) -> int:
+    """Store one reply and trim the file to ``AI_CACHE_MAX_ROWS``; return rows evicted."""
+
+    engine = await _disk()
+    if engine is None:
+        return 0
+    values = {"endpoint": endpoint, "response": response, "expires_at": expires_at, "last_used_at": now}
+    statement = sqlite_insert(ai_responses).values(key=key, **values)
+    statement = statement.on_conflict_do_update(index_elements=[ai_responses.c.key], set_=values)
+    async with engine.begin() as conn:
+        await conn.execute(statement)
+        evicted = (await conn.execute(delete(ai_responses).where(ai_responses.c.expires_at <= now))).rowcount
+        excess = (await conn.execute(select(func.count()).select_from(ai_responses))).scalar_one() - AI_CACHE_MAX_ROWS
+        if excess > 0:
+            oldest = select(ai_responses.c.key).order_by(ai_responses.c.last_used_at).limit(excess)
+            evicted += (await conn.execute(delete(ai_responses).where(ai_responses.c.key.in_(oldest)))).rowcount
+    return evicted
+
+
+async def get(endpoint: str, key: str) -> Optional[str]:
+    """Cached reply for ``key``, or None; counts a hit or a miss for ``endpoint``."""
+
+    if ttl_for(endpoint) <= 0:
+        return None
+    now = time.time()
+    response = _memory_get(key, now)
+    if response is not None:
+        _count(endpoint, "memory_hits")
+        return response
+    try:
+        stored = await _disk_get(key, now)
+    except SQLAlchemyError:
+        logger.warning("AI cache read failed", exc_info=True)
+        stored = None
+    if stored is None:
+        _count(endpoint, "misses")
+        return None
+    expires_at, response = stored
+    _memory_put(key, response, expires_at)
+    _count(endpoint, "disk_hits")
+    return response
+
+
+async def put(endpoint: str, key: str, response: str) -> None:
+    global _disk_evictions
+    ttl = ttl_for(endpoint)
+    if ttl <= 0:
+        return
+    now = time.time()
+    _memory_put(key, response, now + ttl)
+    try:
+        evicted = await _disk_put(key, endpoint, response, now + ttl, now)
+    except SQLAlchemyError:
+        logger.warning("AI cache write failed", exc_info=True)
+        return
+    _count(endpoint, "stores")
+    if evicted:
+        with _lock:
+            _disk_evictions += evicted
+
+
+def stats() -> Dict[str, object]:
+    with _lock:
+        endpoints = {endpoint: dict(counter) for endpoint, counter in _stats.items()}
+        memory_entries = len(_memory)
+        disk_evictions = _disk_evictions
+    totals: Counter = Counter()
+    for counter in endpoints.values():
+        totals.update(counter)
+    return {
+        "enabled": AI_CACHE_ENABLED,
+        "memory_entries": memory_entries,
+        "disk_evictions": disk_evictions,
+        "ttl_seconds": dict(TTLS),
+        "totals": dict(totals),
+        "endpoints": endpoints,
+    }
+
+
+async def close() -> None:
+    global _engine, _schema_ready, _setup_lock
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _schema_ready = False
+    _setup_lock = None
@@ -0,0 +1,109 @@
+from datetime import date
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import Integer, Select, Table, case, cast, func, select
+
+from .. import models
+
+
+def time_of_day_bucket(hour: int) -> str:
+    if 5 <= hour < 12:
+        return "morning"
+    if 12 <= hour < 17:
+        return "afternoon"
+    if 17 <= hour < 22:
+        return "evening"
+    return "late_night"
+
+
+def time_of_day_bucket_sql(timestamp):
+    """``time_of_day_bucket`` over a stored DATETIME column."""
+
+    hour = cast(func.strftime("%H", timestamp), Integer)
+    return case(
+        (hour.between(5, 11), "morning"),
+        (hour.between(12, 16), "afternoon"),
+        (hour.between(17, 21), "evening"),
+        else_="late_night",
+    )
+
+
+def label(raw: Optional[str], empty: str) -> str:
+    return (raw or empty).strip() or empty
+
+
+def label_sql(column, empty: str):
+    """``label`` in SQL: NULL or blank becomes ``empty``."""
+
+    return func.coalesce(func.nullif(func.trim(column), ""), empty)
+
+
+def daily_counts_statement(
+    interactions: Table = models.Interaction.__table__,
+    instances: Table = models.ScheduleInstance.__table__,
+) -> Select:
+    """Interactions per schedule day, category, time of day and response type.
+
+    Takes the tables so archived months can be counted the same way.
+    """
+
+    category = label_sql(models.Task.category, "uncategorized")
+    bucket = time_of_day_bucket_sql(interactions.c.alert_started_at)
+    response = label_sql(interactions.c.response_type, "none")
+    return (
+        select(instances.c.date, category, bucket, response, func.count())
+        .select_from(interactions)
+        .join(instances, interactions.c.schedule_instance_id == instances.c.id)
+        .join(models.Task, instances.c.task_id == models.Task.id)
+        .group_by(instances.c.date, category, bucket, response)
+    )
+
+
+def range_counts_statement(start: date, end: date) -> Select:
+    """Interactions of schedule days ``[start, end]`` by category, time of day and response.
+
+    Aggregates the interactions table directly; ``rollup.summary_statement``
+    returns the same rows from the precomputed rollup.
+    """
+
+    category = label_sql(models.Task.category, "uncategorized")
+    bucket = time_of_day_bucket_sql(models.Interaction.alert_started_at)
+    response = label_sql(models.Interaction.response_type, "none")
+    return (
+        select(category, bucket, response, func.count())
+        .select_from(models.Interaction)
+        .join(
+            models.ScheduleInstance,
+            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
+        )
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .where(models.ScheduleInstance.date >= start)
+        .where(models.ScheduleInstance.date <= end)
+        .group_by(category, bucket, response)
+    )
+
+
+def summarize(rows: Iterable) -> Dict[str, Any]:
+    """Fold (category, time bucket, response, count) rows into the totals sent to the AI."""
+
+    totals_by_category: Dict[str, int] = {}
+    by_category_and_response: Dict[str, Dict[str, int]] = {}
+    by_time_of_day_and_response: Dict[str, Dict[str, int]] = {}
+    total_interactions = 0
+
+    for category, bucket, response, count in rows:
+        total_interactions += count
+        totals_by_category[category] = totals_by_category.get(category, 0) + count
+
+        cat_bucket = by_category_and_response.setdefault(category, {})
+        cat_bucket[response] = cat_bucket.get(response, 0) + count
+
+        time_bucket = by_time_of_day_and_response.setdefault(bucket, {})
+        time_bucket[response] = time_bucket.get(response, 0) + count
+
+    return {
+        "total_interactions": total_interactions,
+        "totals_by_category": totals_by_category,
+        "by_category_and_response": by_category_and_response,
+        "by_time_of_day_and_response": by_time_of_day_and_response,
+    }
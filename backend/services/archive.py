@@ -0,0 +1,285 @@
+import logging
+import os
+import re
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Type
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+
+
+logger = logging.getLogger(__name__)
+
+
+# Schedule days older than this many days are moved out of the main database
+# file into one SQLite file per month under ARCHIVE_DIR. 0 disables archiving.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+
+# Everything hanging off a schedule instance moves with it.
+_CHILD_MODELS = (
+    models.Interaction,
+    models.SnoozeEvent,
+    models.AcknowledgeEvent,
+    models.InteractionNote,
+)
+ARCHIVED_MODELS = (models.ScheduleInstance, *_CHILD_MODELS)
+
+_ARCHIVE_FILE = re.compile(r"^assistant-(\d{4})-(\d{2})\.db$")
+
+
+class HistoryTables(NamedTuple):
+    """Entities to query history through: the models, or aliases spanning archives too."""
+
+    instances: Type[models.ScheduleInstance]
+    interactions: Type[models.Interaction]
+    notes: Type[models.InteractionNote]
+
+
+HOT_TABLES = HistoryTables(models.ScheduleInstance, models.Interaction, models.InteractionNote)
+
+
+def archive_cutoff(today: Optional[date] = None) -> Optional[date]:
+    """Days before the returned date belong in the archive (None when disabled)."""
+
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return None
+    return (today or date.today()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def archive_path(month: date) -> Path:
+    return Path(ARCHIVE_DIR) / f"assistant-{month:%Y-%m}.db"
+
+
+def _schema_name(month: date) -> str:
+    return f"archive_{month:%Y_%m}"
+
+
+def archived_months(start: date, end: date) -> List[date]:
+    """Months overlapping ``[start, end]`` that have an archive file."""
+
+    directory = Path(ARCHIVE_DIR)
+    if not directory.is_dir():
+        return []
+    months = []
+    for path in directory.iterdir():
+        match = _ARCHIVE_FILE.match(path.name)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if _month_start(start) <= month <= end:
+            months.append(month)
+    return sorted(months)
+
+
+_archive_metadata = MetaData()
+
+
+def _archive_table(model: Type, schema: str) -> Table:
+    """``model``'s table inside an attached archive; same columns, no foreign keys."""
+
+    key = f"{schema}.{model.__tablename__}"
+    if key in _archive_metadata.tables:
+        return _archive_metadata.tables[key]
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in model.__table__.columns
+    ]
+    table = Table(model.__tablename__, _archive_metadata, *columns, schema=schema)
+    lookup = "date" if model is models.ScheduleInstance else "schedule_instance_id"
+    Index(f"ix_{model.__tablename__}_{lookup}", table.c[lookup])
+    return table
+
+
+def archived_table(model: Type, month: date) -> Table:
+    """``model``'s table in the month's archive, for use while it is attached."""
+
+    return _archive_table(model, _schema_name(month))
+
+
+def _history_tables(months: List[date], include_hot: bool = True) -> HistoryTables:
+    if not months:
+        return HOT_TABLES
+
+    def spanning(model: Type):
+        columns = list(model.__table__.columns)
+        parts = [select(*columns)] if include_hot else []
+        for month in months:
+            archived = archived_table(model, month)
+            parts.append(select(*(archived.c[column.name] for column in columns)))
+        combined = union_all(*parts) if len(parts) > 1 else parts[0]
+        return aliased(model, combined.subquery(), name=model.__tablename__, adapt_on_names=True)
+
+    return HistoryTables(
+        spanning(models.ScheduleInstance),
+        spanning(models.Interaction),
+        spanning(models.InteractionNote),
+    )
+
+
+def _attach_sql(month: date) -> str:
+    return f"ATTACH DATABASE ? AS {_schema_name(month)}"
+
+
+def _detach_sql(month: date) -> str:
+    return f"DETACH DATABASE {_schema_name(month)}"
+
+
+@contextmanager
+def attached(conn: Connection, months: List[date], include_hot: bool = True) -> Iterator[HistoryTables]:
+    """Attach the months' archives to ``conn`` for the block; yields the spanning tables.
+
+    With ``include_hot=False`` the tables cover the archives only.
+    """
+
+    for month in months:
+        conn.exec_driver_sql(_attach_sql(month), (str(archive_path(month)),))
+    try:
+        yield _history_tables(months, include_hot)
+    finally:
+        for month in months:
+            conn.exec_driver_sql(_detach_sql(month))
+
+
+@contextmanager
+def history_tables(db: Session, start: date, end: date) -> Iterator[HistoryTables]:
+    """Attach the archives ``[start, end]`` needs for the block and yield what to query.
+
+    Consume results inside the block and do not commit in it; the archives are
+    detached from the session's connection on exit.
+    """
+
+    months = archived_months(start, end)
+    if not months:
+        yield HOT_TABLES
+        return
+    with attached(db.connection(), months) as tables:
+        yield tables
+
+
+@asynccontextmanager
+async def history_tables_async(db: AsyncSession, start: date, end: date) -> AsyncIterator[HistoryTables]:
+    """``history_tables`` for async handlers."""
+
+    months = archived_months(start, end)
+    if not months:
+        yield HOT_TABLES
+        return
+
+    conn = await db.connection()
+    for month in months:
+        await conn.exec_driver_sql(_attach_sql(month), (str(archive_path(month)),))
+    try:
+        yield _history_tables(months)
+    finally:
+        for month in months:
+            await conn.exec_driver_sql(_detach_sql(month))
+
+
+def _archive_month(engine: Engine, month: date, end: date) -> int:
+    """Move instances dated ``[month, end)`` and their child rows into the month's file."""
+
+    path = archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = _schema_name(month)
+    with engine.connect() as conn:
+        conn.exec_driver_sql(_attach_sql(month), (str(path),))
+        try:
+            tables: Dict[Type, Table] = {model: _archive_table(model, schema) for model in ARCHIVED_MODELS}
+            for table in tables.values():
+                table.create(conn, checkfirst=True)
+            conn.commit()
+
+            instance = models.ScheduleInstance
+            instance_ids = select(instance.id).where(instance.date >= month, instance.date < end)
+            moved = conn.execute(select(func.count()).select_from(instance_ids.subquery())).scalar()
+            # OR IGNORE keeps a re-run idempotent if a previous one stopped half way.
+            for model, table in tables.items():
+                columns = [column.name for column in model.__table__.columns]
+                owned_by = model.id if model is instance else model.schedule_instance_id
+                conn.execute(
+                    insert(table)
+                    .prefix_with("OR IGNORE")
+                    .from_select(columns, select(*model.__table__.columns).where(owned_by.in_(instance_ids)))
+                )
+            conn.execute(
+                delete(models.ScheduleChange).where(models.ScheduleChange.schedule_instance_id.in_(instance_ids))
+            )
+            for model in _CHILD_MODELS:
+                conn.execute(delete(model).where(model.schedule_instance_id.in_(instance_ids)))
+            conn.execute(delete(instance).where(instance.id.in_(instance_ids)))
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql(_detach_sql(month))
+    return moved
+
+
+def archive_cold_history(engine: Engine, today: Optional[date] = None) -> int:
+    """Move schedule days older than the archive horizon out of the main file.
+
+    Runs month by month, one transaction each. The main database is in WAL mode,
+    so a crash between the archive and main commits can leave a month's rows in
+    both files; the next run removes them from the main file.
+    """
+
+    cutoff = archive_cutoff(today)
+    if cutoff is None:
+        return 0
+    with engine.connect() as conn:
+        oldest = conn.execute(
+            select(func.min(models.ScheduleInstance.date)).where(models.ScheduleInstance.date < cutoff)
+        ).scalar()
+    if oldest is None:
+        return 0
+
+    moved = 0
+    month = _month_start(oldest)
+    while month < cutoff:
+        moved += _archive_month(engine, month, min(_next_month(month), cutoff))
+        month = _next_month(month)
+    if moved:
+        logger.info("Archived %s schedule instances dated before %s", moved, cutoff)
+    return moved
+
+
+def _archived_through(engine: Engine, month: date) -> Optional[date]:
+    """Latest schedule day held in the month's archive file."""
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql(_attach_sql(month), (str(archive_path(month)),))
+        try:
+            return conn.execute(select(func.max(archived_table(models.ScheduleInstance, month).c.date))).scalar()
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql(_detach_sql(month))
+
+
+def return_to_archives(engine: Engine) -> int:
+    """Move hot rows dated within an archived month's span back into its file.
+
+    For restored backups, which carry the archived months too. Rows the file
+    already holds (same id) are kept as they are, so nothing ends up counted
+    in both places.
+    """
+
+    moved = 0
+    for month in archived_months(date.min, date.max):
+        last = _archived_through(engine, month)
+        if last is not None:
+            moved += _archive_month(engine, month, last + timedelta(days=1))
+    return moved
@@ -0,0 +1,290 @@
+"""Compact, column-oriented history backups.
+
+A backup file is ``MAGIC`` followed by frames, each a 4-byte big-endian length
+and a zlib-compressed JSON object:
+
+- a header, ``{"format": 1, "tables": {table: [column, ...]}}``;
+- any number of chunks, ``{"table": table, "columns": [[value, ...], ...]}``
+  holding up to ``chunk_rows`` rows as one list per column, in header order;
+- a trailer, ``{"end": {table: rows}}``, so a truncated file is rejected.
+
+Values are copied as SQLite stores them (dates, times and datetimes are
+already text), so neither side pays for type conversion. Storing columns
+together lets zlib fold the repetition in ids, dates and categories.
+
+Imports go into an empty database only: ids are kept as they are, so rows of
+a backup can only be restored where no other history uses them.
+
+Usage (from the project root, with the app stopped for imports):
+
+    python -m backend.services.backup export history.padh
+    python -m backend.services.backup import history.padh
+"""
+
+import argparse
+import json
+import struct
+import sys
+import zlib
+from datetime import date, datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from sqlalchemy import Table, column, exists, insert, literal, select, table, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from .. import models
+from . import archive as archive_service
+from . import rollup as rollup_service
+
+
+MAGIC = b"PADHIST\x01"
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_ROWS = 10_000
+# Fastest zlib level: on the Pi, level 6 nearly doubles export time for a
+# file only about a quarter smaller.
+COMPRESS_LEVEL = 1
+
+# Parents before children, so a restore satisfies foreign keys as it goes.
+BACKUP_MODELS = (
+    models.Task,
+    models.ScheduleInstance,
+    models.Interaction,
+    models.SnoozeEvent,
+    models.AcknowledgeEvent,
+    models.InteractionNote,
+)
+_MODELS_BY_TABLE = {model.__tablename__: model for model in BACKUP_MODELS}
+
+_frame_length = struct.Struct(">I")
+
+
+def _frame(payload: Dict[str, Any]) -> bytes:
+    body = zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), COMPRESS_LEVEL)
+    return _frame_length.pack(len(body)) + body
+
+
+def _read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    prefix = stream.read(_frame_length.size)
+    if not prefix:
+        return None
+    if len(prefix) < _frame_length.size:
+        raise ValueError("Backup file is truncated")
+    (length,) = _frame_length.unpack(prefix)
+    body = stream.read(length)
+    if len(body) < length:
+        raise ValueError("Backup file is truncated")
+    try:
+        return json.loads(zlib.decompress(body))
+    except (zlib.error, ValueError) as exc:
+        raise ValueError("Backup file is corrupt") from exc
+
+
+def _table_chunks(conn: Connection, table: Table, chunk_rows: int) -> Iterator[List[List[Any]]]:
+    # Untyped columns skip SQLAlchemy's result processing: rows come back raw.
+    statement = select(*(column(name) for name in table.columns.keys())).select_from(table)
+    result = conn.execution_options(yield_per=chunk_rows).execute(statement)
+    try:
+        for rows in result.partitions():
+            yield [list(values) for values in zip(*rows)]
+    finally:
+        result.close()
+
+
+def iter_export(engine: Engine, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Yield the backup file of all history, archived months included, frame by frame.
+
+    At most ``chunk_rows`` rows are held at a time.
+    """
+
+    yield MAGIC
+    yield _frame(
+        {
+            "format": FORMAT_VERSION,
+            "tables": {
+                model.__tablename__: [column.name for column in model.__table__.columns]
+                for model in BACKUP_MODELS
+            },
+        }
+    )
+    counts = {model.__tablename__: 0 for model in BACKUP_MODELS}
+    months = archive_service.archived_months(date.min, date.max)
+    with engine.connect() as conn:
+        for model in BACKUP_MODELS:
+            name = model.__tablename__
+            for columns in _table_chunks(conn, model.__table__, chunk_rows):
+                counts[name] += len(columns[0])
+                yield _frame({"table": name, "columns": columns})
+            if model not in archive_service.ARCHIVED_MODELS:
+                continue
+            for month in months:
+                with archive_service.attached(conn, [month], include_hot=False):
+                    archived = archive_service.archived_table(model, month)
+                    for columns in _table_chunks(conn, archived, chunk_rows):
+                        counts[name] += len(columns[0])
+                        yield _frame({"table": name, "columns": columns})
+    yield _frame({"end": counts})
+
+
+def export_history(engine: Engine, out: BinaryIO, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    for piece in iter_export(engine, chunk_rows):
+        out.write(piece)
+
+
+def _drop_indexes(conn: Connection, tables: List[str]) -> List[str]:
+    """Drop the secondary indexes of ``tables``; return the DDL that recreates them.
+
+    Building an index once after a bulk load is much cheaper than updating it
+    row by row. Index DDL is transactional in SQLite, so a failed import
+    brings them back with its rollback.
+    """
+
+    rows = conn.execute(
+        select(column("name"), column("sql"))
+        .select_from(table("sqlite_master"))
+        .where(column("type") == "index")
+        .where(column("tbl_name").in_(tables))
+        # Automatic (primary key / unique) indexes have no SQL and cannot be dropped.
+        .where(column("sql").is_not(None))
+    ).all()
+    for name, _ddl in rows:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    return [ddl for _name, ddl in rows]
+
+
+def _existing_history(conn: Connection) -> List[str]:
+    """Backed-up tables that already hold rows, plus "archive" if any month is archived."""
+
+    found = [
+        model.__tablename__
+        for model in BACKUP_MODELS
+        if conn.execute(select(exists().select_from(model.__table__))).scalar()
+    ]
+    if archive_service.archived_months(date.min, date.max):
+        found.append("archive")
+    return found
+
+
+def _log_restored_instances(conn: Connection, today: date) -> None:
+    """Log restored instances from ``today`` on as created and then edited.
+
+    The backup has no change log, so there is no telling which of them a user
+    edited; treating them all as edited keeps template replanning from
+    replacing what was restored.
+    """
+
+    instance = models.ScheduleInstance.__table__
+    logged = select(
+        instance.c.id,
+        instance.c.date,
+        literal("upsert"),
+        literal(datetime.utcnow(), models.ScheduleChange.created_at.type),
+    ).where(instance.c.date >= today)
+    changes = models.ScheduleChange.__table__
+    conn.execute(
+        insert(changes).from_select(
+            ["schedule_instance_id", "date", "change_type", "created_at"],
+            union_all(logged, logged),
+        )
+    )
+
+
+def import_history(engine: Engine, stream: BinaryIO) -> Dict[str, int]:
+    """Restore a backup into an empty database; returns rows read per table.
+
+    Everything is inserted in one transaction with one driver-level
+    executemany per chunk; a database that already has history, or a
+    malformed, truncated or self-conflicting file, raises ValueError and
+    leaves the database untouched. Restored instances from today on get
+    change-log rows (see ``_log_restored_instances``). Rows of archived months
+    then go back to their archive files, and the interaction rollup is
+    recounted over both.
+    """
+
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a history backup file")
+    header = _read_frame(stream)
+    if not header or header.get("format") != FORMAT_VERSION or not isinstance(header.get("tables"), dict):
+        raise ValueError("Unsupported backup format")
+
+    inserts: Dict[str, str] = {}
+    for name, column_names in header["tables"].items():
+        model = _MODELS_BY_TABLE.get(name)
+        if model is None:
+            raise ValueError(f"Unknown table in backup: {name}")
+        unknown = set(column_names) - set(model.__table__.columns.keys())
+        if unknown:
+            raise ValueError(f"Unknown column in backup: {name}.{sorted(unknown)[0]}")
+        inserts[name] = "INSERT INTO {} ({}) VALUES ({})".format(
+            name, ", ".join(column_names), ", ".join("?" * len(column_names))
+        )
+
+    counts = {name: 0 for name in inserts}
+    with engine.begin() as conn:
+        existing = _existing_history(conn)
+        if existing:
+            raise ValueError(
+                "Database already has history ({}); restore into an empty database".format(", ".join(existing))
+            )
+        indexes = _drop_indexes(conn, list(inserts))
+        while True:
+            frame = _read_frame(stream)
+            if frame is None:
+                raise ValueError("Backup file is truncated")
+            if "end" in frame:
+                if frame["end"] != counts:
+                    raise ValueError("Backup file row counts do not match its trailer")
+                break
+            name = frame.get("table")
+            columns = frame.get("columns")
+            if name not in inserts or not isinstance(columns, list):
+                raise ValueError("Backup file is corrupt")
+            rows = list(zip(*columns))
+            try:
+                conn.exec_driver_sql(inserts[name], rows)
+            except DBAPIError as exc:
+                raise ValueError(f"Backup file has invalid {name} rows") from exc
+            counts[name] += len(rows)
+        for ddl in indexes:
+            conn.exec_driver_sql(ddl)
+        _log_restored_instances(conn, date.today())
+
+    archive_service.return_to_archives(engine)
+    with engine.begin() as conn:
+        rollup_service.rebuild(conn)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import the schedule and interaction history.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="backup file; '-' for stdout/stdin")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    from ..db import engine
+    from ..schema_upgrades import upgrade_schema
+
+    upgrade_schema(engine)
+    if args.command == "export":
+        if args.path == "-":
+            export_history(engine, sys.stdout.buffer, args.chunk_rows)
+        else:
+            with open(args.path, "wb") as out:
+                export_history(engine, out, args.chunk_rows)
+        return
+
+    try:
+        if args.path == "-":
+            counts = import_history(engine, sys.stdin.buffer)
+        else:
+            with open(args.path, "rb") as stream:
+                counts = import_history(engine, stream)
+    except ValueError as exc:
+        parser.exit(1, f"{exc}\n")
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
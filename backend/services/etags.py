@@ -0,0 +1,52 @@
+import hashlib
+import threading
+import uuid
+from typing import Optional
+
+# Bump when the JSON shape of an endpoint that serves ETags changes.
+SCHEMA_VERSION = 1
+
+# Data versions live in process memory and restart at zero, so every tag also
+# carries an id for this process to avoid matching a tag from a previous run.
+BOOT_ID = uuid.uuid4().hex
+
+_lock = threading.Lock()
+_tasks_version = 0
+
+
+def tasks_version() -> int:
+    return _tasks_version
+
+
+def bump_tasks_version() -> int:
+    """Record that the template list may have changed. Call after committing."""
+
+    global _tasks_version
+    with _lock:
+        _tasks_version += 1
+        return _tasks_version
+
+
+def make_etag(*parts: object, weak: bool = False) -> str:
+    source = "|".join(str(part) for part in (SCHEMA_VERSION, BOOT_ID) + parts)
+    tag = '"' + hashlib.sha1(source.encode("utf-8")).hexdigest()[:20] + '"'
+    return f"W/{tag}" if weak else tag
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Return True when an If-None-Match header matches ``etag``.
+
+    Uses the weak comparison RFC 9110 requires for If-None-Match.
+    """
+
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    wanted = opaque(etag)
+    return any(opaque(candidate) == wanted for candidate in header.split(","))
@@ -0,0 +1,408 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from sqlalchemy import DateTime, event, func, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import DATABASE_URL
+from ..db import engine as app_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def _default_journal_path() -> str:
+    # Next to the database file, so recovery finds the journal wherever the app is started from.
+    database = make_url(DATABASE_URL).database
+    if not database or database == ":memory:":
+        return "./interaction_events.journal"
+    return str(Path(database).parent / "interaction_events.journal")
+
+
+# Buffered events are written to SQLite every INTERACTION_FLUSH_INTERVAL_MS, or
+# sooner once INTERACTION_FLUSH_MAX_EVENTS are waiting.
+INTERACTION_FLUSH_INTERVAL_MS = int(os.getenv("INTERACTION_FLUSH_INTERVAL_MS", "500"))
+INTERACTION_FLUSH_MAX_EVENTS = int(os.getenv("INTERACTION_FLUSH_MAX_EVENTS", "50"))
+# Defaults to interaction_events.journal in the database file's directory.
+INTERACTION_JOURNAL_PATH = os.getenv("INTERACTION_JOURNAL_PATH") or _default_journal_path()
+# fsync the journal after each commit's events are appended, so they also survive
+# a power cut, not just a crash. Commits appending while an fsync runs share the next.
+INTERACTION_JOURNAL_FSYNC = os.getenv("INTERACTION_JOURNAL_FSYNC", "true").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# Flushed in this order so notes land after the interactions they reference.
+BUFFERED_MODELS = (
+    models.Interaction,
+    models.AcknowledgeEvent,
+    models.SnoozeEvent,
+    models.InteractionNote,
+)
+_MODELS_BY_TABLE: Dict[str, Type] = {model.__tablename__: model for model in BUFFERED_MODELS}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+
+def _decode_row(model: Type, row: Dict[str, Any]) -> Dict[str, Any]:
+    for column in model.__table__.columns:
+        value = row.get(column.name)
+        if isinstance(value, str) and isinstance(column.type, DateTime):
+            row[column.name] = datetime.fromisoformat(value)
+    return row
+
+
+def _sequence(conn: Connection, table: str) -> int:
+    """AUTOINCREMENT high-water mark; unlike max(id) it survives archiving the newest rows."""
+
+    if conn.dialect.name != "sqlite":
+        return 0
+    seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": table}).scalar()
+    return seq or 0
+
+
+class InteractionEventBuffer:
+    """Write-behind buffer for append-only interaction rows.
+
+    While a flusher is attached (see ``jobs.run_interaction_flusher``), new
+    interactions, acknowledge/snooze events and notes get ids from an in-memory
+    counter and are staged on the caller's session. When that session commits
+    they are appended to a journal file and wait for the next batched insert; a
+    rollback drops them along with the rest of the transaction. The journal is
+    replayed on the next start if the process dies before the insert. Without a
+    flusher (scripts, benchmarks) ``add`` is a plain ``db.add`` in the caller's
+    transaction.
+
+    Ids are allocated in-process, so only one app process may write to a database.
+    """
+
+    def __init__(self, engine: Engine, journal_path: str, max_events: int, fsync: bool = True) -> None:
+        self._engine = engine
+        self._journal_path = journal_path
+        self._max_events = max_events
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Dict[int, Dict[str, Any]]] = {table: {} for table in _MODELS_BY_TABLE}
+        self._next_ids: Optional[Dict[str, int]] = None
+        # Buffered rows with an update staged on a session: not flushed until it ends.
+        self._held: Counter = Counter()
+        self._journal = None
+        self._wakeup: Optional[Callable[[], None]] = None
+        # Group commit: commits appended so far, and how many of them are fsynced.
+        self._sync_lock = threading.Lock()
+        self._appended = 0
+        self._synced = 0
+
+    @property
+    def buffering(self) -> bool:
+        return self._wakeup is not None
+
+    def attach(self, wakeup: Callable[[], None]) -> None:
+        """Start buffering; ``wakeup`` is called (from any thread) when a batch is full."""
+
+        with self._lock:
+            self._open()
+            self._wakeup = wakeup
+
+    def detach(self) -> None:
+        with self._lock:
+            self._wakeup = None
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(rows) for rows in self._pending.values())
+
+    def add(self, db: Session, model: Type, **values: Any) -> None:
+        """Record a new ``model`` row with ``db``'s transaction: buffered when a flusher runs."""
+
+        with self._lock:
+            if not self.buffering:
+                db.add(model(**values))
+                return
+
+            table = model.__tablename__
+            row_id = self._next_ids[table]
+            self._next_ids[table] = row_id + 1
+            row = {"id": row_id, **values}
+            # Every row carries every column so a batch is a single executemany.
+            for column in model.__table__.columns:
+                if column.name in row:
+                    continue
+                default = column.default
+                if default is None:
+                    row[column.name] = None
+                else:
+                    row[column.name] = default.arg(None) if default.is_callable else default.arg
+            self._staged(db).append((table, row, False))
+
+    def update(self, db: Session, model: Type, row_id: int, **values: Any) -> bool:
+        """Update a row that is still buffered, with ``db``'s transaction.
+
+        False if the row is (now) in the database; update it through ``db`` then.
+        Otherwise the row stays buffered until ``db`` commits or rolls back.
+        """
+
+        table = model.__tablename__
+        for entry_table, row, _is_update in db.info.get(self, []):
+            if entry_table == table and row["id"] == row_id:
+                row.update(values)
+                return True
+        with self._lock:
+            if row_id not in self._pending[table]:
+                return False
+            self._held[table, row_id] += 1
+        self._staged(db).append((table, {"id": row_id, **values}, True))
+        return True
+
+    def latest_interaction(self, db: Session, instance_id: int) -> Optional[models.Interaction]:
+        """Newest buffered interaction for the instance, as a detached ``Interaction``.
+
+        Includes the ones staged on ``db``.
+        """
+
+        table = models.Interaction.__tablename__
+        with self._lock:
+            rows = [
+                row
+                for row in self._pending[table].values()
+                if row["schedule_instance_id"] == instance_id
+            ]
+        for entry_table, row, is_update in db.info.get(self, []):
+            if entry_table != table:
+                continue
+            if is_update:
+                rows = [{**other, **row} if other["id"] == row["id"] else other for other in rows]
+            elif row["schedule_instance_id"] == instance_id:
+                rows.append(row)
+        if not rows:
+            return None
+        return models.Interaction(**max(rows, key=lambda row: (row["alert_started_at"], row["id"])))
+
+    def pending_interactions(self) -> List[models.Interaction]:
+        """Buffered (committed) interactions as detached ``Interaction`` objects, for readers to merge."""
+
+        with self._lock:
+            rows = list(self._pending[models.Interaction.__tablename__].values())
+        return [models.Interaction(**row) for row in rows]
+
+    def flush(self) -> int:
+        """Insert what is buffered in one transaction and reset the journal.
+
+        Rows an uncommitted session is updating stay buffered.
+        """
+
+        with self._lock:
+            return self._insert_pending(ignore_existing=False)
+
+    def recover(self) -> int:
+        """Replay a journal left by a previous process into the database."""
+
+        with self._lock:
+            self._open()
+            # Rows committed just before a crash are still in the journal.
+            count = self._insert_pending(ignore_existing=True)
+            if count:
+                logger.info("Recovered %s buffered interaction events from %s", count, self._journal_path)
+            return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._wakeup = None
+            # Everything, held rows too: their sessions write their updates through.
+            self._insert_pending(ignore_existing=False, keep_held=False)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._next_ids = None
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Hold new events back while rows are written around the buffer (e.g. an import).
+
+        Everything buffered is flushed first; afterwards ids continue above
+        whatever the block inserted. ``add`` calls wait until the block exits.
+        """
+
+        with self._lock:
+            self.flush()
+            try:
+                yield
+            finally:
+                if self._next_ids is not None:
+                    self._seed_ids()
+
+    def _open(self) -> None:
+        if self._next_ids is not None:
+            return
+        self._replay_journal()
+        self._seed_ids()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def _seed_ids(self) -> None:
+        # Never below ids already handed out: some may still be staged on a session.
+        handed_out = self._next_ids or {}
+        with self._engine.connect() as conn:
+            next_ids = {}
+            for table, model in _MODELS_BY_TABLE.items():
+                db_max = conn.execute(select(func.max(model.id))).scalar() or 0
+                next_ids[table] = max(
+                    [db_max + 1, _sequence(conn, table) + 1, handed_out.get(table, 1)]
+                    + [row_id + 1 for row_id in self._pending[table]]
+                )
+            self._next_ids = next_ids
+
+    def _replay_journal(self) -> None:
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, encoding="utf-8") as journal:
+            for line_number, line in enumerate(journal, start=1):
+                try:
+                    entry = json.loads(line)
+                    model = _MODELS_BY_TABLE[entry["table"]]
+                except (ValueError, KeyError):
+                    # A torn final line from a crash mid-write; earlier lines are intact.
+                    logger.warning("Skipping unreadable journal line %s", line_number)
+                    continue
+                row = _decode_row(model, entry["row"])
+                self._pending[entry["table"]][row["id"]] = row
+
+    def _staged(self, db: Session) -> List[Tuple[str, Dict[str, Any], bool]]:
+        """Rows (table, row, is_update) waiting for ``db`` to commit."""
+
+        staged = db.info.get(self)
+        if staged is None:
+            staged = db.info[self] = []
+            # Listen on the session itself, so no hook outlives it (or the buffer).
+            if not event.contains(db, "after_commit", self._after_commit):
+                event.listen(db, "after_commit", self._after_commit)
+                event.listen(db, "after_rollback", self._after_rollback)
+            # Begin its transaction, so a rollback or close without commit ends it too.
+            db.connection()
+        return staged
+
+    def _release(self, staged: List[Tuple[str, Dict[str, Any], bool]]) -> None:
+        for table, row, is_update in staged:
+            if is_update:
+                key = (table, row["id"])
+                self._held[key] -= 1
+                if self._held[key] <= 0:
+                    del self._held[key]
+
+    def _after_rollback(self, session: Session) -> None:
+        staged = session.info.pop(self, None)
+        if staged:
+            with self._lock:
+                self._release(staged)
+
+    def _after_commit(self, session: Session) -> None:
+        staged = session.info.pop(self, None)
+        if not staged:
+            return
+        with self._lock:
+            self._release(staged)
+            if self._journal is None:
+                # Closed (shut down) since these were staged: write them straight through.
+                self._write_through(staged)
+                return
+            lines = []
+            for table, row, is_update in staged:
+                if is_update:
+                    # Held since ``update``, so still buffered.
+                    row = {**self._pending[table][row["id"]], **row}
+                lines.append(json.dumps({"table": table, "row": row}, default=_encode) + "\n")
+                self._pending[table][row["id"]] = row
+            if lines:
+                self._journal.write("".join(lines))
+                self._journal.flush()
+                self._appended += 1
+            appended = self._appended
+            full = sum(len(rows) for rows in self._pending.values()) >= self._max_events
+            wakeup = self._wakeup
+        if lines and self._fsync:
+            self._sync_journal(appended)
+        if full and wakeup is not None:
+            wakeup()
+
+    def _write_through(self, staged: List[Tuple[str, Dict[str, Any], bool]]) -> None:
+        """Write staged rows to the database directly, in one transaction."""
+
+        with self._engine.begin() as conn:
+            for model in BUFFERED_MODELS:
+                table = model.__tablename__
+                rows = [row for entry_table, row, is_update in staged if entry_table == table and not is_update]
+                if rows:
+                    conn.execute(insert(model), rows)
+                for entry_table, row, is_update in staged:
+                    if entry_table == table and is_update:
+                        values = {name: value for name, value in row.items() if name != "id"}
+                        conn.execute(update(model).where(model.id == row["id"]).values(**values))
+
+    def _sync_journal(self, appended: int) -> None:
+        """fsync the journal unless an fsync since append number ``appended`` covered it."""
+
+        with self._sync_lock:
+            if self._synced >= appended:
+                return
+            with self._lock:
+                if self._journal is None:
+                    return
+                covered = self._appended
+                fileno = self._journal.fileno()
+            os.fsync(fileno)
+            self._synced = covered
+
+    def _insert_pending(self, ignore_existing: bool, keep_held: bool = True) -> int:
+        """Insert the buffered rows (but held ones with ``keep_held``); returns rows inserted."""
+
+        batches = {
+            table: [row for row_id, row in rows.items() if not (keep_held and (table, row_id) in self._held)]
+            for table, rows in self._pending.items()
+        }
+        count = sum(len(rows) for rows in batches.values())
+        if not count:
+            return 0
+        with self._engine.begin() as conn:
+            for model in BUFFERED_MODELS:
+                rows = batches[model.__tablename__]
+                if not rows:
+                    continue
+                statement = insert(model)
+                if ignore_existing:
+                    statement = statement.prefix_with("OR IGNORE")
+                conn.execute(statement, rows)
+        for table, rows in batches.items():
+            for row in rows:
+                del self._pending[table][row["id"]]
+        if self._journal is not None:
+            self._journal.seek(0)
+            self._journal.truncate()
+            # Held rows are still only in the buffer.
+            for table, rows in self._pending.items():
+                for row in rows.values():
+                    self._journal.write(json.dumps({"table": table, "row": row}, default=_encode) + "\n")
+            self._journal.flush()
+            if self._fsync:
+                os.fsync(self._journal.fileno())
+        return count
+
+
+interaction_buffer = InteractionEventBuffer(
+    app_engine,
+    INTERACTION_JOURNAL_PATH,
+    INTERACTION_FLUSH_MAX_EVENTS,
+    fsync=INTERACTION_JOURNAL_FSYNC,
+)
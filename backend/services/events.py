@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .. import schemas
+
+
+class ScheduleEventBroker:
+    """Fan out today's schedule changes to connected stream clients.
+
+    Mutating routes run in FastAPI's threadpool, so ``publish`` is thread-safe and
+    hands each event to the subscriber's own event loop. Subscribers that fall too
+    far behind have their backlog replaced by a single "refresh" event, which makes
+    the stream resend a full snapshot instead of growing without bound.
+    """
+
+    def __init__(self, max_queue_size: int = 100) -> None:
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[queue] = loop
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it will unsubscribe on exit.
+                continue
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "refresh"})
+
+
+broker = ScheduleEventBroker()
+
+
+def publish_upserted(items: Iterable[schemas.TodayScheduleItem]) -> None:
+    payload: List[Dict[str, Any]] = [item.model_dump(mode="json") for item in items]
+    if payload:
+        broker.publish({"type": "upsert", "items": payload})
+
+
+def publish_removed(instance_ids: Iterable[int]) -> None:
+    ids = [int(instance_id) for instance_id in instance_ids]
+    if ids:
+        broker.publish({"type": "remove", "ids": ids})
+
+
+def publish_refresh(reason: Optional[str] = None) -> None:
+    broker.publish({"type": "refresh", "reason": reason})
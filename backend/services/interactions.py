@@ -1,12 +1,37 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import base64
+import binascii
+import heapq
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
+from sqlalchemy import Select, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import models
+from . import archive as archive_service
+from . import rollup as rollup_service
+from . import schedule as schedule_service
+from .event_buffer import interaction_buffer
+
+
+# Upper bound on alerts closed per sweep; keeps the id lists well under SQLite's
+# bound-parameter limit after a long outage.
+STALE_CLOSE_BATCH = 500
 
 
 def get_latest_interaction(db: Session, instance_id: int) -> Optional[models.Interaction]:
+    """Newest interaction for the instance, including ones not yet flushed to the database.
+
+    A buffered interaction is returned detached; change it through
+    ``_respond_to_latest`` rather than by setting attributes.
+    """
+
+    buffered = interaction_buffer.latest_interaction(db, instance_id)
+    if buffered is not None:
+        # Buffered rows were created after everything already in the table.
+        return buffered
     return (
         db.query(models.Interaction)
         .filter(models.Interaction.schedule_instance_id == instance_id)
@@ -15,23 +40,241 @@ def get_latest_interaction(db: Session, instance_id: int) -> Optional[models.Int
     )
 
 
-def close_stale_interactions(db: Session, cutoff_minutes: int = 10) -> None:
-    cutoff = datetime.utcnow() - timedelta(minutes=cutoff_minutes)
-    stale = (
-        db.query(models.Interaction)
-        .filter(models.Interaction.response_type.is_(None))
-        .filter(models.Interaction.alert_started_at <= cutoff)
-        .all()
+def recent_interactions_statement(limit: int) -> Select:
+    """Newest interactions first, each joined with its instance and task."""
+
+    return (
+        select(models.Interaction, models.ScheduleInstance, models.Task)
+        .join(
+            models.ScheduleInstance,
+            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
+        )
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .order_by(
+            models.Interaction.alert_started_at.desc(),
+            models.Interaction.id.desc(),
+        )
+        .limit(limit)
+    )
+
+
+def _instance_tasks_statement(instance_ids: Iterable[int]) -> Select:
+    return (
+        select(models.ScheduleInstance.id, models.Task)
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .where(models.ScheduleInstance.id.in_(set(instance_ids)))
+    )
+
+
+def _newest_first_key(row: Tuple[models.Interaction, models.Task]) -> Tuple[datetime, int]:
+    return row[0].alert_started_at, row[0].id
+
+
+def _merge_recent(
+    stored: List[Tuple[models.Interaction, models.Task]],
+    buffered: List[models.Interaction],
+    tasks: Dict[int, models.Task],
+    limit: int,
+) -> List[Tuple[models.Interaction, models.Task]]:
+    # A row flushed while this was read shows up twice; the buffered copy stands in for it.
+    rows = [
+        (interaction, tasks[interaction.schedule_instance_id])
+        for interaction in buffered
+        if interaction.schedule_instance_id in tasks
+    ]
+    buffered_ids = {interaction.id for interaction, _task in rows}
+    rows += [(interaction, task) for interaction, task in stored if interaction.id not in buffered_ids]
+    rows.sort(key=_newest_first_key, reverse=True)
+    return rows[:limit]
+
+
+def recent_interactions(db: Session, limit: int) -> List[Tuple[models.Interaction, models.Task]]:
+    """The ``limit`` newest interactions with their tasks, buffered ones included."""
+
+    buffered = interaction_buffer.pending_interactions()
+    stored = [(interaction, task) for interaction, _instance, task in db.execute(recent_interactions_statement(limit))]
+    tasks: Dict[int, models.Task] = {}
+    if buffered:
+        tasks = dict(db.execute(_instance_tasks_statement(i.schedule_instance_id for i in buffered)).all())
+    return _merge_recent(stored, buffered, tasks, limit)
+
+
+async def recent_interactions_async(db: AsyncSession, limit: int) -> List[Tuple[models.Interaction, models.Task]]:
+    """``recent_interactions`` for async handlers."""
+
+    buffered = interaction_buffer.pending_interactions()
+    result = await db.execute(recent_interactions_statement(limit))
+    stored = [(interaction, task) for interaction, _instance, task in result.all()]
+    tasks: Dict[int, models.Task] = {}
+    if buffered:
+        result = await db.execute(_instance_tasks_statement(i.schedule_instance_id for i in buffered))
+        tasks = dict(result.all())
+    return _merge_recent(stored, buffered, tasks, limit)
+
+
+class HistoryCursor(NamedTuple):
+    """Position in the interaction history: the last row returned and where it lives.
+
+    ``source`` is None for the main database or the month of an archive file.
+    History is read from the main database first, then archives newest first.
+    """
+
+    source: Optional[date]
+    alert_started_at: datetime
+    id: int
+
+
+def encode_history_cursor(cursor: HistoryCursor) -> str:
+    source = cursor.source.strftime("%Y-%m") if cursor.source else "main"
+    raw = f"{source}|{cursor.alert_started_at.isoformat()}|{cursor.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(value: str) -> HistoryCursor:
+    """Parse an ``encode_history_cursor`` string; raises ValueError if it is not one."""
+
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        source, started_at, row_id = raw.split("|")
+        month = None if source == "main" else datetime.strptime(source, "%Y-%m").date()
+        return HistoryCursor(month, datetime.fromisoformat(started_at), int(row_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid history cursor") from exc
+
+
+def _history_statement(tables: archive_service.HistoryTables, after: Optional[HistoryCursor]) -> Select:
+    interaction = tables.interactions
+    statement = (
+        select(interaction, models.Task)
+        .join(tables.instances, interaction.schedule_instance_id == tables.instances.id)
+        .join(models.Task, tables.instances.task_id == models.Task.id)
+        .order_by(interaction.alert_started_at.desc(), interaction.id.desc())
     )
-    if not stale:
+    if after is not None:
+        # Keyset: strictly older than the cursor row in (alert_started_at, id) order.
+        statement = statement.where(
+            tuple_(interaction.alert_started_at, interaction.id) < (after.alert_started_at, after.id)
+        )
+    return statement
+
+
+@contextmanager
+def _source_tables(db: Session, source: Optional[date]) -> Iterator[archive_service.HistoryTables]:
+    if source is None:
+        yield archive_service.HOT_TABLES
         return
+    with archive_service.attached(db.connection(), [source], include_hot=False) as tables:
+        yield tables
+
+
+def iter_history(
+    db: Session,
+    after: Optional[HistoryCursor] = None,
+    limit: Optional[int] = None,
+    batch_size: int = 500,
+) -> Iterator[Tuple[HistoryCursor, models.Interaction, models.Task]]:
+    """Interactions older than ``after``, newest first, ``limit`` at most (None for all).
+
+    Rows are fetched ``batch_size`` at a time and archive months are attached one
+    at a time, so memory stays flat however much history there is. Interactions
+    still in the write-behind buffer are merged into the main database's rows.
+    """
+
+    sources: List[Optional[date]] = [None]
+    sources += sorted(archive_service.archived_months(date.min, date.max), reverse=True)
+    if after is not None and after.source is not None:
+        sources = [source for source in sources if source is not None and source <= after.source]
+
+    buffered = []
+    if sources and sources[0] is None:
+        buffered = _buffered_history(db, after)
+    buffered_ids = {interaction.id for _cursor, interaction, _task in buffered}
+
+    remaining = limit
+    for source in sources:
+        keyset = after if after is not None and after.source == source else None
+        with _source_tables(db, source) as tables:
+            statement = _history_statement(tables, keyset)
+            if remaining is not None:
+                statement = statement.limit(remaining)
+            result = db.execute(statement.execution_options(yield_per=batch_size))
+            try:
+                rows = (
+                    (HistoryCursor(source, interaction.alert_started_at, interaction.id), interaction, task)
+                    for interaction, task in result
+                    # Flushed while this was read: the buffered copy stands in for it.
+                    if source is not None or interaction.id not in buffered_ids
+                )
+                if source is None and buffered:
+                    rows = heapq.merge(buffered, rows, key=lambda row: row[0], reverse=True)
+                for row in rows:
+                    yield row
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining == 0:
+                            break
+            finally:
+                result.close()
+        if remaining == 0:
+            return
+
+
+def _buffered_history(
+    db: Session, after: Optional[HistoryCursor]
+) -> List[Tuple[HistoryCursor, models.Interaction, models.Task]]:
+    """Buffered interactions older than ``after``, newest first, as ``iter_history`` rows."""
+
+    buffered = interaction_buffer.pending_interactions()
+    if after is not None:
+        buffered = [i for i in buffered if (i.alert_started_at, i.id) < (after.alert_started_at, after.id)]
+    if not buffered:
+        return []
+    tasks = dict(db.execute(_instance_tasks_statement(i.schedule_instance_id for i in buffered)).all())
+    rows = [
+        (HistoryCursor(None, interaction.alert_started_at, interaction.id), interaction, tasks[interaction.schedule_instance_id])
+        for interaction in buffered
+        if interaction.schedule_instance_id in tasks
+    ]
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return rows
+
+
+def close_stale_interactions(db: Session, cutoff_minutes: int = 10) -> int:
+    """Mark alerts left unanswered for ``cutoff_minutes`` as ignored; returns rows closed.
+
+    Set-based and served by the partial index on open interactions; closes at most
+    ``STALE_CLOSE_BATCH`` per call, the rest on the next sweep. Closed alerts are
+    counted in the daily rollup in the same transaction.
+    """
 
     now_utc = datetime.utcnow()
-    for interaction in stale:
-        interaction.response_type = "none"
-        interaction.response_stage = "none"
-        interaction.responded_at = now_utc
+    cutoff = now_utc - timedelta(minutes=cutoff_minutes)
+    stale_ids = db.execute(
+        select(models.Interaction.id)
+        .where(models.Interaction.response_type.is_(None))
+        .where(models.Interaction.alert_started_at <= cutoff)
+        .limit(STALE_CLOSE_BATCH)
+    ).scalars().all()
+    if not stale_ids:
+        return 0
+    result = db.execute(
+        update(models.Interaction)
+        .where(models.Interaction.id.in_(stale_ids))
+        .where(models.Interaction.response_type.is_(None))
+        .values(response_type="none", response_stage="none", responded_at=now_utc)
+        .execution_options(synchronize_session=False)
+    )
+    # Alerts answered between the two statements keep their response and are
+    # counted by the acknowledge/snooze path instead.
+    closed_ids = db.execute(
+        select(models.Interaction.id)
+        .where(models.Interaction.id.in_(stale_ids))
+        .where(models.Interaction.response_type == "none")
+        .where(models.Interaction.responded_at == now_utc)
+    ).scalars().all()
+    rollup_service.record_closed_interactions(db, closed_ids)
     db.commit()
+    return result.rowcount or 0
 
 
 def start_interaction(
@@ -39,43 +282,69 @@ def start_interaction(
     instance: models.ScheduleInstance,
     alert_type: str = "task_start",
 ) -> None:
-    interaction = models.Interaction(
+    """Log a new open alert for ``instance``; the caller commits."""
+
+    interaction_buffer.add(
+        db,
+        models.Interaction,
         schedule_instance_id=instance.id,
         alert_type=alert_type,
+        alert_started_at=datetime.utcnow(),
     )
-    db.add(interaction)
-    db.commit()
 
 
-def record_acknowledge(
+def _respond_to_latest(
     db: Session,
     instance: models.ScheduleInstance,
-    stage: Optional[str] = None,
+    response_type: str,
+    stage: Optional[str],
 ) -> None:
-    event = models.AcknowledgeEvent(schedule_instance_id=instance.id)
-    db.add(event)
-    db.commit()
+    """Close the instance's open alert with ``response_type``, or log a closed one."""
 
     interaction = get_latest_interaction(db, instance.id)
-    stage_value = stage or "visual"
     now_utc = datetime.utcnow()
+    response = {
+        "response_type": response_type,
+        "response_stage": stage or "visual",
+        "responded_at": now_utc,
+    }
 
     if interaction and interaction.response_type is None:
-        interaction.response_type = "acknowledge"
-        interaction.response_stage = stage_value
-        interaction.responded_at = now_utc
-        db.commit()
+        closed = interaction_buffer.update(db, models.Interaction, interaction.id, **response)
+        if not closed:
+            # Unless the stale sweeper closed it first.
+            result = db.execute(
+                update(models.Interaction)
+                .where(models.Interaction.id == interaction.id)
+                .where(models.Interaction.response_type.is_(None))
+                .values(**response)
+                .execution_options(synchronize_session=False)
+            )
+            closed = result.rowcount == 1
+        if closed:
+            rollup_service.record_closed(db, instance, interaction.alert_started_at, response_type)
     elif interaction is None:
-        interaction = models.Interaction(
+        interaction_buffer.add(
+            db,
+            models.Interaction,
             schedule_instance_id=instance.id,
             alert_type="task_start",
             alert_started_at=now_utc,
-            response_type="acknowledge",
-            response_stage=stage_value,
-            responded_at=now_utc,
+            **response,
         )
-        db.add(interaction)
-        db.commit()
+        rollup_service.record_closed(db, instance, now_utc, response_type)
+
+
+def record_acknowledge(
+    db: Session,
+    instance: models.ScheduleInstance,
+    stage: Optional[str] = None,
+) -> None:
+    """Add the acknowledge event and response to the current transaction; the caller commits."""
+
+    interaction_buffer.add(db, models.AcknowledgeEvent, schedule_instance_id=instance.id)
+    schedule_service.record_change(db, instance)
+    _respond_to_latest(db, instance, "acknowledge", stage)
 
 
 def record_snooze(
@@ -84,33 +353,19 @@ def record_snooze(
     minutes: int,
     stage: Optional[str] = None,
 ) -> None:
-    event = models.SnoozeEvent(
+    """Add the snooze event and response to the current transaction; the caller commits.
+
+    The instance's new end time and its change-log row come from
+    ``schedule_service.snooze_instance`` in the same transaction.
+    """
+
+    interaction_buffer.add(
+        db,
+        models.SnoozeEvent,
         schedule_instance_id=instance.id,
         minutes=minutes,
     )
-    db.add(event)
-    db.commit()
-
-    interaction = get_latest_interaction(db, instance.id)
-    stage_value = stage or "visual"
-    now_utc = datetime.utcnow()
-
-    if interaction and interaction.response_type is None:
-        interaction.response_type = "snooze"
-        interaction.response_stage = stage_value
-        interaction.responded_at = now_utc
-        db.commit()
-    elif interaction is None:
-        interaction = models.Interaction(
-            schedule_instance_id=instance.id,
-            alert_type="task_start",
-            alert_started_at=now_utc,
-            response_type="snooze",
-            response_stage=stage_value,
-            responded_at=now_utc,
-        )
-        db.add(interaction)
-        db.commit()
+    _respond_to_latest(db, instance, "snooze", stage)
 
 
 def add_note_for_instance(
@@ -119,12 +374,14 @@ def add_note_for_instance(
     note_type: str,
     text: str,
 ) -> None:
+    """Attach a note to the instance's latest interaction; the caller commits."""
+
     interaction = get_latest_interaction(db, instance.id)
-    note = models.InteractionNote(
+    interaction_buffer.add(
+        db,
+        models.InteractionNote,
         schedule_instance_id=instance.id,
         interaction_id=interaction.id if interaction else None,
         note_type=note_type,
         text=text,
     )
-    db.add(note)
-    db.commit()
@@ -0,0 +1,133 @@
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import Date, Select, Table, delete, func, literal, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import analytics
+from . import archive as archive_service
+
+
+# (schedule day, category, time-of-day bucket, response type) -> closed interactions
+RollupCounts = Dict[Tuple[date, str, str, str], int]
+
+
+def _upsert(db: Any, counts: RollupCounts) -> None:
+    """Add ``counts`` to the rollup in the caller's transaction (Session or Connection)."""
+
+    if not counts:
+        return
+    rollup = models.InteractionDailyRollup
+    statement = sqlite_insert(rollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=[rollup.date, rollup.category, rollup.time_bucket, rollup.response_type],
+        set_={"count": rollup.count + statement.excluded["count"]},
+    )
+    db.execute(
+        statement,
+        [
+            {
+                "date": day,
+                "category": category,
+                "time_bucket": bucket,
+                "response_type": response,
+                "count": count,
+            }
+            for (day, category, bucket, response), count in counts.items()
+        ],
+    )
+
+
+def record_closed(
+    db: Session,
+    instance: models.ScheduleInstance,
+    alert_started_at: datetime,
+    response_type: str,
+) -> None:
+    """Count one interaction of ``instance`` closed with ``response_type``; the caller commits."""
+
+    key = (
+        instance.date,
+        analytics.label(instance.task.category, "uncategorized"),
+        analytics.time_of_day_bucket(alert_started_at.hour),
+        analytics.label(response_type, "none"),
+    )
+    _upsert(db, {key: 1})
+
+
+def _closed_counts_statement(interactions: Table, instances: Table) -> Select:
+    return analytics.daily_counts_statement(interactions, instances).where(
+        interactions.c.response_type.is_not(None)
+    )
+
+
+def _counts(rows: Iterable) -> RollupCounts:
+    return {(day, category, bucket, response): count for day, category, bucket, response, count in rows}
+
+
+def record_closed_interactions(db: Session, interaction_ids: List[int]) -> None:
+    """Count the given (already closed) interactions; the caller commits."""
+
+    if not interaction_ids:
+        return
+    interactions = models.Interaction.__table__
+    statement = _closed_counts_statement(interactions, models.ScheduleInstance.__table__)
+    _upsert(db, _counts(db.execute(statement.where(interactions.c.id.in_(interaction_ids)))))
+
+
+def rebuild(conn: Connection) -> int:
+    """Recount the rollup from every closed interaction, archived months included."""
+
+    hot = _closed_counts_statement(models.Interaction.__table__, models.ScheduleInstance.__table__)
+    counts: Counter = Counter(_counts(conn.execute(hot)))
+    # One month at a time: SQLite allows only a handful of attached databases.
+    for month in archive_service.archived_months(date.min, date.max):
+        with archive_service.attached(conn, [month]):
+            statement = _closed_counts_statement(
+                archive_service.archived_table(models.Interaction, month),
+                archive_service.archived_table(models.ScheduleInstance, month),
+            )
+            counts.update(_counts(conn.execute(statement)))
+    conn.execute(delete(models.InteractionDailyRollup))
+    _upsert(conn, counts)
+    return sum(counts.values())
+
+
+def summary_statement(start: date, end: date) -> Select:
+    """Interaction counts for schedule days ``[start, end]`` by category, bucket and response.
+
+    Same rows as ``analytics.range_counts_statement``: closed interactions come
+    from the rollup; alerts still open count as "none", like the sweeper will
+    record them.
+    """
+
+    rollup = models.InteractionDailyRollup
+    closed = (
+        select(rollup.category, rollup.time_bucket, rollup.response_type, func.sum(rollup.count))
+        .where(rollup.date >= start)
+        .where(rollup.date <= end)
+        .group_by(rollup.category, rollup.time_bucket, rollup.response_type)
+    )
+    category = analytics.label_sql(models.Task.category, "uncategorized")
+    bucket = analytics.time_of_day_bucket_sql(models.Interaction.alert_started_at)
+    still_open = (
+        select(category, bucket, literal("none"), func.count())
+        .select_from(models.Interaction)
+        .join(
+            models.ScheduleInstance,
+            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
+        )
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .where(models.Interaction.response_type.is_(None))
+        # date() keeps the planner off the instance date index, so the scan starts
+        # from the partial index of the few open alerts rather than from every
+        # interaction in the range.
+        .where(func.date(models.ScheduleInstance.date, type_=Date) >= start)
+        .where(func.date(models.ScheduleInstance.date, type_=Date) <= end)
+        .group_by(category, bucket)
+    )
+    return union_all(closed, still_open)
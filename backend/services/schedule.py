@@ -1,8 +1,643 @@
-from datetime import datetime, timedelta, time
-from typing import Optional, Tuple
+import bisect
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta, time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Select, delete, exists, insert, select
+from sqlalchemy.orm import Session
 
 from .. import models
 
+# Templates without a usable preferred window are placed back-to-back from here.
+DEFAULT_DAY_START = time(hour=9, minute=0)
+
+# Number of days, starting today, that are kept materialized for range views.
+SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "14"))
+
+
+class _PlannedSlot(NamedTuple):
+    """Planned placement of one instance on a day."""
+
+    task_id: int
+    date: date
+    planned_start_time: time
+    planned_end_time: time
+
+
+ALL_DAYS_MASK = 0b1111111
+WEEKDAYS_MASK = 0b0011111
+WEEKENDS_MASK = 0b1100000
+
+_GROUP_MASKS = {"daily": ALL_DAYS_MASK, "weekdays": WEEKDAYS_MASK, "weekends": WEEKENDS_MASK}
+_WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_EVERY_N_DAYS = re.compile(r"^every\s+(other|\d+)\s+days?$")
+
+
+class RecurrenceRule(NamedTuple):
+    """Compiled recurrence pattern: weekday bitmask plus optional every-N-days interval."""
+
+    weekday_mask: int
+    interval_days: Optional[int] = None
+
+
+def _weekday_index(part: str, strict: bool) -> Optional[int]:
+    key = part[:3]
+    if len(key) < 3:
+        return None
+    for idx, name in enumerate(_WEEKDAY_NAMES):
+        if name.startswith(key):
+            # Strict mode also rejects words that merely start like a day ("monkey").
+            if strict and not name.startswith(part):
+                return None
+            return idx
+    return None
+
+
+def compile_recurrence(pattern: Optional[str], strict: bool = True) -> RecurrenceRule:
+    """Compile a recurrence_pattern string into a ``RecurrenceRule``.
+
+    Accepts "daily" (or empty), "weekdays", "weekends", comma-separated days or
+    groups such as "mon,wed,fri" or "weekdays,sat", and "every N days" / "every
+    other day". In strict mode
+    anything else raises ValueError; the lenient mode reproduces how older
+    versions read stored patterns (unknown parts ignored, otherwise daily), which
+    is what existing rows are backfilled with.
+    """
+
+    p = (pattern or "").strip().lower()
+    if not p:
+        return RecurrenceRule(ALL_DAYS_MASK)
+    if p in _GROUP_MASKS:
+        return RecurrenceRule(_GROUP_MASKS[p])
+
+    match = _EVERY_N_DAYS.match(p)
+    if match and strict:
+        interval = 2 if match.group(1) == "other" else int(match.group(1))
+        if interval < 1:
+            raise ValueError("Recurrence interval must be at least one day")
+        return RecurrenceRule(ALL_DAYS_MASK, interval if interval > 1 else None)
+
+    mask = 0
+    unknown = []
+    for part in (x.strip() for x in p.split(",")):
+        if not part:
+            continue
+        if strict and part in _GROUP_MASKS:
+            mask |= _GROUP_MASKS[part]
+            continue
+        idx = _weekday_index(part, strict)
+        if idx is None:
+            unknown.append(part)
+        else:
+            mask |= 1 << idx
+
+    if strict and (unknown or not mask):
+        raise ValueError(
+            f"Unrecognized recurrence pattern {pattern!r}. Use daily, weekdays, weekends, "
+            "a list of days such as 'mon,wed,fri', or 'every N days'."
+        )
+    return RecurrenceRule(mask or ALL_DAYS_MASK)
+
+
+def apply_recurrence(task: models.Task, rule: RecurrenceRule, anchor: date) -> None:
+    """Store a compiled rule on ``task``; ``anchor`` is day one of an interval rule."""
+
+    task.recurrence_mask = rule.weekday_mask
+    task.recurrence_interval_days = rule.interval_days
+    task.recurrence_anchor = anchor if rule.interval_days else None
+
+
+class _Template(NamedTuple):
+    """The columns of an enabled template the planner needs."""
+
+    id: int
+    default_duration_minutes: int
+    recurrence_mask: int
+    recurrence_interval_days: Optional[int]
+    recurrence_anchor: Optional[date]
+    window_start_minute: Optional[int]
+    window_end_minute: Optional[int]
+
+    def recurs_on(self, day: date) -> bool:
+        if not self.recurrence_mask & (1 << day.weekday()):
+            return False
+        if self.recurrence_interval_days is None:
+            return True
+        return (
+            self.recurrence_anchor is not None
+            and (day - self.recurrence_anchor).days % self.recurrence_interval_days == 0
+        )
+
+
+def _load_templates(db: Session) -> List[_Template]:
+    """Every enabled template, in the order ``_plan_day`` places them (by name).
+
+    One column-only query; callers pick each day's templates with ``recurs_on``.
+    """
+
+    task = models.Task
+    rows = db.execute(
+        select(
+            task.id,
+            task.default_duration_minutes,
+            task.recurrence_mask,
+            task.recurrence_interval_days,
+            task.recurrence_anchor,
+            task.window_start_minute,
+            task.window_end_minute,
+        )
+        .where(task.enabled.is_(True))
+        .order_by(task.name)
+    )
+    return [_Template(*row) for row in rows]
+
+
+def parse_preferred_window(raw: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse a preferred_time_window string into (start, end) minutes of the day.
+
+    Called when a template is saved; the result is stored on the task as
+    ``window_start_minute`` / ``window_end_minute``. Returns None for an empty
+    window and raises ValueError for one that cannot be parsed.
+
+    Supports common variants such as:
+    - "07:00-11:00"
+    - "07:00 - 11:00"
+    - "1:17 pm - 1:20 pm"
+    - "07:00-11:00 or evenings" (trailing text is ignored)
+    """
+
+    s = (raw or "").strip()
+    if not s:
+        return None
+    invalid = ValueError(
+        f"Unrecognized preferred time window {raw!r}. Use a range such as '07:00-09:00' or '6 pm - 9 pm'."
+    )
+
+    # Normalize dashes and split on the first '-'
+    s = s.replace("\u2013", "-")
+    dash_index = s.find("-")
+    if dash_index == -1:
+        raise invalid
+
+    left = s[:dash_index].strip()
+    right = s[dash_index + 1 :].strip()
+    if not left or not right:
+        raise invalid
+
+    def _parse_part(part: str) -> Optional[time]:
+        p = (part or "").strip().lower()
+        if not p:
+            return None
+
+        # Keep only the first couple of tokens to drop trailing notes like "or evenings".
+        tokens = p.split()
+        if not tokens:
+            return None
+        candidate = " ".join(tokens[:2])
+
+        # Try 12-hour clocks with am/pm markers first.
+        if "am" in candidate or "pm" in candidate:
+            for fmt in ("%I:%M %p", "%I %p", "%I:%M%p", "%I%p"):
+                try:
+                    return datetime.strptime(candidate, fmt).time()
+                except ValueError:
+                    continue
+
+        # Fallback to 24-hour style like '7:00' or '07:00' or just '7'.
+        base = tokens[0]
+        for fmt in ("%H:%M", "%H"):
+            try:
+                return datetime.strptime(base, fmt).time()
+            except ValueError:
+                continue
+
+        return None
+
+    start_t = _parse_part(left)
+    end_t = _parse_part(right)
+    if start_t is None or end_t is None:
+        raise invalid
+    if start_t >= end_t:
+        raise ValueError(f"Preferred time window {raw!r} must end after it starts")
+    return start_t.hour * 60 + start_t.minute, end_t.hour * 60 + end_t.minute
+
+
+def apply_preferred_window(task: models.Task, window: Optional[Tuple[int, int]]) -> None:
+    """Store a parsed window (see ``parse_preferred_window``) on ``task``."""
+
+    task.window_start_minute, task.window_end_minute = window if window else (None, None)
+
+
+def _seconds_of_day(t: time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _time_from_seconds(seconds: int) -> time:
+    return time(hour=seconds // 3600, minute=(seconds // 60) % 60, second=seconds % 60)
+
+
+class _FreeIntervals:
+    """Free time of one day as sorted, disjoint ``[start, end)`` second ranges.
+
+    Built once per planned day and updated as slots are taken, so placing a
+    template costs a bisect plus a scan of the free gaps inside its window
+    instead of re-sorting every placed instance.
+    """
+
+    DAY_SECONDS = 24 * 3600
+
+    def __init__(self) -> None:
+        self._starts: List[int] = [0]
+        self._ends: List[int] = [self.DAY_SECONDS]
+
+    @classmethod
+    def from_slots(cls, slots: List[_PlannedSlot]) -> "_FreeIntervals":
+        free = cls()
+        for slot in slots:
+            free.take(slot.planned_start_time, slot.planned_end_time)
+        return free
+
+    def take(self, start_t: time, end_t: time) -> None:
+        start = _seconds_of_day(start_t)
+        end = _seconds_of_day(end_t)
+        if end <= start:
+            # The slot runs past midnight; only this day's part occupies it.
+            end = self.DAY_SECONDS
+        self._take_seconds(start, end)
+
+    def _take_seconds(self, start: int, end: int) -> None:
+        # Free intervals that overlap [start, end) are those from the last one
+        # starting before ``end`` back to the first one ending after ``start``.
+        lo = bisect.bisect_right(self._ends, start)
+        hi = bisect.bisect_left(self._starts, end)
+        if lo >= hi:
+            return
+
+        remainder_starts: List[int] = []
+        remainder_ends: List[int] = []
+        if self._starts[lo] < start:
+            remainder_starts.append(self._starts[lo])
+            remainder_ends.append(start)
+        if self._ends[hi - 1] > end:
+            remainder_starts.append(end)
+            remainder_ends.append(self._ends[hi - 1])
+        self._starts[lo:hi] = remainder_starts
+        self._ends[lo:hi] = remainder_ends
+
+    def first_fit(self, window: Tuple[int, int], duration_minutes: int) -> Optional[time]:
+        """Earliest start inside ``window`` (minutes of the day) where ``duration_minutes`` fit."""
+
+        if duration_minutes <= 0:
+            return None
+        window_start = window[0] * 60
+        window_end = window[1] * 60
+        duration = duration_minutes * 60
+
+        i = bisect.bisect_right(self._ends, window_start)
+        while i < len(self._starts) and self._starts[i] < window_end:
+            candidate = max(self._starts[i], window_start)
+            if candidate + duration <= min(self._ends[i], window_end):
+                return _time_from_seconds(candidate)
+            i += 1
+        return None
+
+
+def _plan_day(
+    day: date,
+    tasks: List[_Template],
+    existing: List[_PlannedSlot],
+) -> List[_PlannedSlot]:
+    """Place every template in ``tasks`` (those recurring on ``day``) that has no instance yet.
+
+    Templates are placed inside their preferred window when there is room,
+    otherwise back-to-back after the last planned end time (or from 09:00 on an
+    empty day). Templates whose window has no room are skipped for the day.
+    """
+
+    existing_task_ids = {slot.task_id for slot in existing}
+
+    if existing:
+        last_end_time = max(slot.planned_end_time for slot in existing)
+        cursor = datetime.combine(day, last_end_time)
+    else:
+        cursor = datetime.combine(day, DEFAULT_DAY_START)
+
+    free = _FreeIntervals.from_slots(existing)
+    planned: List[_PlannedSlot] = []
+    for task in tasks:
+        if task.id in existing_task_ids:
+            continue
+
+        window = None
+        if task.window_start_minute is not None:
+            window = (task.window_start_minute, task.window_end_minute)
+        planned_start: Optional[time] = None
+
+        if window is not None:
+            planned_start = free.first_fit(window, task.default_duration_minutes)
+
+        if planned_start is None:
+            # If there was a preferred window but no room, skip scheduling this
+            # template for the day instead of placing it outside the window.
+            if window is not None:
+                continue
+
+            planned_start = cursor.time()
+            cursor = cursor + timedelta(minutes=task.default_duration_minutes)
+
+        start_dt = datetime.combine(day, planned_start)
+        end_dt = start_dt + timedelta(minutes=task.default_duration_minutes)
+
+        new_slot = _PlannedSlot(task.id, day, planned_start, end_dt.time())
+        free.take(new_slot.planned_start_time, new_slot.planned_end_time)
+        planned.append(new_slot)
+
+    return planned
+
+
+def materialize_range(db: Session, start: date, end: date) -> int:
+    """Create schedule instances for every day in ``[start, end]`` from enabled templates.
+
+    Idempotent: templates that already have an instance on a day (in any status)
+    are skipped, so calling this again only tops days up with newly added or
+    re-enabled templates. Templates and existing instances are read once for the
+    whole range; new instances plus their change-log rows are written with one
+    bulk insert each. Returns the number of instances created.
+    """
+
+    if end < start:
+        return 0
+
+    templates = _load_templates(db)
+    existing_by_day: Dict[date, List[_PlannedSlot]] = defaultdict(list)
+    existing_rows = (
+        db.query(
+            models.ScheduleInstance.task_id,
+            models.ScheduleInstance.date,
+            models.ScheduleInstance.planned_start_time,
+            models.ScheduleInstance.planned_end_time,
+        )
+        .filter(models.ScheduleInstance.date >= start)
+        .filter(models.ScheduleInstance.date <= end)
+        .all()
+    )
+    for row in existing_rows:
+        existing_by_day[row.date].append(_PlannedSlot(*row))
+
+    slots: List[_PlannedSlot] = []
+    day = start
+    while day <= end:
+        day_templates = [template for template in templates if template.recurs_on(day)]
+        slots.extend(_plan_day(day, day_templates, existing_by_day[day]))
+        day += timedelta(days=1)
+
+    created = _insert_slots(db, slots)
+    if created:
+        db.commit()
+    return created
+
+
+def _insert_slots(db: Session, slots: List[_PlannedSlot]) -> int:
+    """Insert pending instances for ``slots`` plus their change-log rows; the caller commits."""
+
+    if not slots:
+        return 0
+    created = db.execute(
+        insert(models.ScheduleInstance).returning(
+            models.ScheduleInstance.id,
+            models.ScheduleInstance.date,
+        ),
+        [
+            {
+                "task_id": slot.task_id,
+                "date": slot.date,
+                "planned_start_time": slot.planned_start_time,
+                "planned_end_time": slot.planned_end_time,
+                "status": "pending",
+            }
+            for slot in slots
+        ],
+    ).all()
+    db.execute(
+        insert(models.ScheduleChange),
+        [
+            {"schedule_instance_id": instance_id, "date": instance_date, "change_type": "upsert"}
+            for instance_id, instance_date in created
+        ],
+    )
+    return len(created)
+
+
+def materialize_day(db: Session, day: date) -> int:
+    """Create any missing schedule instances for a single day; see ``materialize_range``."""
+
+    return materialize_range(db, day, day)
+
+
+def _replannable(start: date, end: date, keep_edited: bool = True) -> Select:
+    """Ids of pending instances dated ``[start, end]`` nobody has interacted with.
+
+    With ``keep_edited`` instances a user edited are left out too. An instance's
+    first change-log row records its creation, so any further one is an edit.
+    """
+
+    instance = models.ScheduleInstance
+    statement = (
+        select(instance.id)
+        .where(instance.date >= start)
+        .where(instance.date <= end)
+        .where(instance.status == "pending")
+        .where(~exists().where(models.Interaction.schedule_instance_id == instance.id))
+        .where(~exists().where(models.InteractionNote.schedule_instance_id == instance.id))
+    )
+    if keep_edited:
+        edits = (
+            select(models.ScheduleChange.id)
+            .where(models.ScheduleChange.schedule_instance_id == instance.id)
+            .offset(1)
+        )
+        statement = statement.where(~edits.exists())
+    return statement
+
+
+def _delete_instances(db: Session, instance_ids: List[int]) -> None:
+    """Delete instances with their change-log rows; the caller commits."""
+
+    if not instance_ids:
+        return
+    db.execute(delete(models.ScheduleChange).where(models.ScheduleChange.schedule_instance_id.in_(instance_ids)))
+    db.execute(delete(models.ScheduleInstance).where(models.ScheduleInstance.id.in_(instance_ids)))
+
+
+def _overlaps_window(slot: _PlannedSlot, template: _Template) -> bool:
+    start = _seconds_of_day(slot.planned_start_time)
+    end = _seconds_of_day(slot.planned_end_time)
+    if end <= start:
+        # The slot runs past midnight.
+        end = _FreeIntervals.DAY_SECONDS
+    return start < template.window_end_minute * 60 and end > template.window_start_minute * 60
+
+
+def replan_future_days(db: Session, start: date, end: date, task_id: int) -> int:
+    """Bring the plan for ``[start, end]`` in line with template ``task_id`` after it changed.
+
+    Future days are a plan rather than a commitment: the template's untouched
+    pending instances are dropped and its days planned again, which also lets
+    templates that found no room before use the slots it freed. Only on days
+    where the template itself then finds no room are the other templates'
+    untouched instances inside its window replanned too, and only if that gives
+    it a slot. Instances someone edited or interacted with stay as they are,
+    except the edited ones of a disabled (deleted) template, which go with it.
+
+    Only the days the template recurs on or had instances on are touched.
+    Templates and instances are read once; the result is written with one
+    delete and one bulk insert. Returns the number of instances created.
+    """
+
+    templates = _load_templates(db)
+    changed = next((template for template in templates if template.id == task_id), None)
+    instance = models.ScheduleInstance
+
+    own_ids: Dict[date, List[int]] = defaultdict(list)
+    own = _replannable(start, end, keep_edited=changed is not None).where(instance.task_id == task_id)
+    for instance_id, day in db.execute(own.add_columns(instance.date)):
+        own_ids[day].append(instance_id)
+    days = set(own_ids)
+    if changed is not None:
+        day = start
+        while day <= end:
+            if changed.recurs_on(day):
+                days.add(day)
+            day += timedelta(days=1)
+    if not days:
+        return 0
+
+    first, last = min(days), max(days)
+    replannable = {instance_id for (instance_id,) in db.execute(_replannable(first, last))}
+    slots_by_day: Dict[date, List[Tuple[int, _PlannedSlot]]] = defaultdict(list)
+    for row in db.execute(
+        select(instance.id, instance.task_id, instance.date, instance.planned_start_time, instance.planned_end_time)
+        .where(instance.date >= first)
+        .where(instance.date <= last)
+    ):
+        if row.date in days:
+            slots_by_day[row.date].append((row.id, _PlannedSlot(*row[1:])))
+
+    dropped: List[int] = []
+    planned: List[_PlannedSlot] = []
+    for day in sorted(days):
+        drop = set(own_ids[day])
+        day_templates = [template for template in templates if template.recurs_on(day)]
+        kept = [slot for instance_id, slot in slots_by_day[day] if instance_id not in drop]
+        plan = _plan_day(day, day_templates, kept)
+        if (
+            changed is not None
+            and changed.window_start_minute is not None
+            and changed in day_templates
+            and not any(slot.task_id == task_id for slot in kept + plan)
+        ):
+            crowding = {
+                instance_id
+                for instance_id, slot in slots_by_day[day]
+                if instance_id in replannable and instance_id not in drop and _overlaps_window(slot, changed)
+            }
+            kept_around = [slot for instance_id, slot in slots_by_day[day] if instance_id not in drop | crowding]
+            replanned = _plan_day(day, day_templates, kept_around)
+            if any(slot.task_id == task_id for slot in replanned):
+                drop |= crowding
+                plan = replanned
+        dropped.extend(drop)
+        planned.extend(plan)
+
+    _delete_instances(db, dropped)
+    created = _insert_slots(db, planned)
+    db.commit()
+    return created
+
+
+def horizon_end(today: date) -> date:
+    """Last day the planner keeps materialized, counting ``today`` as day one."""
+
+    return today + timedelta(days=max(1, SCHEDULE_HORIZON_DAYS) - 1)
+
+
+def apply_template_changes(db: Session, today: date, task_id: int) -> None:
+    """Bring the materialized plan in line with template ``task_id`` after it changed.
+
+    Today is only topped up, since it may already be under way; the rest of the
+    horizon is replanned around the template (see ``replan_future_days``).
+    """
+
+    materialize_day(db, today)
+    replan_future_days(db, today + timedelta(days=1), horizon_end(today), task_id)
+
+
+def record_change(
+    db: Session,
+    instance: models.ScheduleInstance,
+    change_type: str = "upsert",
+) -> None:
+    """Append a change-log row for ``instance`` to the current transaction.
+
+    ``change_type`` is "upsert" for new or edited instances and "remove" for
+    cancelled ones; the caller commits.
+    """
+
+    if instance.id is None:
+        db.flush()
+    db.add(
+        models.ScheduleChange(
+            schedule_instance_id=instance.id,
+            date=instance.date,
+            change_type=change_type,
+        )
+    )
+
+
+def record_task_change(db: Session, task_id: int, day: date) -> None:
+    """Log an upsert for each of ``day``'s instances of a template that was edited."""
+
+    instances = (
+        db.query(models.ScheduleInstance)
+        .filter(models.ScheduleInstance.task_id == task_id)
+        .filter(models.ScheduleInstance.date == day)
+        .filter(models.ScheduleInstance.status != "cancelled")
+        .all()
+    )
+    for instance in instances:
+        record_change(db, instance)
+
+
+def cancel_task_instances(db: Session, task_id: int, day: date) -> List[int]:
+    """Cancel ``day``'s instances of a template and return their ids; the caller commits."""
+
+    instances = (
+        db.query(models.ScheduleInstance)
+        .filter(models.ScheduleInstance.task_id == task_id)
+        .filter(models.ScheduleInstance.date == day)
+        .all()
+    )
+    cancelled_ids: List[int] = []
+    for instance in instances:
+        instance.status = "cancelled"
+        record_change(db, instance, "remove")
+        cancelled_ids.append(instance.id)
+    return cancelled_ids
+
+
+def prune_changes(db: Session, before: date) -> int:
+    """Delete change-log rows for days before ``before``; returns rows removed."""
+
+    removed = (
+        db.query(models.ScheduleChange)
+        .filter(models.ScheduleChange.date < before)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return removed
+
 
 def compute_effective_status_and_remaining(
     instance: models.ScheduleInstance,
@@ -26,6 +661,7 @@ def compute_effective_status_and_remaining(
 
 
 def update_instance_time_and_status(
+    db: Session,
     instance: models.ScheduleInstance,
     task: models.Task,
     planned_start_time: Optional[time],
@@ -40,11 +676,15 @@ def update_instance_time_and_status(
     if new_status is not None:
         instance.status = new_status
 
+    record_change(db, instance, "remove" if instance.status == "cancelled" else "upsert")
+
 
 def snooze_instance(
+    db: Session,
     instance: models.ScheduleInstance,
     minutes: int,
 ) -> None:
     end_dt = datetime.combine(instance.date, instance.planned_end_time)
     end_dt = end_dt + timedelta(minutes=minutes)
     instance.planned_end_time = end_dt.time()
+    record_change(db, instance)
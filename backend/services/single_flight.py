@@ -0,0 +1,120 @@
+"""Coalescing of concurrent identical calls ("single flight").
+
+While a call for a key is in flight, further callers with the same key wait
+for it instead of starting their own: they get its result or its exception.
+Callers that leave (their task is cancelled, e.g. the client disconnected)
+stop waiting; when the last one leaves, the shared call is cancelled too.
+Nothing is kept once the call finishes; caching results is ``ai_cache``'s job.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """One upstream stream, replayed to every subscriber from its first piece."""
+
+    def __init__(self, source: AsyncIterator[str]) -> None:
+        self.pieces: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.finished = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for piece in source:
+                self.pieces.append(piece)
+                self._notify()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        except Exception as exc:  # noqa: BLE001 - handed to every subscriber
+            self.error = exc
+        finally:
+            self.finished = True
+            self._notify()
+            await source.aclose()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.pieces):
+                yield self.pieces[index]
+                index += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                if self.cancelled:
+                    raise asyncio.CancelledError()
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Await ``call()``, or the identical call already running for ``key``."""
+
+        flight = self._calls.get(key)
+        # A done task is only forgotten by its callback, a loop tick later.
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _task, flight=flight: self._forget(self._calls, key, flight))
+        flight.waiters += 1
+        try:
+            # shield: one waiter being cancelled must not cancel the others' call.
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it right away so a caller arriving now starts afresh.
+                self._forget(self._calls, key, flight)
+                flight.task.cancel()
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Iterate ``open_stream()``, or join the identical stream already running for ``key``.
+
+        A subscriber that joins late first gets the pieces it missed.
+        """
+
+        flight = self._streams.get(key)
+        if flight is None or flight.finished:
+            flight = _StreamFlight(open_stream())
+            self._streams[key] = flight
+            flight.task.add_done_callback(lambda _task, flight=flight: self._forget(self._streams, key, flight))
+        flight.subscribers += 1
+        try:
+            async for piece in flight.subscribe():
+                yield piece
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+    @staticmethod
+    def _forget(flights: Dict, key: str, flight: object) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
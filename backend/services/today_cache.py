@@ -0,0 +1,123 @@
+import threading
+from datetime import date, time
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+class ScheduleRow(NamedTuple):
+    """Plain-data copy of one of today's instances joined with its task.
+
+    Carries the same attributes ``compute_effective_status_and_remaining`` reads from
+    a ``ScheduleInstance``, so time-derived fields can be recomputed from the cache.
+    """
+
+    id: int
+    task_id: int
+    task_name: str
+    category: str
+    date: date
+    planned_start_time: time
+    planned_end_time: time
+    status: str
+    is_adhoc: bool
+
+
+_lock = threading.Lock()
+_version = 0
+_cached: Optional[Tuple[int, date, List[ScheduleRow]]] = None
+
+
+def current_version() -> int:
+    return _version
+
+
+def bump_version() -> int:
+    """Record that today's schedule may have changed and drop the cached rows.
+
+    Call after the mutating transaction has committed.
+    """
+
+    global _version, _cached
+    with _lock:
+        _version += 1
+        _cached = None
+        return _version
+
+
+def row_from_models(instance: models.ScheduleInstance, task: models.Task) -> ScheduleRow:
+    return ScheduleRow(
+        id=instance.id,
+        task_id=instance.task_id,
+        task_name=task.name,
+        category=task.category,
+        date=instance.date,
+        planned_start_time=instance.planned_start_time,
+        planned_end_time=instance.planned_end_time,
+        status=instance.status,
+        # Tasks created via /adhoc-today (enabled = False) are shown as ad-hoc.
+        is_adhoc=not bool(task.enabled),
+    )
+
+
+def _rows_statement(day: date) -> Select:
+    return (
+        select(models.ScheduleInstance, models.Task)
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .where(models.ScheduleInstance.date == day)
+        .where(models.ScheduleInstance.status != "cancelled")
+        .order_by(models.ScheduleInstance.planned_start_time)
+    )
+
+
+def _cached_rows(version: int, day: date) -> Optional[List[ScheduleRow]]:
+    cached = _cached
+    if cached is not None and cached[0] == version and cached[1] == day:
+        return cached[2]
+    return None
+
+
+def _store(version: int, day: date, rows: List[ScheduleRow]) -> None:
+    global _cached
+    with _lock:
+        # A mutation that committed while we were reading has already bumped the
+        # version; keep those rows out of the cache.
+        if _version == version:
+            _cached = (version, day, rows)
+
+
+def get_rows(db: Session, day: date) -> List[ScheduleRow]:
+    """Return the non-cancelled instances for ``day``, from cache when still current."""
+
+    version = _version
+    cached = _cached_rows(version, day)
+    if cached is not None:
+        return cached
+
+    rows = load_rows(db, day)
+    _store(version, day, rows)
+    return rows
+
+
+def load_rows(db: Session, day: date) -> List[ScheduleRow]:
+    """The non-cancelled instances for ``day`` read from ``db``, bypassing the cache."""
+
+    return [row_from_models(instance, task) for instance, task in db.execute(_rows_statement(day)).all()]
+
+
+async def get_rows_async(db: AsyncSession, day: date) -> List[ScheduleRow]:
+    """``get_rows`` for async handlers; shares the same cache."""
+
+    version = _version
+    cached = _cached_rows(version, day)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(_rows_statement(day))
+    rows = [row_from_models(instance, task) for instance, task in result.all()]
+    _store(version, day, rows)
+    return rows
@@ -1,3 +1,37 @@
+// Read a fetch() response whose body is NDJSON, calling onRecord for each
+// line as soon as it arrives. Falls back to reading the whole body when the
+// browser cannot stream responses.
+window.readNdjson = async function readNdjson(res, onRecord) {
+    const handleLines = (text) => {
+        for (const line of text.split('\n')) {
+            if (line.trim()) onRecord(JSON.parse(line));
+        }
+    };
+    if (!res.body || typeof res.body.getReader !== 'function') {
+        handleLines(await res.text());
+        return;
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    try {
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lastNewline = buffered.lastIndexOf('\n');
+            if (lastNewline === -1) continue;
+            handleLines(buffered.slice(0, lastNewline));
+            buffered = buffered.slice(lastNewline + 1);
+        }
+    } catch (err) {
+        // Stop the download when onRecord gives up (e.g. on an error record).
+        reader.cancel().catch(() => {});
+        throw err;
+    }
+    handleLines(buffered + decoder.decode());
+};
+
 window.initAIHelpers = function initAIHelpers() {
         const aiNowBtn = document.getElementById('ai-now-btn');
         const aiNowSuggestionEl = document.getElementById('ai-now-suggestion');
@@ -41,13 +75,26 @@ window.initAIHelpers = function initAIHelpers() {
                 aiNowSuggestionEl.className = 'status-text';
                 aiNowBtn.disabled = true;
                 try {
-                    const res = await fetch('/ai/now/suggestion');
+                    // Streamed: the text appears while the model is still writing it.
+                    const res = await fetch('/ai/now/suggestion/stream');
                     if (!res.ok) {
                         const txt = await res.text();
                         throw new Error(txt || 'AI now suggestion failed');
                     }
-                    const data = await res.json();
-                    const suggestion = (data && data.suggestion ? String(data.suggestion) : '').trim();
+                    let streamed = '';
+                    let suggestion = '';
+                    await window.readNdjson(res, (record) => {
+                        if (record.error) {
+                            throw new Error(record.error);
+                        }
+                        if (typeof record.delta === 'string') {
+                            streamed += record.delta;
+                            aiNowSuggestionEl.textContent = streamed.trimStart();
+                        }
+                        if (typeof record.suggestion === 'string') {
+                            suggestion = record.suggestion.trim();
+                        }
+                    });
                     if (!suggestion) {
                         aiNowSuggestionEl.textContent = 'AI did not return a usable suggestion.';
                         aiNowSuggestionEl.className = 'status-text error';
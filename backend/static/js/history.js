@@ -3,8 +3,10 @@ window.initHistoryView = function initHistoryView() {
         const historyFromInput = document.getElementById('history-from');
         const historyToInput = document.getElementById('history-to');
         const historyCategorySelect = document.getElementById('history-category');
+        const historyMoreBtn = document.getElementById('history-more-btn');
 
         let historyItemsAll = [];
+        let historyNextCursor = null;
 
         function renderHistory(items) {
             if (!historyListEl) return;
@@ -73,6 +75,7 @@ window.initHistoryView = function initHistoryView() {
                 seen.add(cat);
             }
             const sorted = Array.from(seen).sort((a, b) => a.localeCompare(b));
+            const selected = historyCategorySelect.value;
             historyCategorySelect.innerHTML = '<option value="">All categories</option>';
             for (const cat of sorted) {
                 const opt = document.createElement('option');
@@ -80,6 +83,7 @@ window.initHistoryView = function initHistoryView() {
                 opt.textContent = cat;
                 historyCategorySelect.appendChild(opt);
             }
+            if (seen.has(selected)) historyCategorySelect.value = selected;
         }
 
         function applyHistoryFilters() {
@@ -126,13 +130,21 @@ window.initHistoryView = function initHistoryView() {
             renderHistory(items);
         }
 
+        async function fetchHistoryPage(cursor) {
+            const params = new URLSearchParams({ limit: '50' });
+            if (cursor) params.set('cursor', cursor);
+            const res = await fetch(`/schedule/interactions/history?${params}`);
+            if (!res.ok) throw new Error('Failed to load history');
+            const data = await res.json();
+            historyNextCursor = data.next_cursor || null;
+            if (historyMoreBtn) historyMoreBtn.hidden = !historyNextCursor;
+            return Array.isArray(data.items) ? data.items : [];
+        }
+
         async function loadHistoryInternal() {
             if (!historyListEl) return;
             try {
-                const res = await fetch('/schedule/interactions/recent?limit=50');
-                if (!res.ok) throw new Error('Failed to load history');
-                const data = await res.json();
-                historyItemsAll = Array.isArray(data) ? data : [];
+                historyItemsAll = await fetchHistoryPage(null);
                 updateHistoryCategoryOptions();
                 applyHistoryFilters();
             } catch (err) {
@@ -140,6 +152,21 @@ window.initHistoryView = function initHistoryView() {
             }
         }
 
+        async function loadMoreHistory() {
+            if (!historyNextCursor) return;
+            if (historyMoreBtn) historyMoreBtn.disabled = true;
+            try {
+                const items = await fetchHistoryPage(historyNextCursor);
+                historyItemsAll = historyItemsAll.concat(items);
+                updateHistoryCategoryOptions();
+                applyHistoryFilters();
+            } catch (err) {
+                console.error('Failed to load more history', err);
+            } finally {
+                if (historyMoreBtn) historyMoreBtn.disabled = false;
+            }
+        }
+
         if (historyFromInput) {
             historyFromInput.addEventListener('change', () => {
                 applyHistoryFilters();
@@ -155,6 +182,11 @@ window.initHistoryView = function initHistoryView() {
                 applyHistoryFilters();
             });
         }
+        if (historyMoreBtn) {
+            historyMoreBtn.addEventListener('click', () => {
+                loadMoreHistory();
+            });
+        }
 
         window.loadHistory = async function loadHistory() {
             await loadHistoryInternal();
@@ -6,6 +6,7 @@ window.initPlannerView = function initPlannerView() {
         const aiTemplateFreeText = document.getElementById('ai-template-free-text');
         const aiTemplateSuggestBtn = document.getElementById('ai-template-suggest-btn');
         const aiTemplateStatus = document.getElementById('ai-template-status');
+        const aiTemplateSuggestionsEl = document.getElementById('ai-template-suggestions');
         const submitBtn = document.getElementById('submit-btn');
         const alertWordingCategorySelect = document.getElementById('alert-wording-category');
         const alertWordingToneInput = document.getElementById('alert-wording-tone');
@@ -18,6 +19,7 @@ window.initPlannerView = function initPlannerView() {
 
         let editingTaskId = null;
         let templateTasksAll = [];
+        let tasksEtag = null;
 
         if (aiTemplateSuggestBtn && aiTemplateFreeText && aiTemplateStatus) {
             aiTemplateSuggestBtn.addEventListener('click', async () => {
@@ -30,8 +32,10 @@ window.initPlannerView = function initPlannerView() {
                 aiTemplateStatus.textContent = 'Designing routine templates with AI…';
                 aiTemplateStatus.className = 'status-text';
                 aiTemplateSuggestBtn.disabled = true;
+                if (aiTemplateSuggestionsEl) aiTemplateSuggestionsEl.innerHTML = '';
                 try {
-                    const res = await fetch('/ai/templates/suggestions', {
+                    // Streamed: each template is shown as soon as the model has written it.
+                    const res = await fetch('/ai/templates/suggestions/stream', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({ free_text: text }),
@@ -40,28 +44,25 @@ window.initPlannerView = function initPlannerView() {
                         const txt = await res.text();
                         throw new Error(txt || 'AI request failed');
                     }
-                    const data = await res.json();
-                    const templates = Array.isArray(data.templates) ? data.templates : [];
-                    if (!templates.length) {
+                    let received = 0;
+                    await window.readNdjson(res, (record) => {
+                        if (record.error) {
+                            throw new Error(record.error);
+                        }
+                        if (!record.template) return;
+                        received += 1;
+                        if (received === 1) {
+                            loadTemplateSuggestion(record.template);
+                        }
+                        appendTemplateSuggestion(record.template);
+                        aiTemplateStatus.textContent = `Received ${received} AI-suggested template${received === 1 ? '' : 's'}…`;
+                    });
+                    if (!received) {
                         aiTemplateStatus.textContent = 'The assistant did not return any usable templates.';
                         aiTemplateStatus.className = 'status-text error';
                         return;
                     }
-                    const first = templates[0];
-                    document.getElementById('name').value = first.name || '';
-                    document.getElementById('category').value = first.category || '';
-                    if (typeof first.default_duration_minutes === 'number') {
-                        document.getElementById('default_duration_minutes').value = String(first.default_duration_minutes);
-                    }
-                    document.getElementById('recurrence_pattern').value = first.recurrence_pattern || '';
-                    document.getElementById('preferred_time_window').value = first.preferred_time_window || '';
-                    document.getElementById('default_alert_style').value = first.default_alert_style || 'visual_then_alarm';
-                    document.getElementById('enabled').checked = first.enabled !== false;
-                    editingTaskId = null;
-                    submitBtn.textContent = 'Save template';
-                    statusEl.textContent = 'AI suggestion loaded into the form. Review and save when it looks right.';
-                    statusEl.className = 'status-text ok';
-                    aiTemplateStatus.textContent = `Loaded 1 of ${templates.length} AI-suggested templates into the form.`;
+                    aiTemplateStatus.textContent = `Loaded 1 of ${received} AI-suggested templates into the form. Click another below to load it instead.`;
                     aiTemplateStatus.className = 'status-text ok';
                 } catch (err) {
                     console.error('AI template suggestions failed', err);
@@ -73,6 +74,47 @@ window.initPlannerView = function initPlannerView() {
             });
         }
 
+        function loadTemplateSuggestion(template) {
+            document.getElementById('name').value = template.name || '';
+            document.getElementById('category').value = template.category || '';
+            if (typeof template.default_duration_minutes === 'number') {
+                document.getElementById('default_duration_minutes').value = String(template.default_duration_minutes);
+            }
+            document.getElementById('recurrence_pattern').value = template.recurrence_pattern || '';
+            document.getElementById('preferred_time_window').value = template.preferred_time_window || '';
+            document.getElementById('default_alert_style').value = template.default_alert_style || 'visual_then_alarm';
+            document.getElementById('enabled').checked = template.enabled !== false;
+            editingTaskId = null;
+            submitBtn.textContent = 'Save template';
+            statusEl.textContent = 'AI suggestion loaded into the form. Review and save when it looks right.';
+            statusEl.className = 'status-text ok';
+        }
+
+        function appendTemplateSuggestion(template) {
+            if (!aiTemplateSuggestionsEl) return;
+            const row = document.createElement('div');
+            row.className = 'history-item';
+            row.style.cursor = 'pointer';
+            const main = document.createElement('div');
+            main.className = 'history-main';
+            const nameEl = document.createElement('div');
+            nameEl.className = 'history-task';
+            nameEl.textContent = template.name || '';
+            const metaEl = document.createElement('div');
+            metaEl.className = 'history-meta';
+            metaEl.textContent = [
+                template.category,
+                template.default_duration_minutes ? `${template.default_duration_minutes} min` : '',
+                template.recurrence_pattern,
+                template.preferred_time_window,
+            ].filter(Boolean).join(' · ');
+            main.appendChild(nameEl);
+            main.appendChild(metaEl);
+            row.appendChild(main);
+            row.addEventListener('click', () => loadTemplateSuggestion(template));
+            aiTemplateSuggestionsEl.appendChild(row);
+        }
+
         if (templateSearchInput) {
             templateSearchInput.addEventListener('input', () => {
                 applyTemplateFilterAndRender();
@@ -81,9 +123,15 @@ window.initPlannerView = function initPlannerView() {
 
         async function loadTasks() {
             try {
-                const res = await fetch('/tasks/');
+                const headers = tasksEtag ? { 'If-None-Match': tasksEtag } : {};
+                const res = await fetch('/tasks/', { headers, cache: 'no-store' });
+                if (res.status === 304) {
+                    // Unchanged since the last load; keep the templates we already have.
+                    return;
+                }
                 if (!res.ok) throw new Error('Failed to load tasks');
                 const data = await res.json();
+                tasksEtag = res.headers.get('ETag');
                 templateTasksAll = Array.isArray(data) ? data : [];
                 applyTemplateFilterAndRender();
                 updateAlertWordingCategoryOptions();
@@ -575,6 +623,13 @@ window.initPlannerView = function initPlannerView() {
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify(payload),
                     });
+                    if (res.status === 400) {
+                        // Validation errors (e.g. an unrecognized recurrence pattern) are shown as-is.
+                        const body = await res.json().catch(() => ({}));
+                        statusEl.textContent = body.detail || 'Template was rejected.';
+                        statusEl.classList.add('error');
+                        return;
+                    }
                     if (!res.ok) {
                         const text = await res.text();
                         throw new Error(text || 'Failed to save template');
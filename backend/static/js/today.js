@@ -833,16 +833,134 @@ window.initTodayView = function initTodayView() {
             });
         }
 
+        // Schedule updates come from the server-push stream by default. Browsers without
+        // EventSource, or a `?schedule=poll` URL, use the legacy 1 Hz polling mode.
+        const scheduleUpdateMode =
+            typeof window.EventSource !== 'function' ||
+            new URLSearchParams(window.location.search).get('schedule') === 'poll'
+                ? 'poll'
+                : 'stream';
+        let schedulePollIntervalId = null;
+        let currentScheduleItems = [];
+        let streamRenderPending = false;
+        let scheduleEtag = null;
+        let nextChangeTimeoutId = null;
+        // In polling mode remote edits are picked up by cheap conditional requests;
+        // start/end boundaries are handled precisely by the X-Next-Change-At timer.
+        const SCHEDULE_POLL_INTERVAL_MS = 5000;
+
+        function stampReceived(items) {
+            const receivedAt = Date.now();
+            for (const item of items) {
+                item._receivedAt = receivedAt;
+            }
+            return items;
+        }
+
+        function sortScheduleItems(items) {
+            return items.sort((a, b) =>
+                (a.planned_start_time || '').localeCompare(b.planned_start_time || ''),
+            );
+        }
+
+        function renderCurrentSchedule() {
+            if (editingTaskId !== null) {
+                streamRenderPending = true;
+                return;
+            }
+            streamRenderPending = false;
+            // Streamed items may be minutes old; age their countdowns before rendering.
+            const now = Date.now();
+            const items = currentScheduleItems.map((item) => {
+                if (typeof item.remaining_seconds !== 'number' || !item._receivedAt) {
+                    return item;
+                }
+                const elapsed = Math.floor((now - item._receivedAt) / 1000);
+                return { ...item, remaining_seconds: Math.max(0, item.remaining_seconds - elapsed) };
+            });
+            renderSchedule(items);
+        }
+
+        function startSchedulePolling() {
+            if (schedulePollIntervalId !== null) return;
+            loadSchedule();
+            schedulePollIntervalId = setInterval(loadSchedule, SCHEDULE_POLL_INTERVAL_MS);
+        }
+
+        function scheduleNextChangeRefresh(nextChangeAt) {
+            if (nextChangeTimeoutId !== null) {
+                clearTimeout(nextChangeTimeoutId);
+                nextChangeTimeoutId = null;
+            }
+            // The stream pushes boundary snapshots itself; polling needs the hint.
+            if (!nextChangeAt || scheduleUpdateMode === 'stream') return;
+            const serverNow = currentScheduleItems.length ? currentScheduleItems[0].server_now : null;
+            // Both timestamps are server-local, so compare them to each other rather
+            // than to the browser clock.
+            // Trim microseconds, which Date.parse does not reliably accept.
+            const parseServerTime = (value) => Date.parse(String(value).slice(0, 23));
+            const delayMs = serverNow
+                ? parseServerTime(nextChangeAt) - parseServerTime(serverNow)
+                : parseServerTime(nextChangeAt) - Date.now();
+            if (!Number.isFinite(delayMs)) return;
+            nextChangeTimeoutId = setTimeout(() => {
+                nextChangeTimeoutId = null;
+                loadSchedule();
+            }, Math.max(0, delayMs) + 250);
+        }
+
+        function connectScheduleStream() {
+            const source = new EventSource('/schedule/today/stream');
+            source.addEventListener('snapshot', (event) => {
+                currentScheduleItems = sortScheduleItems(stampReceived(JSON.parse(event.data)));
+                renderCurrentSchedule();
+            });
+            source.addEventListener('upsert', (event) => {
+                const payload = JSON.parse(event.data);
+                for (const item of stampReceived(payload.items || [])) {
+                    const idx = currentScheduleItems.findIndex((it) => it.id === item.id);
+                    if (idx === -1) {
+                        currentScheduleItems.push(item);
+                    } else {
+                        currentScheduleItems[idx] = item;
+                    }
+                }
+                sortScheduleItems(currentScheduleItems);
+                renderCurrentSchedule();
+            });
+            source.addEventListener('remove', (event) => {
+                const payload = JSON.parse(event.data);
+                const removed = new Set(payload.ids || []);
+                currentScheduleItems = currentScheduleItems.filter((it) => !removed.has(it.id));
+                renderCurrentSchedule();
+            });
+            source.onerror = () => {
+                // EventSource reconnects on its own; fall back to polling only once it gives up.
+                if (source.readyState === EventSource.CLOSED) {
+                    console.warn('Schedule stream closed; falling back to polling.');
+                    startSchedulePolling();
+                }
+            };
+        }
+
         async function loadSchedule() {
             if (!scheduleListEl) return;
             if (editingTaskId !== null) {
                 return;
             }
             try {
-                const res = await fetch('/schedule/today');
+                const headers = scheduleEtag ? { 'If-None-Match': scheduleEtag } : {};
+                const res = await fetch('/schedule/today', { headers, cache: 'no-store' });
+                if (res.status === 304) {
+                    scheduleNextChangeRefresh(res.headers.get('X-Next-Change-At'));
+                    return;
+                }
                 if (!res.ok) throw new Error('Failed to load schedule');
                 const data = await res.json();
-                renderSchedule(data);
+                scheduleEtag = res.headers.get('ETag');
+                currentScheduleItems = stampReceived(data);
+                renderCurrentSchedule();
+                scheduleNextChangeRefresh(res.headers.get('X-Next-Change-At'));
             } catch (err) {
                 console.error(err);
                 scheduleStatusEl.textContent = "Could not load today's schedule.";
@@ -970,6 +1088,14 @@ window.initTodayView = function initTodayView() {
                     if (editingTaskId === item.id) {
                         editingTaskId = null;
                     }
+                    if (streamRenderPending) {
+                        // Let a pending Save click land before rebuilding the list.
+                        setTimeout(() => {
+                            if (editingTaskId === null && streamRenderPending) {
+                                renderCurrentSchedule();
+                            }
+                        }, 300);
+                    }
                 });
 
                 const saveBtn = document.createElement('button');
@@ -1235,8 +1361,10 @@ window.initTodayView = function initTodayView() {
         updateHudClock();
         setInterval(updateHudClock, 1000);
 
-        loadSchedule();
         loadAlarmConfig();
-        // High-frequency polling so the active task and alerts update almost in real time (PA-005)
-        setInterval(loadSchedule, 1000);
+        if (scheduleUpdateMode === 'stream') {
+            connectScheduleStream();
+        } else {
+            startSchedulePolling();
+        }
 };
@@ -0,0 +1,173 @@
+"""Acknowledge/snooze latency: one transaction per action vs. the old multi-commit flow.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_action_latency --actions 200 --fsync-ms 15
+
+Each action is timed the way the alert routes run it: load the instance, then
+acknowledge or snooze it. The "multi-commit" flow is a copy of the previous
+code, which committed up to three times per action; "single" is the current
+one-commit unit of work. Commits per action are counted on the engine.
+
+Commit cost is what separates the two, and on a laptop SSD or tmpfs it is
+close to free. Either point ``--dir`` at the real storage (e.g. the Pi's SD
+card) or pass ``--fsync-ms`` to add a fixed delay per commit that models it.
+Both runs use the pragmas from ``backend/db.py`` unless ``--sqlite-defaults``
+is given.
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time as time_module
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from backend import models  # noqa: E402
+from backend.db import Base, configure_sqlite, sqlite_pragmas  # noqa: E402
+from backend.services import interactions as interactions_service  # noqa: E402
+from backend.services import schedule as schedule_service  # noqa: E402
+
+
+def _legacy_respond(db: Session, instance: models.ScheduleInstance, response_type: str) -> None:
+    interaction = interactions_service.get_latest_interaction(db, instance.id)
+    now_utc = datetime.utcnow()
+    if interaction and interaction.response_type is None:
+        interaction.response_type = response_type
+        interaction.response_stage = "visual"
+        interaction.responded_at = now_utc
+        db.commit()
+    elif interaction is None:
+        db.add(
+            models.Interaction(
+                schedule_instance_id=instance.id,
+                alert_type="task_start",
+                alert_started_at=now_utc,
+                response_type=response_type,
+                response_stage="visual",
+                responded_at=now_utc,
+            )
+        )
+        db.commit()
+
+
+def _legacy_acknowledge(db: Session, instance: models.ScheduleInstance) -> None:
+    db.add(models.AcknowledgeEvent(schedule_instance_id=instance.id))
+    schedule_service.record_change(db, instance)
+    db.commit()
+    _legacy_respond(db, instance, "acknowledge")
+
+
+def _legacy_snooze(db: Session, instance: models.ScheduleInstance, minutes: int) -> None:
+    end_dt = datetime.combine(instance.date, instance.planned_end_time) + timedelta(minutes=minutes)
+    instance.planned_end_time = end_dt.time()
+    schedule_service.record_change(db, instance)
+    db.commit()
+    db.refresh(instance)
+    db.add(models.SnoozeEvent(schedule_instance_id=instance.id, minutes=minutes))
+    schedule_service.record_change(db, instance)
+    db.commit()
+    _legacy_respond(db, instance, "snooze")
+
+
+def _single_acknowledge(db: Session, instance: models.ScheduleInstance) -> None:
+    interactions_service.record_acknowledge(db, instance)
+    db.commit()
+
+
+def _single_snooze(db: Session, instance: models.ScheduleInstance, minutes: int) -> None:
+    schedule_service.snooze_instance(db, instance, minutes)
+    interactions_service.record_snooze(db, instance, minutes)
+    db.commit()
+
+
+FLOWS: Dict[str, Dict[str, Callable]] = {
+    "multi-commit": {"acknowledge": _legacy_acknowledge, "snooze": _legacy_snooze},
+    "single": {"acknowledge": _single_acknowledge, "snooze": _single_snooze},
+}
+
+
+def _percentile(samples: List[float], pct: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def _run(
+    flow: Dict[str, Callable], args: argparse.Namespace, pragmas: Dict[str, str]
+) -> Dict[str, object]:
+    workdir = tempfile.mkdtemp(prefix="pad-bench-", dir=args.dir)
+    engine = create_engine(f"sqlite:///{Path(workdir) / 'bench.db'}")
+    configure_sqlite(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    commits = {"count": 0}
+
+    @event.listens_for(engine, "commit")
+    def _on_commit(conn):
+        commits["count"] += 1
+        if args.fsync_ms:
+            time_module.sleep(args.fsync_ms / 1000)
+
+    with SessionFactory() as db:
+        for i in range(20):
+            db.add(models.Task(name=f"T{i:02d}", category="bench", default_duration_minutes=10, enabled=True))
+        db.commit()
+        schedule_service.materialize_day(db, date.today())
+        instance_ids = [row.id for row in db.query(models.ScheduleInstance.id).all()]
+
+    rng = random.Random(args.seed)
+    latencies: Dict[str, List[float]] = {"acknowledge": [], "snooze": []}
+    action_commits = 0
+    for _ in range(args.actions):
+        action = "acknowledge" if rng.random() < 0.5 else "snooze"
+        with SessionFactory() as db:
+            instance = db.get(models.ScheduleInstance, rng.choice(instance_ids))
+            interactions_service.start_interaction(db, instance)
+            db.commit()
+            instance = db.get(models.ScheduleInstance, instance.id)
+            before = commits["count"]
+            started = time_module.perf_counter()
+            if action == "acknowledge":
+                flow[action](db, instance)
+            else:
+                flow[action](db, instance, 5)
+            latencies[action].append((time_module.perf_counter() - started) * 1000)
+            action_commits += commits["count"] - before
+
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"latencies": latencies, "commits_per_action": action_commits / args.actions}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--actions", type=int, default=200)
+    parser.add_argument("--fsync-ms", type=float, default=0.0, help="modelled cost of each commit")
+    parser.add_argument("--dir", default=None, help="directory for the throwaway database")
+    parser.add_argument("--sqlite-defaults", action="store_true", help="rollback journal, synchronous=FULL")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    pragmas = {} if args.sqlite_defaults else sqlite_pragmas()
+    print(f"{args.actions} actions, fsync model {args.fsync_ms:.0f} ms/commit")
+    print(f"{'flow':<13} {'action':<12} {'commits/action':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, flow in FLOWS.items():
+        outcome = _run(flow, args, pragmas)
+        for action, samples in outcome["latencies"].items():
+            print(
+                f"{label:<13} {action:<12} {outcome['commits_per_action']:>14.2f} "
+                f"{_percentile(samples, 50):>8.2f} {_percentile(samples, 99):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""AI client overhead: a new httpx client per call vs. the shared pooled client.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_ai_client --calls 50 --tls
+
+A local mock chat-completions server answers every request immediately (or
+after ``--latency-ms``) with a canned reply, so what is timed is the client
+side: building the client (including loading the CA bundle for
+verification), connecting, the TLS handshake with ``--tls``, and the request
+itself. "per-call" is a copy of the previous ``call_deepseek``, which opened
+an ``httpx.AsyncClient`` per request; "shared" is the current
+``ai_client.call_deepseek`` on the pooled, keep-alive client.
+
+With ``--tls`` a throwaway self-signed certificate is made with the
+``openssl`` command and appended to a copy of certifi's bundle, so the
+per-call client pays for loading the same CA bundle as in production.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import certifi  # noqa: E402
+import httpx  # noqa: E402
+
+from backend import ai_client  # noqa: E402
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Suggest what to do now."},
+]
+REPLY = json.dumps(
+    {"choices": [{"message": {"role": "assistant", "content": '{"suggestion": "Walk the dog"}'}}]}
+).encode()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency: float) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if latency:
+                await asyncio.sleep(latency)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(REPLY), REPLY)
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+def _start_server(latency: float, ssl_context: Optional[ssl.SSLContext]) -> int:
+    """Serve the mock API on a background thread; return its port."""
+
+    ready = threading.Event()
+    port: List[int] = []
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(
+                lambda r, w: _handle(r, w, latency), "127.0.0.1", 0, ssl=ssl_context
+            )
+        )
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def _tls_setup(workdir: Path) -> ssl.SSLContext:
+    cert, key = workdir / "cert.pem", workdir / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    bundle = workdir / "bundle.pem"
+    bundle.write_bytes(Path(certifi.where()).read_bytes() + cert.read_bytes())
+    # httpx loads SSL_CERT_FILE instead of certifi's bundle when verify=True.
+    os.environ["SSL_CERT_FILE"] = str(bundle)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def _legacy_call(messages: List[Dict[str, str]], *, max_tokens: int = 512) -> str:
+    headers = {"Authorization": f"Bearer {ai_client.AI_API_KEY}", "Content-Type": "application/json"}
+    payload = {
+        "model": ai_client.AI_MODEL_NAME,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.4,
+    }
+    async with httpx.AsyncClient(timeout=30.0, verify=ai_client.AI_SSL_VERIFY) as client:
+        resp = await client.post(ai_client.AI_API_URL, headers=headers, json=payload)
+    return resp.json()["choices"][0]["message"]["content"]
+
+
+MODES = {
+    "per-call": _legacy_call,
+    "shared": ai_client.call_deepseek,
+}
+
+
+async def _time_calls(call, calls: int) -> List[float]:
+    samples = []
+    for _ in range(calls):
+        started = time_module.perf_counter()
+        await call(MESSAGES, max_tokens=64)
+        samples.append((time_module.perf_counter() - started) * 1000)
+    return samples
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, List[float]]:
+    results = {}
+    for mode, call in MODES.items():
+        await _time_calls(call, args.warmup)
+        results[mode] = await _time_calls(call, args.calls)
+    await ai_client.close_client()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mock server think time")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="pad-bench-"))
+    try:
+        ssl_context = _tls_setup(workdir) if args.tls else None
+        port = _start_server(args.latency_ms / 1000, ssl_context)
+        ai_client.AI_API_URL = f"{'https' if args.tls else 'http'}://127.0.0.1:{port}/chat/completions"
+        ai_client.AI_API_KEY = "bench"
+        results = asyncio.run(_run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.calls} sequential calls over {'HTTPS' if args.tls else 'HTTP'}")
+    print(f"{'mode':<9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for mode, samples in results.items():
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{mode:<9} {statistics.median(samples):>8.2f} {p95:>8.2f} {max(samples):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""History backup: columnar export/import vs. restoring row by row through the ORM.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_history_backup --sizes 100000,1000000
+
+For each size a throwaway SQLite file is filled with that many interactions
+and exported with ``backup.export_history``. The file is then restored into
+an empty database with ``backup.import_history``; for sizes up to
+``--orm-max`` the same rows are also restored the way a naive importer
+would, one ``db.add`` per row and a single commit at the end.
+
+With ``--trace-memory`` the peak Python heap of each step is reported from
+``tracemalloc``, showing it is bounded by ``--chunk-rows`` rather than the row
+count; tracing slows every step down, so compare timings without it.
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time as time_module
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from backend import models  # noqa: E402
+from backend.db import Base, configure_sqlite, sqlite_pragmas  # noqa: E402
+from backend.services import archive  # noqa: E402
+from backend.services import backup  # noqa: E402
+
+INSTANCES_PER_DAY = 20
+HISTORY_DAYS = 365
+CHUNK = 20_000
+
+
+def _engine(path: Path):
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite(engine, sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _seed(engine, interactions: int, rng: random.Random) -> None:
+    first_day = date.today() - timedelta(days=HISTORY_DAYS - 1)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.Task),
+            [
+                {
+                    "name": f"Template {i}",
+                    "category": category,
+                    "default_duration_minutes": 15,
+                    "default_alert_style": "visual_then_alarm",
+                    "enabled": True,
+                }
+                for i, category in enumerate(("work", "health", "chores", "dog"))
+            ],
+        )
+        instances = [
+            {
+                "task_id": rng.randint(1, 4),
+                "date": first_day + timedelta(days=offset),
+                "planned_start_time": time(6 + slot * 16 // INSTANCES_PER_DAY),
+                "planned_end_time": time(6 + slot * 16 // INSTANCES_PER_DAY, 30),
+                "status": "completed",
+            }
+            for offset in range(HISTORY_DAYS)
+            for slot in range(INSTANCES_PER_DAY)
+        ]
+        conn.execute(insert(models.ScheduleInstance), instances)
+        for done in range(0, interactions, CHUNK):
+            batch = []
+            for _ in range(min(CHUNK, interactions - done)):
+                instance_id = rng.randint(1, len(instances))
+                started = datetime.combine(
+                    instances[instance_id - 1]["date"], time(rng.randrange(24), rng.randrange(60))
+                )
+                batch.append(
+                    {
+                        "schedule_instance_id": instance_id,
+                        "alert_type": "task_start",
+                        "alert_started_at": started,
+                        "response_type": rng.choice(("acknowledge", "snooze", "none")),
+                        "response_stage": "visual",
+                        "responded_at": started,
+                    }
+                )
+            conn.execute(insert(models.Interaction), batch)
+
+
+def _timed(action, trace_memory: bool) -> Tuple[float, Optional[float]]:
+    """Run ``action``; return (seconds, peak traced heap in MB or None)."""
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time_module.perf_counter()
+    action()
+    seconds = time_module.perf_counter() - started
+    if not trace_memory:
+        return seconds, None
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+
+def _orm_restore(source, target) -> None:
+    with Session(source) as reader, Session(target) as db:
+        for model in backup.BACKUP_MODELS:
+            for row in reader.execute(select(model.__table__)).mappings():
+                db.add(model(**row))
+        db.commit()
+
+
+def _run(size: int, args: argparse.Namespace) -> Dict[str, object]:
+    workdir = Path(tempfile.mkdtemp(prefix="pad-bench-", dir=args.dir))
+    archive.ARCHIVE_DIR = str(workdir / "archive")
+    source = _engine(workdir / "source.db")
+    _seed(source, size, random.Random(args.seed))
+    backup_path = workdir / "history.padh"
+
+    outcome: Dict[str, object] = {}
+
+    def export() -> None:
+        with open(backup_path, "wb") as out:
+            backup.export_history(source, out, args.chunk_rows)
+
+    outcome["export"] = _timed(export, args.trace_memory)
+    outcome["file_mb"] = backup_path.stat().st_size / (1024 * 1024)
+    outcome["db_mb"] = (workdir / "source.db").stat().st_size / (1024 * 1024)
+
+    target = _engine(workdir / "import.db")
+
+    def restore() -> None:
+        with open(backup_path, "rb") as stream:
+            backup.import_history(target, stream)
+
+    outcome["import"] = _timed(restore, args.trace_memory)
+    with target.connect() as conn:
+        restored = conn.execute(select(models.Interaction.id).order_by(models.Interaction.id.desc())).first()
+    assert restored is not None and restored[0] == size, "import lost rows"
+
+    if size <= args.orm_max:
+        orm_target = _engine(workdir / "orm.db")
+        outcome["orm-add"] = _timed(lambda: _orm_restore(source, orm_target), args.trace_memory)
+        orm_target.dispose()
+
+    source.dispose()
+    target.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return outcome
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated interaction counts")
+    parser.add_argument("--chunk-rows", type=int, default=backup.DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--orm-max", type=int, default=100_000, help="largest size to restore row by row")
+    parser.add_argument("--dir", default=None, help="directory for the throwaway databases")
+    parser.add_argument("--trace-memory", action="store_true", help="report peak heap per step (slower)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'interactions':>12} {'step':<8} {'seconds':>8} {'peak MB':>8}")
+    for size in (int(part) for part in args.sizes.split(",")):
+        outcome = _run(size, args)
+        for step in ("export", "import", "orm-add"):
+            if step in outcome:
+                seconds, peak = outcome[step]
+                peak_text = "-" if peak is None else f"{peak:.1f}"
+                print(f"{size:>12} {step:<8} {seconds:>8.2f} {peak_text:>8}")
+        print(f"{'':>12} (database {outcome['db_mb']:.1f} MB, backup {outcome['file_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
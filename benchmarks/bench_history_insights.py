@@ -0,0 +1,212 @@
+"""History insights aggregation: ORM rows counted in Python vs. SQL GROUP BY vs. rollup.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_history_insights --sizes 10000,100000,1000000 --days 60
+
+For each size a throwaway SQLite file is filled with that many interactions
+spread over a year of schedule days. Three ways of producing the insights
+summary for the last ``--days`` days are timed:
+
+- ``orm+python``: the previous endpoint code, which loaded up to 1000 joined
+  ORM rows and counted them in Python dicts (its total shows the truncation);
+- ``group-by``: ``analytics.range_counts_statement`` over the interactions table;
+- ``rollup``: ``rollup.summary_statement`` over ``interaction_daily_rollup``.
+
+The group-by and rollup summaries are checked to be identical.
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from backend import models  # noqa: E402
+from backend.db import Base, configure_sqlite, sqlite_pragmas  # noqa: E402
+from backend.services import analytics  # noqa: E402
+from backend.services import rollup  # noqa: E402
+
+CATEGORIES = ("work", "health", "chores", "dog", " ")
+RESPONSES = ("acknowledge", "acknowledge", "snooze", "none")
+# The sweeper closes alerts within minutes, so only a few are ever open.
+OPEN_ALERTS = 5
+INSTANCES_PER_DAY = 20
+HISTORY_DAYS = 365
+CHUNK = 20_000
+
+
+def _legacy_summary(db: Session, start: date, end: date) -> Dict[str, object]:
+    rows = db.execute(
+        select(models.Interaction, models.ScheduleInstance, models.Task)
+        .join(
+            models.ScheduleInstance,
+            models.Interaction.schedule_instance_id == models.ScheduleInstance.id,
+        )
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .where(models.ScheduleInstance.date >= start)
+        .where(models.ScheduleInstance.date <= end)
+        .order_by(
+            models.Interaction.alert_started_at.desc(),
+            models.Interaction.id.desc(),
+        )
+        .limit(1000)
+    ).all()
+    counts: Dict[tuple, int] = {}
+    for interaction, _instance, task in rows:
+        key = (
+            analytics.label(task.category, "uncategorized"),
+            analytics.time_of_day_bucket(interaction.alert_started_at.hour),
+            analytics.label(interaction.response_type, "none"),
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return analytics.summarize((*key, count) for key, count in counts.items())
+
+
+def _group_by_summary(db: Session, start: date, end: date) -> Dict[str, object]:
+    return analytics.summarize(db.execute(analytics.range_counts_statement(start, end)).all())
+
+
+def _rollup_summary(db: Session, start: date, end: date) -> Dict[str, object]:
+    return analytics.summarize(db.execute(rollup.summary_statement(start, end)).all())
+
+
+MODES: Dict[str, Callable[[Session, date, date], Dict[str, object]]] = {
+    "orm+python": _legacy_summary,
+    "group-by": _group_by_summary,
+    "rollup": _rollup_summary,
+}
+
+
+def _seed(engine, interactions: int, today: date, rng: random.Random) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.Task),
+            [
+                {
+                    "name": f"Template {i}",
+                    "category": category,
+                    "default_duration_minutes": 15,
+                    "default_alert_style": "visual_then_alarm",
+                    "enabled": True,
+                }
+                for i, category in enumerate(CATEGORIES)
+            ],
+        )
+        first_day = today - timedelta(days=HISTORY_DAYS - 1)
+        instances = []
+        for offset in range(HISTORY_DAYS):
+            for slot in range(INSTANCES_PER_DAY):
+                start = time(6 + slot * 16 // INSTANCES_PER_DAY, rng.choice((0, 15, 30, 45)))
+                instances.append(
+                    {
+                        "task_id": rng.randint(1, len(CATEGORIES)),
+                        "date": first_day + timedelta(days=offset),
+                        "planned_start_time": start,
+                        "planned_end_time": start,
+                        "status": "completed",
+                    }
+                )
+        conn.execute(insert(models.ScheduleInstance), instances)
+
+        for done in range(0, interactions, CHUNK):
+            batch = []
+            for _ in range(min(CHUNK, interactions - done)):
+                instance_id = rng.randint(1, len(instances))
+                day = instances[instance_id - 1]["date"]
+                started = datetime.combine(day, time(rng.randrange(24), rng.randrange(60)))
+                response = rng.choice(RESPONSES)
+                batch.append(
+                    {
+                        "schedule_instance_id": instance_id,
+                        "alert_type": "task_start",
+                        "alert_started_at": started,
+                        "response_type": response,
+                        "response_stage": "visual",
+                        "responded_at": started,
+                    }
+                )
+            conn.execute(insert(models.Interaction), batch)
+        conn.execute(
+            insert(models.Interaction),
+            [
+                {
+                    "schedule_instance_id": len(instances) - slot,
+                    "alert_type": "task_start",
+                    "alert_started_at": datetime.combine(today, time(8, slot)),
+                    "response_type": None,
+                    "response_stage": None,
+                    "responded_at": None,
+                }
+                for slot in range(OPEN_ALERTS)
+            ],
+        )
+        rollup.rebuild(conn)
+
+
+def _run(size: int, args: argparse.Namespace) -> Dict[str, object]:
+    workdir = tempfile.mkdtemp(prefix="pad-bench-", dir=args.dir)
+    engine = create_engine(f"sqlite:///{Path(workdir) / 'bench.db'}")
+    configure_sqlite(engine, sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    today = date.today()
+    seed_started = time_module.perf_counter()
+    _seed(engine, size, today, random.Random(args.seed))
+    seed_seconds = time_module.perf_counter() - seed_started
+
+    start = today - timedelta(days=args.days)
+    timings: Dict[str, List[float]] = {}
+    totals: Dict[str, int] = {}
+    summaries: Dict[str, Dict[str, object]] = {}
+    for mode, summarize in MODES.items():
+        samples = []
+        for _ in range(args.repeat):
+            with SessionFactory() as db:
+                started = time_module.perf_counter()
+                summary = summarize(db, start, today)
+                samples.append((time_module.perf_counter() - started) * 1000)
+        timings[mode] = samples
+        totals[mode] = summary["total_interactions"]
+        summaries[mode] = summary
+
+    assert summaries["group-by"] == summaries["rollup"], "rollup disagrees with GROUP BY"
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"timings": timings, "totals": totals, "seed_seconds": seed_seconds}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated interaction counts")
+    parser.add_argument("--days", type=int, default=60, help="insights range, ending today")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", default=None, help="directory for the throwaway databases")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"insights over the last {args.days} days of {HISTORY_DAYS} days of history")
+    print(f"{'interactions':>12} {'mode':<11} {'counted':>8} {'p50 ms':>9} {'max ms':>9}")
+    for size in (int(part) for part in args.sizes.split(",")):
+        outcome = _run(size, args)
+        for mode, samples in outcome["timings"].items():
+            print(
+                f"{size:>12} {mode:<11} {outcome['totals'][mode]:>8} "
+                f"{statistics.median(samples):>9.2f} {max(samples):>9.2f}"
+            )
+        print(f"{'':>12} (seeded in {outcome['seed_seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
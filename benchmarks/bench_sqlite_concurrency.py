@@ -0,0 +1,173 @@
+"""Read/write latency under concurrent polling readers and ack/snooze writers.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 4 --writers 2 --seconds 10
+
+Runs the same workload twice against a fresh SQLite file: once with SQLite's
+defaults (rollback journal, synchronous=FULL; what ``backend/db.py`` used to
+do) and once with the pragmas ``backend/db.py`` now applies (WAL,
+synchronous=NORMAL, busy_timeout, cache_size, mmap_size). Readers run the
+uncached query behind GET /schedule/today; writers start an interaction and
+record an acknowledge or snooze, like the alert buttons do. Latencies are
+reported as p50/p99 in milliseconds.
+
+fsync cost dominates the difference, so point ``--dir`` at the storage the app
+actually runs on (e.g. the Pi's SD card); on tmpfs both modes look similar.
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend import models  # noqa: E402
+from backend.db import Base, configure_sqlite, sqlite_pragmas  # noqa: E402
+from backend.services import interactions as interactions_service  # noqa: E402
+from backend.services import schedule as schedule_service  # noqa: E402
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+def _seed(Session, templates: int) -> List[int]:
+    with Session() as db:
+        for i in range(templates):
+            db.add(
+                models.Task(
+                    name=f"Template {i:03d}",
+                    category=("work", "health", "chores", "dog")[i % 4],
+                    default_duration_minutes=15,
+                    enabled=True,
+                )
+            )
+        db.commit()
+        schedule_service.materialize_day(db, date.today())
+        return [row.id for row in db.query(models.ScheduleInstance.id).all()]
+
+
+def _read_today(db) -> int:
+    rows = (
+        db.query(models.ScheduleInstance, models.Task)
+        .join(models.Task, models.ScheduleInstance.task_id == models.Task.id)
+        .filter(models.ScheduleInstance.date == date.today())
+        .filter(models.ScheduleInstance.status != "cancelled")
+        .order_by(models.ScheduleInstance.planned_start_time)
+        .all()
+    )
+    return len(rows)
+
+
+def _write_response(db, instance_id: int, rng: random.Random) -> None:
+    instance = db.get(models.ScheduleInstance, instance_id)
+    interactions_service.start_interaction(db, instance)
+    db.commit()
+    if rng.random() < 0.5:
+        interactions_service.record_acknowledge(db, instance)
+    else:
+        schedule_service.snooze_instance(db, instance, minutes=5)
+        interactions_service.record_snooze(db, instance, minutes=5)
+    db.commit()
+
+
+def _run(pragmas: Dict[str, str], args: argparse.Namespace) -> Dict[str, object]:
+    workdir = tempfile.mkdtemp(prefix="pad-bench-", dir=args.dir)
+    engine = create_engine(
+        f"sqlite:///{Path(workdir) / 'bench.db'}",
+        connect_args={"check_same_thread": False},
+        pool_size=args.readers + args.writers,
+    )
+    configure_sqlite(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    instance_ids = _seed(Session, args.templates)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+
+    def worker(kind: str, seed: int) -> None:
+        rng = random.Random(seed)
+        samples: List[float] = []
+        failed = 0
+        while not stop.is_set():
+            started = time_module.perf_counter()
+            try:
+                with Session() as db:
+                    if kind == "read":
+                        _read_today(db)
+                    else:
+                        _write_response(db, rng.choice(instance_ids), rng)
+            except OperationalError:
+                failed += 1
+            else:
+                samples.append((time_module.perf_counter() - started) * 1000)
+            interval = args.read_interval if kind == "read" else args.write_interval
+            stop.wait(interval)
+        with lock:
+            results[kind].extend(samples)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=("read", i)) for i in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=("write", 1000 + i)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time_module.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"samples": results, "errors": errors}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--templates", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--read-interval", type=float, default=0.0, help="pause between reads (s)")
+    parser.add_argument("--write-interval", type=float, default=0.05, help="pause between writes (s)")
+    parser.add_argument("--dir", default=None, help="directory for the throwaway database")
+    args = parser.parse_args()
+
+    modes = [
+        ("defaults", {}),
+        ("tuned", sqlite_pragmas()),
+    ]
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s per mode")
+    print(f"{'mode':<9} {'op':<6} {'count':>7} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, pragmas in modes:
+        outcome = _run(pragmas, args)
+        for kind in ("read", "write"):
+            samples = outcome["samples"][kind]
+            print(
+                f"{label:<9} {kind:<6} {len(samples):>7} {outcome['errors'][kind]:>6} "
+                f"{_percentile(samples, 50):>8.2f} {_percentile(samples, 99):>8.2f}"
+            )
+    print("tuned pragmas: " + ", ".join(f"{k}={v}" for k, v in sqlite_pragmas().items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Requests/sec for GET /schedule/today with and without the snapshot cache.
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_today_schedule --templates 40 --seconds 5
+
+The run uses a throwaway SQLite file and pins itself to a single CPU core where
+the OS allows it, to approximate the one-core budget a Raspberry Pi 4 can spare
+for the dashboard next to the kiosk browser. A Pi 4 core is roughly 3-4x slower
+than a current laptop core, so scale absolute numbers accordingly; the ratio
+between the two modes is the useful figure.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _pin_to_one_cpu() -> str:
+    if hasattr(os, "sched_setaffinity"):
+        cpu = sorted(os.sched_getaffinity(0))[0]
+        os.sched_setaffinity(0, {cpu})
+        return f"pinned to CPU {cpu}"
+    return "CPU pinning unavailable on this OS"
+
+
+def _measure(client, seconds: float, before_each=None) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        if before_each is not None:
+            before_each()
+        resp = client.get("/schedule/today")
+        assert resp.status_code == 200, resp.text
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="pad-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+    from backend.services import today_cache
+
+    cpu_note = _pin_to_one_cpu()
+
+    with TestClient(app) as client:
+        for i in range(args.templates):
+            resp = client.post(
+                "/tasks/",
+                json={
+                    "name": f"Template {i:03d}",
+                    "category": ("work", "health", "chores", "dog")[i % 4],
+                    "default_duration_minutes": 15,
+                    "recurrence_pattern": "daily",
+                },
+            )
+            assert resp.status_code == 201, resp.text
+
+        items = client.get("/schedule/today").json()
+        print(f"{len(items)} instances today, {cpu_note}")
+
+        # "Before": every request misses the cache and rebuilds from SQLite.
+        uncached = _measure(client, args.seconds, before_each=today_cache.bump_version)
+        # "After": rows come from the cache; only derived fields are recomputed.
+        cached = _measure(client, args.seconds)
+
+    print(f"uncached: {uncached:8.1f} req/s")
+    print(f"cached:   {cached:8.1f} req/s  ({cached / uncached:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()